@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Contract Analysis Pipeline
+Runs module extraction and clause parsing over a single read of the
+contract: the 正文 module's line range is handed straight to the clause
+parser, so the text is decoded and split once and no intermediate file
+is written.
+"""
+
+import json
+import os
+import sys
+import argparse
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(SKILLS_DIR / 'contract-module-extractor' / 'scripts'))
+sys.path.insert(0, str(SKILLS_DIR / 'contract-clause-parser' / 'scripts'))
+
+from extract_modules import (DEFAULT_PATTERNS, MMAP_THRESHOLD, ContractModuleExtractor, MappedText, auto_patterns,
+                             read_contract)
+from parse_contract import ContractParser
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache
+
+
+def body_lines(extractor: ContractModuleExtractor) -> Iterator[str]:
+    """Lines of the 正文 module, or of the whole contract if there is none."""
+    body = next((m for m in extractor.modules if m.type == '正文'), None)
+    if body is None:
+        start, stop = 0, len(extractor.lines)
+    else:
+        start, stop = body.start_line, body.end_line + 1
+    lines = extractor.lines
+    return (lines[i] for i in range(start, stop))
+
+
+def analyze(text: Union[str, MappedText], parser: Optional[ContractParser] = None,
+            with_offsets: bool = False, auto_packs: bool = False) -> Dict[str, List[Dict]]:
+    """Extract modules and parse the body's clauses from one copy of the text.
+
+    Returns {"modules": [...], "clauses": [...]} in the formats of
+    extract_modules.py and parse_contract.py. Clause paths only cover the
+    正文 module, so TOC entries and signature lines are never read as
+    headings. Packs (with auto_packs) and the heading style are chosen
+    from the head of the whole document, as when the two scripts run on
+    the file, not from the first lines of the body.
+    """
+    patterns = auto_patterns(text) if auto_packs else DEFAULT_PATTERNS
+    extractor = ContractModuleExtractor(text, patterns=patterns)
+    modules = extractor.extract(with_offsets=with_offsets)
+    parser = parser or ContractParser(auto_packs=auto_packs)
+    clauses = list(parser.iter_clauses(body_lines(extractor), style_lines=extractor.lines[:100]))
+    return {"modules": modules, "clauses": clauses}
+
+
+def analyze_file(input_file: str, output_dir: Optional[str] = None,
+                 use_mmap: Optional[bool] = None, with_offsets: bool = False,
+                 cache: Optional[ResultCache] = None, auto_packs: bool = False) -> Dict[str, Path]:
+    """Analyze input_file and write <stem>-modules.json and <stem>-clauses.json.
+
+    With a cache, an input whose bytes (and the pipeline code) are unchanged
+    since an earlier run is served from it instead of being analyzed again.
+    """
+    input_path = Path(input_file)
+    directory = Path(output_dir) if output_dir else input_path.parent
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = input_path.stem
+    if stem.endswith('-plaintext'):
+        stem = stem[:-len('-plaintext')]
+
+    if use_mmap is None:
+        use_mmap = os.path.getsize(input_file) >= MMAP_THRESHOLD
+
+    result = None
+    if cache is not None:
+        # Mapped input reports byte offsets, so the mode is part of the key
+        key = cache.key(input_file, offsets=with_offsets, mapped=use_mmap and with_offsets,
+                        auto_packs=auto_packs)
+        result = cache.get(key)
+
+    if result is None:
+        text = read_contract(input_file, use_mmap)
+        try:
+            result = analyze(text, with_offsets=with_offsets, auto_packs=auto_packs)
+        finally:
+            if isinstance(text, MappedText):
+                text.close()
+        if cache is not None:
+            cache.put(key, result)
+
+    outputs = {
+        "modules": directory / f"{stem}-modules.json",
+        "clauses": directory / f"{stem}-clauses.json",
+    }
+    for name, path in outputs.items():
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result[name], f, ensure_ascii=False, indent=2)
+    return outputs
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Extract modules and clauses from a contract in one pass.")
+    arg_parser.add_argument('input_file', help="contract text file")
+    arg_parser.add_argument('-o', '--output-dir', default=None,
+                            help="directory for the JSON files (default: next to the input)")
+    arg_parser.add_argument('--offsets', action='store_true',
+                            help="add line and offset spans to every module")
+    arg_parser.add_argument('--mmap', dest='use_mmap', action='store_true', default=None,
+                            help="memory-map the input (default: only for large files)")
+    arg_parser.add_argument('--no-mmap', dest='use_mmap', action='store_false',
+                            help="always read the input into memory")
+    arg_parser.add_argument('--auto-packs', action='store_true',
+                            help="also use the pattern packs whose fingerprint matches the contract")
+    arg_parser.add_argument('--no-cache', action='store_true', help="always analyze, bypassing the result cache")
+    arg_parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                            help="result cache directory (default: %(default)s)")
+    arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES >> 20,
+                            help="result cache bound in MB (default: %(default)s)")
+    args = arg_parser.parse_args()
+
+    cache = None if args.no_cache else ResultCache(Path(args.cache_dir), args.cache_size << 20)
+    outputs = analyze_file(args.input_file, args.output_dir, args.use_mmap, args.offsets, cache,
+                           args.auto_packs)
+    if cache is not None and cache.hits:
+        print("Served from cache.")
+    print(f"Modules written to {outputs['modules']}")
+    print(f"Clauses written to {outputs['clauses']}")
+
+
+if __name__ == '__main__':
+    main()
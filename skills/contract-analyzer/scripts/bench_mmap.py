@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Input path benchmark
+Compares reading contracts into memory with the memory-mapped path of
+extract_modules.py and parse_contract.py on synthetic inputs of growing
+size (the sample contracts tiled). Every measurement runs in a fresh
+interpreter and reports wall time and peak RSS; --heap adds the peak
+Python heap from tracemalloc (in a separate run, as tracing slows it down).
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+SAMPLES_DIR = SKILLS_DIR.parent / 'data' / 'contract-samples'
+sys.path.insert(0, str(SKILLS_DIR / 'contract-module-extractor' / 'scripts'))
+sys.path.insert(0, str(SKILLS_DIR / 'contract-clause-parser' / 'scripts'))
+
+
+def build_input(path: Path, size_mb: int) -> None:
+    """Tile the sample contracts until the file reaches size_mb megabytes."""
+    corpus = '\n\n'.join(p.read_text(encoding='utf-8') for p in sorted(SAMPLES_DIR.glob('*.md')))
+    block = (corpus + '\n\n').encode('utf-8')
+    target = size_mb * 1024 * 1024
+    with open(path, 'wb') as f:
+        written = 0
+        while written < target:
+            f.write(block)
+            written += len(block)
+
+
+def measure(stage: str, path: str, use_mmap: bool, trace_heap: bool) -> dict:
+    """Run one stage in this process and report its cost."""
+    if trace_heap:
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    if stage == 'extract':
+        from extract_modules import ContractModuleExtractor, read_contract
+        source = read_contract(path, use_mmap)
+        ContractModuleExtractor(source).extract(with_text=False, with_offsets=True)
+    else:
+        from parse_contract import ContractParser
+        ContractParser().parse(path, os.devnull, 'jsonl', use_mmap)
+
+    elapsed = time.perf_counter() - start
+    result = {
+        'seconds': round(elapsed, 3),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if trace_heap:
+        result['heap_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+    return result
+
+
+def run_child(stage: str, path: Path, use_mmap: bool, trace_heap: bool = False) -> dict:
+    command = [sys.executable, __file__, '--child', stage, str(path), '1' if use_mmap else '0']
+    if trace_heap:
+        command.append('--heap')
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark in-memory vs memory-mapped input.")
+    arg_parser.add_argument('sizes', nargs='*', type=int, default=[1, 100, 1000], help="input sizes in MB")
+    arg_parser.add_argument('--stages', default='extract,parse', help="comma-separated: extract, parse")
+    arg_parser.add_argument('--heap', action='store_true', help="also report the peak Python heap")
+    arg_parser.add_argument('--child', nargs=3, metavar=('STAGE', 'PATH', 'MMAP'), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        stage, path, use_mmap = args.child
+        print(json.dumps(measure(stage, path, use_mmap == '1', args.heap)))
+        return
+
+    print(f"{'stage':<8} {'MB':>6} {'mode':<6} {'seconds':>9} {'max RSS MB':>11} {'heap MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = Path(tmp) / f'contract-{size}mb.txt'
+            build_input(path, size)
+            for stage in args.stages.split(','):
+                for use_mmap in (False, True):
+                    result = run_child(stage, path, use_mmap)
+                    heap = run_child(stage, path, use_mmap, True)['heap_peak_mb'] if args.heap else None
+                    mode = 'mmap' if use_mmap else 'read'
+                    print(f"{stage:<8} {size:>6} {mode:<6} {result['seconds']:>9.3f} "
+                          f"{result['max_rss_mb']:>11.1f} {heap if heap is not None else '-':>9}")
+            path.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Benchmark and regression suite
+Runs module extraction and clause parsing over every sample contract and
+over copies of each tiled 10x, 100x and 1000x. Every measurement runs in
+a fresh interpreter and reports throughput (lines/s, MB/s), peak RSS and
+the time spent in each phase. At 1x the outputs are compared with the
+golden files next to the samples (<stem>-modules.json, <stem>-clauses.json),
+byte for byte as the two scripts write them. Goldens listed in
+known-mismatches.json hold the output the code should produce but does not
+yet; they count as known as long as the output still has the recorded
+digest, so only new differences fail. A measurement whose child process
+fails is reported as a failed row and the run goes on.
+
+Results can be saved as JSON (-o) and compared with a run from another
+commit (--compare); the exit status is 1 on a golden mismatch or on a
+throughput drop beyond --tolerance.
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+SAMPLES_DIR = SKILLS_DIR.parent / 'data' / 'contract-samples'
+KNOWN_MISMATCHES = 'known-mismatches.json'
+sys.path.insert(0, str(SKILLS_DIR / 'contract-module-extractor' / 'scripts'))
+sys.path.insert(0, str(SKILLS_DIR / 'contract-clause-parser' / 'scripts'))
+
+STAGES = ('extract', 'parse')
+GOLDEN_SUFFIX = {'extract': 'modules', 'parse': 'clauses'}
+
+# Runs shorter than this are too noisy to call a slowdown a regression
+MIN_COMPARE_SECONDS = 0.05
+
+
+def label(name: str, width: int = 24) -> str:
+    """name cut or padded to width terminal columns (CJK characters take two)."""
+    out, used = '', 0
+    for ch in name:
+        cost = 2 if unicodedata.east_asian_width(ch) in 'WF' else 1
+        if used + cost > width:
+            break
+        out += ch
+        used += cost
+    return out + ' ' * (width - used)
+
+
+def golden_path(sample: Path, stage: str) -> Path:
+    return sample.with_name(f"{sample.stem}-{GOLDEN_SUFFIX[stage]}.json")
+
+
+def load_known_mismatches(samples_dir: Path) -> Dict[str, Dict]:
+    """Golden file name -> {'sha256': digest of the current output, 'reason': ...}."""
+    try:
+        with open(samples_dir / KNOWN_MISMATCHES, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def build_input(sample: Path, scale: int, directory: Path) -> Path:
+    """The sample itself, or a file holding scale copies of it."""
+    if scale == 1:
+        return sample
+    text = sample.read_text(encoding='utf-8')
+    path = directory / f"{sample.stem}-x{scale}.md"
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(scale):
+            if i:
+                f.write('\n\n')
+            f.write(text)
+    return path
+
+
+def run_extract(path: str, use_mmap: bool, phases: Dict[str, float]) -> str:
+    from extract_modules import ContractModuleExtractor, MappedText, read_contract, registry_for_packs
+
+    clock = time.perf_counter()
+
+    def lap(name):
+        nonlocal clock
+        now = time.perf_counter()
+        phases[name] = phases.get(name, 0.0) + now - clock
+        clock = now
+
+    text = read_contract(path, use_mmap)
+    lap('read')
+    try:
+        patterns = registry_for_packs([])
+        lap('patterns')
+        extractor = ContractModuleExtractor(text, patterns=patterns)
+        lap('split')
+        extractor._scan_structure()
+        lap('scan')
+        extractor._determine_boundaries()
+        lap('boundaries')
+        output = json.dumps(extractor._to_json(), ensure_ascii=False, indent=2)
+        lap('serialize')
+    finally:
+        if isinstance(text, MappedText):
+            text.close()
+    return output
+
+
+def run_parse(path: str, use_mmap: bool, phases: Dict[str, float]) -> str:
+    from parse_contract import ContractParser, iter_mapped_lines
+
+    clock = time.perf_counter()
+
+    def lap(name):
+        nonlocal clock
+        now = time.perf_counter()
+        phases[name] = phases.get(name, 0.0) + now - clock
+        clock = now
+
+    if use_mmap:
+        lines = iter_mapped_lines(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().split('\n')
+    lap('read')
+    # With mmap, reading happens lazily and is counted under clauses
+    clauses = list(ContractParser().iter_clauses(lines))
+    lap('clauses')
+    output = json.dumps(clauses, ensure_ascii=False, indent=2)
+    lap('serialize')
+    return output
+
+
+RUNNERS = {'extract': run_extract, 'parse': run_parse}
+
+
+def measure(stage: str, path: str, use_mmap: bool, repeat: int, golden: Optional[str]) -> Dict:
+    """Run one stage repeat times in this process; keep the fastest run."""
+    best = None
+    for _ in range(repeat):
+        phases: Dict[str, float] = {}
+        start = time.perf_counter()
+        output = RUNNERS[stage](path, use_mmap, phases)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, phases)
+
+    result = {
+        'seconds': best[0],
+        'phases': {name: round(seconds, 6) for name, seconds in best[1].items()},
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if golden is not None:
+        try:
+            expected = Path(golden).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            result['golden'] = 'missing'
+        else:
+            result['golden'] = 'match' if output == expected else 'mismatch'
+            if output != expected:
+                result['sha256'] = hashlib.sha256(output.encode('utf-8')).hexdigest()
+    return result
+
+
+def run_child(stage: str, path: Path, use_mmap: bool, repeat: int, golden: Optional[Path]) -> Dict:
+    """measure() in a fresh interpreter; {'error': stderr} if the child fails."""
+    command = [sys.executable, __file__, '--child', stage, str(path), '1' if use_mmap else '0', str(repeat)]
+    if golden is not None:
+        command += ['--golden', str(golden)]
+    child = subprocess.run(command, capture_output=True, text=True)
+    if child.returncode:
+        return {'error': child.stderr.strip() or f"exit status {child.returncode}"}
+    return json.loads(child.stdout)
+
+
+def write_golden(sample: Path, known: Dict[str, Dict]) -> List[Path]:
+    """Write the 1x outputs of both stages as the sample's golden files,
+    leaving goldens listed as known mismatches alone."""
+    written = []
+    for stage in STAGES:
+        path = golden_path(sample, stage)
+        if path.name in known:
+            continue
+        path.write_text(RUNNERS[stage](str(sample), False, {}), encoding='utf-8')
+        written.append(path)
+    return written
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SKILLS_DIR, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def row_key(row: Dict) -> tuple:
+    return row['sample'], row['scale'], row['stage'], row['mmap']
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Print throughput changes against a baseline run; return the regressions
+    (slowdowns beyond tolerance, among runs long enough to time reliably)."""
+    before = {row_key(row): row for row in baseline if 'error' not in row}
+    regressions = []
+    print(f"\n{'sample':<24} {'scale':>6} {'stage':<8} {'MB/s before':>12} {'MB/s now':>10} {'change':>8}")
+    for row in results:
+        old = before.get(row_key(row))
+        if old is None or 'error' in row:
+            continue
+        change = row['mb_per_s'] / old['mb_per_s'] - 1 if old['mb_per_s'] else 0.0
+        flag = ''
+        if change < -tolerance and min(row['seconds'], old['seconds']) >= MIN_COMPARE_SECONDS:
+            flag = '  SLOWER'
+            regressions.append(f"{row['sample']} x{row['scale']} {row['stage']}: {change:+.0%}")
+        print(f"{label(row['sample'])} {row['scale']:>6} {row['stage']:<8} {old['mb_per_s']:>12.2f} "
+              f"{row['mb_per_s']:>10.2f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark extraction and parsing over the sample contracts.")
+    arg_parser.add_argument('--scales', default='1,10,100,1000',
+                            help="comma-separated tiling factors (default: %(default)s)")
+    arg_parser.add_argument('--stages', default=','.join(STAGES), help="comma-separated: extract, parse")
+    arg_parser.add_argument('--samples', default=str(SAMPLES_DIR), help="directory of sample contracts (*.md)")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="runs per measurement; the fastest counts")
+    arg_parser.add_argument('--mmap', action='store_true', help="read inputs through the memory-mapped paths")
+    arg_parser.add_argument('-o', '--output', help="write the results as JSON")
+    arg_parser.add_argument('--compare', metavar='RESULTS', help="JSON results of an earlier run to compare with")
+    arg_parser.add_argument('--tolerance', type=float, default=0.10,
+                            help="throughput drop counted as a regression (default: %(default)s)")
+    arg_parser.add_argument('--update-golden', action='store_true',
+                            help="rewrite the golden files from the current code and exit")
+    arg_parser.add_argument('--child', nargs=4, metavar=('STAGE', 'PATH', 'MMAP', 'REPEAT'), help=argparse.SUPPRESS)
+    arg_parser.add_argument('--golden', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        stage, path, use_mmap, repeat = args.child
+        print(json.dumps(measure(stage, path, use_mmap == '1', int(repeat), args.golden)))
+        return
+
+    samples = sorted(p for p in Path(args.samples).glob('*.md'))
+    known = load_known_mismatches(Path(args.samples))
+    if args.update_golden:
+        for sample in samples:
+            for path in write_golden(sample, known):
+                print(f"Wrote {path}")
+        for name, entry in known.items():
+            print(f"Kept {name} (known mismatch: {entry.get('reason', '')})")
+        return
+
+    scales = [int(s) for s in args.scales.split(',')]
+    stages = args.stages.split(',')
+    results = []
+    print(f"{'sample':<24} {'scale':>6} {'stage':<8} {'MB':>8} {'lines/s':>11} {'MB/s':>8} "
+          f"{'max RSS MB':>11} {'golden':<8} phases (ms)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for sample in samples:
+            for scale in scales:
+                path = build_input(sample, scale, Path(tmp))
+                size = path.stat().st_size
+                with open(path, 'rb') as f:
+                    lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b'')) + 1
+                for stage in stages:
+                    golden = golden_path(sample, stage) if scale == 1 else None
+                    measured = run_child(stage, path, args.mmap, args.repeat, golden)
+                    row = {
+                        'sample': sample.stem,
+                        'scale': scale,
+                        'stage': stage,
+                        'mmap': args.mmap,
+                        'bytes': size,
+                        'lines': lines,
+                    }
+                    if 'error' in measured:
+                        row['error'] = measured['error']
+                        results.append(row)
+                        print(f"{label(sample.stem)} {scale:>6} {stage:<8} {size / 2**20:>8.2f} "
+                              f"failed: {row['error'].splitlines()[-1]}")
+                        continue
+                    status = measured.get('golden')
+                    if status == 'mismatch' and known.get(golden.name, {}).get('sha256') == measured['sha256']:
+                        status = 'known'
+                    row.update({
+                        'seconds': round(measured['seconds'], 6),
+                        'lines_per_s': round(lines / measured['seconds'], 1),
+                        'mb_per_s': round(size / 2**20 / measured['seconds'], 3),
+                        'max_rss_mb': measured['max_rss_mb'],
+                        'phases': measured['phases'],
+                        'golden': status,
+                    })
+                    results.append(row)
+                    phases = ' '.join(f"{name}={seconds * 1000:.1f}" for name, seconds in row['phases'].items())
+                    print(f"{label(sample.stem)} {scale:>6} {stage:<8} {size / 2**20:>8.2f} "
+                          f"{row['lines_per_s']:>11.0f} {row['mb_per_s']:>8.2f} {row['max_rss_mb']:>11.1f} "
+                          f"{row['golden'] or '-':<8} {phases}")
+                if path != sample:
+                    path.unlink()
+
+    if args.output:
+        report = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    failures = [f"{row['sample']} x{row['scale']} {row['stage']}: {row['error'].splitlines()[-1]}"
+                for row in results if 'error' in row]
+    failures += [f"{row['sample']} {row['stage']}: golden {row['golden']}"
+                 for row in results if row.get('golden') == 'mismatch']
+    for row in results:
+        if row.get('golden') == 'match' and f"{row['sample']}-{GOLDEN_SUFFIX[row['stage']]}.json" in known:
+            print(f"\nNote: {row['sample']} {row['stage']} now matches its golden; "
+                  f"drop it from {KNOWN_MISMATCHES}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            failures += compare(results, json.load(f)['results'], args.tolerance)
+    if failures:
+        print("\nFailures:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Result Cache
+On-disk cache of pipeline results keyed by the SHA-256 of the input bytes
+and a fingerprint of the code that produced them. Entries are plain JSON
+files; reading one refreshes its mtime, and the least recently used
+entries are evicted once the cache grows past its size bound. The size
+is scanned once and then tracked on every put, so the directory is only
+listed again when an eviction is due.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+
+# Sources whose patterns and logic determine the cached output
+FINGERPRINT_SOURCES = [
+    SKILLS_DIR / 'contract-module-extractor' / 'scripts' / 'extract_modules.py',
+    SKILLS_DIR / 'contract-clause-parser' / 'scripts' / 'parse_contract.py',
+    SKILLS_DIR / 'contract-clause-parser' / 'scripts' / 'pattern_packs.py',
+    Path(__file__).resolve().parent / 'analyze_contract.py',
+    *sorted((SKILLS_DIR / 'contract-module-extractor' / 'references' / 'packs').glob('*.*')),
+    *sorted((SKILLS_DIR / 'contract-clause-parser' / 'references' / 'packs').glob('*.*')),
+]
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('CONTRACT_ANALYZER_CACHE',
+                                        Path.home() / '.cache' / 'contract-analyzer'))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Read size for hashing files on Pythons without hashlib.file_digest
+DIGEST_CHUNK = 1024 * 1024
+
+
+def code_fingerprint(sources: Iterable[Path] = FINGERPRINT_SOURCES) -> str:
+    """Hash of the pipeline sources; any edit to patterns or code changes it."""
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(source.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """SHA-256 of a file's bytes, read without loading the whole file."""
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(DIGEST_CHUNK), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU cache of JSON results in a directory."""
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 fingerprint: Optional[str] = None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint or code_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        # Bytes in the cache as of the last scan plus this instance's puts
+        # since; None until the first put scans the directory
+        self._total: Optional[int] = None
+
+    def key(self, path: str, **options) -> str:
+        """Cache key for a file's content under the current code and options."""
+        digest = hashlib.sha256(file_digest(path).encode('ascii'))
+        digest.update(self.fingerprint.encode('ascii'))
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entry(key)
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(entry)
+        except OSError:  # evicted by another process since; the result is still good
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(key)
+        # Write to a temporary file first so readers never see half an entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            size = os.path.getsize(tmp)
+            try:
+                size -= entry.stat().st_size
+            except OSError:
+                pass
+            os.replace(tmp, entry)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+
+        if self._total is None or self._total + size > self.max_bytes:
+            self.evict()
+        else:
+            self._total += size
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for entry in self.directory.glob('*.json'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+        self._total = total
+
+    def clear(self) -> None:
+        for entry in self.directory.glob('*.json'):
+            entry.unlink(missing_ok=True)
+        self._total = 0
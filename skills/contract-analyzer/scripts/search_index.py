@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Clause Search Index
+Persistent full-text index over a corpus of analyzed contracts, in one
+SQLite file. Every clause of the 正文 module, and every other module as
+a whole, is one searchable segment carrying its contract, module type
+and clause path.
+
+Chinese has no word boundaries, so text is cut into overlapping
+character bigrams (违约责任 -> 违约 约责 责任) and a query term becomes
+a phrase of its bigrams: consecutive bigrams match exactly the
+substrings containing the term. The bigrams go into a contentless FTS5
+table, so only the inverted index is stored, not a second copy of the
+text. Contracts can be added, replaced and removed one at a time.
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(SKILLS_DIR / 'contract-module-extractor' / 'scripts'))
+sys.path.insert(0, str(SKILLS_DIR / 'contract-clause-parser' / 'scripts'))
+
+from batch_parse import collect_inputs
+from parse_contract import load_clauses
+from result_cache import file_digest
+
+SCHEMA_VERSION = 1
+BODY_MODULE = '正文'
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS contracts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    source TEXT,
+    digest TEXT,
+    indexed REAL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    contract INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    module TEXT NOT NULL,
+    path TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_contract ON segments (contract);
+CREATE INDEX IF NOT EXISTS segments_path ON segments (path);
+CREATE INDEX IF NOT EXISTS segments_module ON segments (module);
+CREATE VIRTUAL TABLE IF NOT EXISTS grams USING fts5 (tokens, content='', tokenize='ascii');
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+# Runs of letters and digits; everything else separates terms
+_RUN = re.compile(r'[^\W_]+')
+
+
+def normalize(text: str) -> str:
+    """Full-width forms folded to ASCII (５％ -> 5%), lower case."""
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def bigrams(text: str) -> str:
+    """Space-separated bigram tokens of text, as stored in the index.
+
+    Each run of letters and digits gives its overlapping bigrams plus its
+    last character on its own, so every character starts a token and a
+    one-character query can match by prefix.
+    """
+    tokens = []
+    for run in _RUN.findall(normalize(text)):
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        tokens.append(run[-1])
+    return ' '.join(tokens)
+
+
+def match_expression(query: str) -> Optional[str]:
+    """FTS5 MATCH expression for a query: every term (run of letters and
+    digits) must occur, as a phrase of its bigrams."""
+    terms = []
+    for run in _RUN.findall(normalize(query)):
+        if len(run) == 1:
+            terms.append(f'"{run}" *')
+        else:
+            terms.append('"' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+    return ' AND '.join(terms) or None
+
+
+def path_bounds(path: str) -> Tuple[str, str]:
+    """Range [low, high) of the paths under path, for an indexed range scan."""
+    prefix = path if path == '~' or path.startswith('~/') else '~/' + path
+    return prefix + '/', prefix + '0'  # '0' sorts right after '/'
+
+
+def segments_of(modules: List[Dict], clauses: List[Dict]) -> Iterator[Tuple[str, Optional[str], str]]:
+    """(module, path, text) for each segment of a contract, in document order:
+    the body's clauses in place of the 正文 module, other modules whole."""
+    body_done = False
+    for module in modules:
+        if module['type'] == BODY_MODULE:
+            if not body_done:
+                body_done = True
+                for clause in clauses:
+                    yield BODY_MODULE, clause['path'], clause['clause']
+        elif module.get('text'):
+            yield module['type'], None, module['text']
+    if not body_done:
+        for clause in clauses:
+            yield BODY_MODULE, clause['path'], clause['clause']
+
+
+def contract_name(path: Path) -> str:
+    stem = path.stem
+    for suffix in ('-clauses', '-plaintext'):
+        if stem.endswith(suffix):
+            return stem[:-len(suffix)]
+    return stem
+
+
+def load_source(path: Path) -> Dict:
+    """Modules and clauses of one input: a parse_contract.py output
+    (<stem>-clauses.json, any --format, with <stem>-modules.json beside
+    it if present) or a contract text, analyzed here."""
+    name = contract_name(path)
+    if path.stem.endswith('-clauses'):
+        clauses = list(load_clauses(str(path)))
+        modules_file = path.with_name(f"{name}-modules.json")
+        modules = []
+        if modules_file.exists():
+            with open(modules_file, 'r', encoding='utf-8') as f:
+                modules = json.load(f)
+    else:
+        from analyze_contract import analyze
+        from extract_modules import MappedText, read_contract
+        text = read_contract(str(path))
+        try:
+            result = analyze(text)
+        finally:
+            if isinstance(text, MappedText):
+                text.close()
+        modules, clauses = result['modules'], result['clauses']
+    return {"name": name, "source": str(path), "modules": modules, "clauses": clauses}
+
+
+def _load_job(job: Tuple[str, str]) -> Dict:
+    path, digest = job
+    try:
+        loaded = load_source(Path(path))
+    except Exception as e:
+        return {"source": path, "error": f"{type(e).__name__}: {e}"}
+    loaded["digest"] = digest
+    # Tokenise in the worker too; the parent only writes to SQLite
+    loaded["segments"] = [(module, p, text, bigrams(text))
+                          for module, p, text in segments_of(loaded.pop("modules"), loaded.pop("clauses"))]
+    return loaded
+
+
+class SearchIndex:
+    """Bigram inverted index over the clauses and modules of many contracts."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"{path}: index schema {version}, expected {SCHEMA_VERSION}; rebuild it")
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> 'SearchIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def digest(self, name: str) -> Optional[str]:
+        row = self.db.execute('SELECT digest FROM contracts WHERE name = ?', (name,)).fetchone()
+        return row['digest'] if row else None
+
+    def contracts(self) -> List[str]:
+        return [row['name'] for row in self.db.execute('SELECT name FROM contracts ORDER BY name')]
+
+    def _remove(self, contract_id: int) -> None:
+        # A contentless table deletes by the tokens it was given, so they
+        # are recomputed from the stored text
+        rows = self.db.execute('SELECT id, text FROM segments WHERE contract = ?', (contract_id,))
+        self.db.executemany("INSERT INTO grams (grams, rowid, tokens) VALUES ('delete', ?, ?)",
+                            ((row['id'], bigrams(row['text'])) for row in rows.fetchall()))
+        self.db.execute('DELETE FROM segments WHERE contract = ?', (contract_id,))
+        self.db.execute('DELETE FROM contracts WHERE id = ?', (contract_id,))
+
+    def remove(self, name: str) -> bool:
+        """Drop a contract from the index; False if it was not indexed."""
+        with self.db:
+            row = self.db.execute('SELECT id FROM contracts WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                return False
+            self._remove(row['id'])
+        return True
+
+    def add(self, name: str, modules: List[Dict], clauses: List[Dict],
+            source: Optional[str] = None, digest: Optional[str] = None) -> int:
+        """Index a contract, replacing any earlier version under the same
+        name. Returns the number of segments indexed."""
+        segments = [(module, path, text, bigrams(text))
+                    for module, path, text in segments_of(modules, clauses)]
+        return self._add(name, segments, source, digest)
+
+    def _add(self, name: str, segments: List[Tuple], source: Optional[str], digest: Optional[str]) -> int:
+        with self.db:
+            row = self.db.execute('SELECT id FROM contracts WHERE name = ?', (name,)).fetchone()
+            if row is not None:
+                self._remove(row['id'])
+            contract_id = self.db.execute(
+                'INSERT INTO contracts (name, source, digest, indexed) VALUES (?, ?, ?, ?)',
+                (name, source, digest, time.time())).lastrowid
+            first = self.db.execute('SELECT coalesce(max(id), 0) + 1 FROM segments').fetchone()[0]
+            self.db.executemany(
+                'INSERT INTO segments (id, contract, position, module, path, text) VALUES (?, ?, ?, ?, ?, ?)',
+                ((first + i, contract_id, i, module, path, text)
+                 for i, (module, path, text, _) in enumerate(segments)))
+            self.db.executemany('INSERT INTO grams (rowid, tokens) VALUES (?, ?)',
+                                ((first + i, tokens) for i, (_, _, _, tokens) in enumerate(segments)))
+        return len(segments)
+
+    def add_files(self, paths: Iterable[Path], workers: Optional[int] = None,
+                  force: bool = False) -> Iterator[Dict]:
+        """Index files (see load_source) on a process pool, skipping those
+        whose bytes are unchanged since they were indexed. Yields one
+        report per file."""
+        jobs = []
+        for path in paths:
+            digest = file_digest(path)
+            if not force and self.digest(contract_name(path)) == digest:
+                yield {"source": str(path), "status": "unchanged"}
+                continue
+            jobs.append((str(path), digest))
+        if not jobs:
+            return
+
+        if workers == 1 or len(jobs) == 1:
+            loaded = map(_load_job, jobs)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            loaded = pool.map(_load_job, jobs, chunksize=4)
+        try:
+            for item in loaded:
+                if "error" in item:
+                    yield {"source": item["source"], "status": "error", "error": item["error"]}
+                    continue
+                count = self._add(item["name"], item["segments"], item["source"], item["digest"])
+                yield {"source": item["source"], "status": "indexed", "segments": count}
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def search(self, query: str = '', paths: Iterable[str] = (), modules: Iterable[str] = (),
+               contracts: Iterable[str] = (), pattern: Optional[str] = None,
+               limit: Optional[int] = 100, rank: bool = False) -> List[Dict]:
+        """Segments containing every term of query, restricted to clauses
+        under any of paths ('第五章' or '~/第五章'), to the module types
+        and to the named contracts; pattern is a regex the text must also
+        match. Results come in document order, or best match first with
+        rank."""
+        expression = match_expression(query)
+        where, params = [], []
+        if expression:
+            where.append('grams MATCH ?')
+            params.append(expression)
+        paths, modules, contracts = list(paths), list(modules), list(contracts)
+        if paths:
+            ranges = []
+            for path in paths:
+                low, high = path_bounds(path)
+                ranges.append('s.path = ? OR (s.path >= ? AND s.path < ?)')
+                params.extend((low[:-1], low, high))
+            where.append('(' + ' OR '.join(ranges) + ')')
+        if modules:
+            where.append(f"s.module IN ({', '.join('?' * len(modules))})")
+            params.extend(modules)
+        if contracts:
+            names = ', '.join('?' * len(contracts))
+            where.append(f"c.name IN ({names})")
+            params.extend(contracts)
+            if expression:
+                # A contract's segments have consecutive ids; bounding the
+                # rowid lets FTS5 skip the other contracts' matches
+                low, high = self.db.execute(
+                    f"SELECT min(s.id), max(s.id) FROM segments s JOIN contracts c ON c.id = s.contract "
+                    f"WHERE c.name IN ({names})", contracts).fetchone()
+                if low is None:
+                    return []
+                where.append('grams.rowid BETWEEN ? AND ?')
+                params.extend((low, high))
+
+        source = 'grams JOIN segments s ON s.id = grams.rowid' if expression else 'segments s'
+        # Segment ids follow document order, and FTS5 yields matches in
+        # rowid order, so this streams and stops at the limit; ranking
+        # has to score every match first
+        if expression:
+            order = 'grams.rank' if rank else 'grams.rowid'
+        else:
+            order = 's.id'
+        sql = (f"SELECT c.name AS contract, s.module, s.path, s.text AS clause FROM {source} "
+               f"JOIN contracts c ON c.id = s.contract"
+               + (' WHERE ' + ' AND '.join(where) if where else '')
+               + f" ORDER BY {order}")
+
+        regex = re.compile(pattern) if pattern else None
+        results = []
+        for row in self.db.execute(sql, params):
+            if regex is not None and not regex.search(row['clause']):
+                continue
+            results.append(dict(row))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict:
+        count = lambda sql: self.db.execute(sql).fetchone()[0]
+        return {
+            "contracts": count('SELECT count(*) FROM contracts'),
+            "segments": count('SELECT count(*) FROM segments'),
+            "bytes": count('SELECT page_count * page_size FROM pragma_page_count, pragma_page_size'),
+        }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Build and query a full-text index over analyzed contracts.")
+    arg_parser.add_argument('index', help="index file (SQLite; created if missing)")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="index contracts, or re-index changed ones")
+    add.add_argument('inputs', nargs='+',
+                     help="contract texts or <stem>-clauses outputs: files, directories, globs or @file-lists")
+    add.add_argument('--pattern', default='*.md', help="file pattern inside directories (default: %(default)s)")
+    add.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    add.add_argument('--force', action='store_true', help="re-index files even if unchanged")
+
+    remove = commands.add_parser('remove', help="drop contracts from the index")
+    remove.add_argument('names', nargs='+', help="contract names (file stems)")
+
+    search = commands.add_parser('search', help="find clauses")
+    search.add_argument('query', nargs='?', default='', help="terms that must all occur, e.g. '违约责任 违约金'")
+    search.add_argument('--path', action='append', default=[], help="only clauses under this heading path")
+    search.add_argument('--module', action='append', default=[], help="only segments of this module type")
+    search.add_argument('--contract', action='append', default=[], help="only this contract")
+    search.add_argument('--regex', help="the text must also match this regular expression")
+    search.add_argument('--limit', type=int, default=100, help="at most this many results; 0 for all")
+    search.add_argument('--rank', action='store_true', help="best match first instead of document order")
+
+    commands.add_parser('stats', help="print index size")
+    args = arg_parser.parse_args()
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    with SearchIndex(args.index) as index:
+        if args.command == 'add':
+            totals: Dict[str, int] = {}
+            for report in index.add_files(collect_inputs(args.inputs, args.pattern), args.workers, args.force):
+                totals[report['status']] = totals.get(report['status'], 0) + 1
+                if report['status'] == 'error':
+                    print(f"{report['source']}: {report['error']}", file=sys.stderr)
+            print(', '.join(f"{n} {status}" for status, n in totals.items()) or "Nothing to index")
+            if totals.get('error'):
+                sys.exit(1)
+        elif args.command == 'remove':
+            missing = [name for name in args.names if not index.remove(name)]
+            for name in missing:
+                print(f"Not indexed: {name}", file=sys.stderr)
+        elif args.command == 'search':
+            results = index.search(args.query, args.path, args.module, args.contract,
+                                   args.regex, args.limit or None, args.rank)
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            print(json.dumps(index.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
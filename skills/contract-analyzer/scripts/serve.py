@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+Contract Analysis Service
+Long-running JSON-RPC 2.0 front-end for extract_modules and ContractParser,
+over stdio (one message per line) or HTTP. Work runs on a pool of worker
+processes that import the scripts, compile the patterns and load the
+pattern packs once at startup, so a request costs the analysis itself
+rather than an interpreter start.
+
+Methods (params take the contract as "text", or as a "path" under the
+--root directory; without --root only "text" is accepted):
+  extract_modules  {text|path, offsets?, with_text?}  -> modules
+  parse            {text|path, stream?}               -> clauses
+  analyze          {text|path, offsets?}              -> {modules, clauses}
+  stats            {}                                 -> service counters
+
+With "stream": true, parse sends clauses while the worker is still
+parsing, as "clauses" notifications ({"id", "clauses": [...]}) ahead of
+the final response ({"count": n}); over HTTP the reply is then chunked
+NDJSON.
+
+At most --max-inflight documents are processed at once; up to
+--max-queue more wait for a slot and further requests are refused with
+"server busy". A request not answered within its timeout (the "timeout"
+param, in seconds, or --timeout), counted from its arrival and so
+including any wait for a slot, gets an error; one that timed out while
+running keeps its slot until the worker has actually finished it.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(SKILLS_DIR / 'contract-module-extractor' / 'scripts'))
+sys.path.insert(0, str(SKILLS_DIR / 'contract-clause-parser' / 'scripts'))
+
+import extract_modules as extractor_module
+import parse_contract as parser_module
+from analyze_contract import analyze
+from extract_modules import DEFAULT_PATTERNS, MappedText, auto_patterns, extract_modules, read_contract
+from parse_contract import ContractParser
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_BUSY = -32000
+TIMED_OUT = -32001
+FAILED = -32002
+
+MAX_HTTP_BODY = 64 * 1024 * 1024
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+# ---------------------------------------------------------------- workers
+
+_parser: Optional[ContractParser] = None
+_stream = None
+_auto_packs = False
+
+
+def _init_worker(stream, auto_packs: bool) -> None:
+    """Build the parser and, with auto_packs, compile every pattern pack
+    once per process."""
+    global _parser, _stream, _auto_packs
+    _parser = ContractParser(auto_packs=auto_packs)
+    _stream = stream
+    _auto_packs = auto_packs
+    if auto_packs:
+        for pack in extractor_module.available_packs(extractor_module.PACKS_DIR):
+            extractor_module.registry_for_packs([pack['path']])
+        parser_module.available_packs(parser_module.PACKS_DIR)
+        _parser.select_styles([])
+
+
+def _warm() -> int:
+    return os.getpid()
+
+
+def _source(params: Dict):
+    if 'text' in params:
+        return params['text']
+    return read_contract(params['path'])
+
+
+def _run_extract(params: Dict) -> List[Dict]:
+    text = _source(params)
+    try:
+        offsets = bool(params.get('offsets'))
+        with_text = params.get('with_text', True)
+        return extract_modules(text, with_text=with_text, with_offsets=offsets or not with_text,
+                               patterns=auto_patterns(text) if _auto_packs else DEFAULT_PATTERNS)
+    finally:
+        if isinstance(text, MappedText):
+            text.close()
+
+
+def _run_analyze(params: Dict) -> Dict[str, List[Dict]]:
+    text = _source(params)
+    try:
+        return analyze(text, parser=_parser, with_offsets=bool(params.get('offsets')), auto_packs=_auto_packs)
+    finally:
+        if isinstance(text, MappedText):
+            text.close()
+
+
+def _run_parse(params: Dict, stream_key: Optional[int] = None, batch_size: int = 64):
+    """Clauses of the contract; with a stream_key they are sent through the
+    stream queue in batches instead, followed by an end marker, and only
+    the count is returned."""
+    if 'text' in params:
+        clauses = _parser.iter_clauses(params['text'].split('\n'))
+        return _collect(clauses, stream_key, batch_size)
+    with open(params['path'], 'r', encoding='utf-8') as f:
+        return _collect(_parser.iter_clauses(f), stream_key, batch_size)
+
+
+def _collect(clauses, stream_key: Optional[int], batch_size: int):
+    if stream_key is None:
+        return list(clauses)
+    count = 0
+    batch = []
+    for clause in clauses:
+        batch.append(clause)
+        if len(batch) >= batch_size:
+            _stream.put((stream_key, batch))
+            count += len(batch)
+            batch = []
+    if batch:
+        _stream.put((stream_key, batch))
+        count += len(batch)
+    _stream.put((stream_key, None))
+    return count
+
+
+# ---------------------------------------------------------------- service
+
+class ContractService:
+    """Dispatches JSON-RPC requests to a warm process pool."""
+
+    def __init__(self, workers: Optional[int] = None, max_inflight: Optional[int] = None,
+                 max_queue: int = 100, timeout: float = 30.0, batch_size: int = 64,
+                 auto_packs: bool = False, root: Optional[Path] = None):
+        """root is the directory "path" params are resolved against; with
+        None, only inline "text" is accepted."""
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight or 2 * self.workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.auto_packs = auto_packs
+        self.root = Path(root).resolve() if root is not None else None
+        self.counters = {'requests': 0, 'errors': 0, 'timeouts': 0, 'busy': 0}
+        self.waiting = 0
+        self.inflight = 0
+
+        self._context = multiprocessing.get_context('spawn')
+        self._stream = self._context.Queue()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._streams: Dict[int, asyncio.Queue] = {}
+        self._next_key = 0
+        self.methods: Dict[str, Callable] = {
+            'extract_modules': self._extract_modules,
+            'parse': self._parse,
+            'analyze': self._analyze,
+            'stats': self._stats,
+        }
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=self._context,
+                                         initializer=_init_worker, initargs=(self._stream, self.auto_packs))
+        self._pump = threading.Thread(target=self._pump_stream, daemon=True)
+        self._pump.start()
+        # Start every worker now rather than on the first requests
+        await asyncio.gather(*(self._loop.run_in_executor(self._pool, _warm) for _ in range(self.workers)))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+        self._stream.put(None)
+
+    def _pump_stream(self) -> None:
+        """Forward streamed clause batches from the workers to the event loop."""
+        while True:
+            item = self._stream.get()
+            if item is None:
+                return
+            self._loop.call_soon_threadsafe(self._deliver, *item)
+
+    def _deliver(self, key: int, batch: Optional[List[Dict]]) -> None:
+        queue = self._streams.get(key)
+        if queue is not None:  # otherwise the request already failed or timed out
+            queue.put_nowait(batch)
+
+    async def _submit(self, function, *args, timeout: Optional[float] = None):
+        """Run function on the pool once a slot is free. The timeout runs
+        from here, so it covers the wait for a slot as well as the work."""
+        if self.waiting >= self.max_queue:
+            self.counters['busy'] += 1
+            raise RPCError(SERVER_BUSY, "server busy")
+        limit = timeout or self.timeout
+        deadline = self._loop.time() + limit
+        self.waiting += 1
+        try:
+            if self._slots.locked():
+                await asyncio.wait_for(self._slots.acquire(), limit)
+            else:
+                await self._slots.acquire()  # a free slot is taken without suspending
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            raise RPCError(TIMED_OUT, f"timed out after {limit} s")
+        finally:
+            self.waiting -= 1
+
+        remaining = deadline - self._loop.time()
+        if remaining <= 0:
+            self._slots.release()
+            self.counters['timeouts'] += 1
+            raise RPCError(TIMED_OUT, f"timed out after {limit} s")
+
+        self.inflight += 1
+        future = self._pool.submit(function, *args)
+
+        def release(_):
+            self._loop.call_soon_threadsafe(self._release)
+        future.add_done_callback(release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            raise RPCError(TIMED_OUT, f"timed out after {limit} s")
+        except RPCError:
+            raise
+        except Exception as e:
+            raise RPCError(FAILED, f"{type(e).__name__}: {e}")
+
+    def _release(self) -> None:
+        self.inflight -= 1
+        self._slots.release()
+
+    # -- methods
+
+    def _document(self, params: Any) -> Dict:
+        """Validated params; a path is replaced by its resolved location
+        under root."""
+        if not isinstance(params, dict):
+            raise RPCError(INVALID_PARAMS, "params must be an object")
+        if ('text' in params) == ('path' in params):
+            raise RPCError(INVALID_PARAMS, "give exactly one of text or path")
+        key = 'text' if 'text' in params else 'path'
+        if not isinstance(params[key], str):
+            raise RPCError(INVALID_PARAMS, f"{key} must be a string")
+        timeout = params.get('timeout')
+        if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+                                    or not math.isfinite(timeout) or timeout <= 0):
+            raise RPCError(INVALID_PARAMS, "timeout must be a positive number of seconds")
+        if key == 'path':
+            params = dict(params, path=str(self._resolve(params['path'])))
+        return params
+
+    def _resolve(self, path: str) -> Path:
+        """path (relative to root, or absolute) if it lies under root."""
+        if self.root is None:
+            raise RPCError(INVALID_PARAMS, "path is not accepted; start the service with --root")
+        resolved = (self.root / path).resolve()
+        if not resolved.is_relative_to(self.root):
+            raise RPCError(INVALID_PARAMS, "path is outside the service root")
+        if not resolved.is_file():
+            raise RPCError(INVALID_PARAMS, "path is not a file under the service root")
+        return resolved
+
+    async def _extract_modules(self, params, notify=None):
+        params = self._document(params)
+        return await self._submit(_run_extract, params, timeout=params.get('timeout'))
+
+    async def _analyze(self, params, notify=None):
+        params = self._document(params)
+        return await self._submit(_run_analyze, params, timeout=params.get('timeout'))
+
+    async def _parse(self, params, notify=None):
+        params = self._document(params)
+        if not params.get('stream') or notify is None:
+            return await self._submit(_run_parse, params, timeout=params.get('timeout'))
+
+        key = self._next_key
+        self._next_key += 1
+        queue = self._streams[key] = asyncio.Queue()
+        task = asyncio.ensure_future(self._submit(_run_parse, params, key, self.batch_size,
+                                                  timeout=params.get('timeout')))
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                if not task.done():
+                    await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done() and task.exception() is not None:
+                    getter.cancel()
+                    raise task.exception()
+                # A finished task's remaining batches and end marker are on their way
+                batch = await getter
+                if batch is None:
+                    return {'count': await task}
+                await notify('clauses', batch)
+        finally:
+            self._streams.pop(key, None)
+            if not task.done():
+                task.cancel()
+
+    async def _stats(self, params=None, notify=None):
+        return dict(self.counters, workers=self.workers, inflight=self.inflight, waiting=self.waiting,
+                    max_inflight=self.max_inflight, max_queue=self.max_queue)
+
+    # -- JSON-RPC
+
+    async def handle(self, message: Any, notify=None) -> Optional[Dict]:
+        """Response to one JSON-RPC request (None for a notification).
+
+        notify(method, params) sends a notification tied to the request
+        and enables streaming.
+        """
+        request_id = message.get('id') if isinstance(message, dict) else None
+        self.counters['requests'] += 1
+        try:
+            if not isinstance(message, dict) or message.get('jsonrpc') != '2.0' \
+                    or not isinstance(message.get('method'), str):
+                raise RPCError(INVALID_REQUEST, "invalid request")
+            method = self.methods.get(message['method'])
+            if method is None:
+                raise RPCError(METHOD_NOT_FOUND, f"unknown method {message['method']!r}")
+
+            send = None
+            if notify is not None and request_id is not None:
+                async def send(name, batch):
+                    await notify({'jsonrpc': '2.0', 'method': name, 'params': {'id': request_id, 'clauses': batch}})
+            result = await method(message.get('params', {}), send)
+            response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except RPCError as e:
+            self.counters['errors'] += 1
+            response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': e.code, 'message': e.message}}
+        if isinstance(message, dict) and 'id' not in message:
+            return None
+        return response
+
+
+# ---------------------------------------------------------------- transports
+
+def _encode(message: Dict) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+async def serve_stdio(service: ContractService) -> None:
+    """Newline-delimited JSON-RPC on stdin/stdout; requests run concurrently."""
+    loop = asyncio.get_running_loop()
+    write_lock = asyncio.Lock()
+    out = sys.stdout.buffer
+
+    async def send(message: Dict) -> None:
+        async with write_lock:
+            out.write(_encode(message))
+            out.flush()
+
+    async def run(line: bytes) -> None:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            await send({'jsonrpc': '2.0', 'id': None, 'error': {'code': PARSE_ERROR, 'message': "parse error"}})
+            return
+        response = await service.handle(message, send)
+        if response is not None:
+            await send(response)
+
+    tasks = set()
+    while True:
+        # A reader thread works for pipes, terminals and redirected files alike
+        line = await loop.run_in_executor(None, sys.stdin.buffer.readline)
+        if not line:
+            break
+        if line.strip():
+            task = asyncio.create_task(run(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def _read_http_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+    request_line = (await reader.readline()).decode('latin-1').strip()
+    method, target, _ = request_line.split(' ', 2)
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_HTTP_BODY:
+        raise RPCError(INVALID_REQUEST, "request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method, target, headers, body
+
+
+async def _http_reply(writer: asyncio.StreamWriter, status: str, payload: Dict) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+
+
+async def _http_connection(service: ContractService, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> None:
+    """One request per connection: POST a JSON-RPC message, or GET /stats."""
+    try:
+        try:
+            method, target, _, body = await _read_http_request(reader)
+        except (ValueError, asyncio.IncompleteReadError, RPCError):
+            await _http_reply(writer, '400 Bad Request', {'error': "bad request"})
+            return
+
+        if method == 'GET' and target == '/stats':
+            await _http_reply(writer, '200 OK', await service._stats())
+            return
+        if method != 'POST':
+            await _http_reply(writer, '405 Method Not Allowed', {'error': "POST a JSON-RPC request"})
+            return
+
+        try:
+            message = json.loads(body)
+        except ValueError:
+            await _http_reply(writer, '200 OK', {'jsonrpc': '2.0', 'id': None,
+                                                 'error': {'code': PARSE_ERROR, 'message': "parse error"}})
+            return
+
+        streaming = isinstance(message, dict) and isinstance(message.get('params'), dict) \
+            and message['params'].get('stream')
+        if not streaming:
+            await _http_reply(writer, '200 OK', await service.handle(message) or {})
+            return
+
+        # Chunked NDJSON: the clause notifications, then the response
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+
+        async def send(notification: Dict) -> None:
+            chunk = _encode(notification)
+            writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            await writer.drain()
+
+        response = await service.handle(message, send)
+        if response is not None:
+            await send(response)
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_http(service: ContractService, host: str, port: int) -> None:
+    server = await asyncio.start_server(lambda r, w: _http_connection(service, r, w), host, port)
+    print(f"Serving on http://{host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+async def _main(args) -> None:
+    service = ContractService(args.workers, args.max_inflight, args.max_queue, args.timeout, args.batch_size,
+                              args.auto_packs, args.root)
+    start = time.perf_counter()
+    await service.start()
+    print(f"{service.workers} workers ready in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+    try:
+        if args.http:
+            host, _, port = args.http.rpartition(':')
+            await serve_http(service, host or '127.0.0.1', int(port))
+        else:
+            await serve_stdio(service)
+    finally:
+        service.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve contract extraction and parsing over JSON-RPC.")
+    arg_parser.add_argument('--http', metavar='[HOST:]PORT',
+                            help="listen for HTTP instead of reading JSON-RPC lines from stdin")
+    arg_parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    arg_parser.add_argument('--max-inflight', type=int, default=None,
+                            help="documents processed at once (default: twice the workers)")
+    arg_parser.add_argument('--max-queue', type=int, default=100,
+                            help="requests waiting for a slot before new ones are refused (default: %(default)s)")
+    arg_parser.add_argument('--timeout', type=float, default=30.0,
+                            help="default per-request timeout in seconds (default: %(default)s)")
+    arg_parser.add_argument('--batch-size', type=int, default=64,
+                            help="clauses per streamed notification (default: %(default)s)")
+    arg_parser.add_argument('--auto-packs', action='store_true',
+                            help="also use the pattern packs whose fingerprint matches each contract")
+    arg_parser.add_argument('--root', type=Path, default=None,
+                            help="directory that \"path\" params are read from (default: accept only \"text\")")
+    args = arg_parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
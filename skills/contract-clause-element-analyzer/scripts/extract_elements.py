@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Contract Clause Element Extractor
+Extracts measurable key-value elements (parties, dates, amounts,
+percentages, periods, payment milestones) from *-clauses.json with
+compiled regex passes, categorizes each clause by the keywords in
+references/clause-categories.md, and writes the *-elements.json
+structure. Clauses it cannot categorize or extract anything from are
+written separately so only those need to go to the model.
+
+Boilerplate clauses (不可抗力, 争议解决, 保密) recur across contracts with
+only their numbering, parties and figures changed; a ClauseMemo in front
+of the analysis serves those from an earlier clause of the same template.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from keyword_index import REFERENCE_FILE, KeywordIndex
+
+PARSER_SCRIPTS = Path(__file__).resolve().parents[2] / 'contract-clause-parser' / 'scripts'
+
+CATEGORIES = ['基本信息', '商法', '交付', '财经', '附件']
+
+# Synonyms seen in the sample contracts, indexed on top of the keywords
+# in references/clause-categories.md
+EXTRA_KEYWORDS = {
+    '基本信息': ['签订', '生效', '份数', '一式'],
+    '商法': ['违约', '争议', '解除', '仲裁', '诉讼', '法院', '免责'],
+    '交付': ['供货', '送达', '规格'],
+    '财经': ['价款', '单价', '总价', '结算', '费用', '尾款', '进度款', '质保金', '账户', '账号'],
+}
+
+# Nearly every clause names a party, so these say nothing about its topic
+# (party lines are picked up by PARTY_PATTERN instead)
+IGNORED_KEYWORDS = ['甲方', '乙方']
+
+# Where several categories tie, the earlier one wins: penalties are 商法
+# even when they mention amounts (see "Common Ambiguities")
+TIE_ORDER = ['商法', '财经', '交付', '基本信息', '附件']
+
+CHINESE_NUMERALS = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
+                    '壹': 1, '贰': 2, '叁': 3, '肆': 4, '伍': 5, '陆': 6, '柒': 7, '捌': 8, '玖': 9, '拾': 10}
+
+# One alternation, one finditer per clause; the named group that
+# participated tells which kind of element matched
+ELEMENT_PATTERN = re.compile(
+    r'(?P<date>(?P<year>\d{4})\s*年\s*(?P<month>\d{1,2})\s*月\s*(?P<day>\d{1,2})\s*日'
+    r'|(?P<iso>\d{4}-\d{1,2}-\d{1,2})'
+    r'|[X×_＿]{2,}\s*年\s*[X×_＿]{1,}\s*月\s*[X×_＿]{1,}\s*日)'
+    r'|(?P<amount>(?:人民币|[¥￥])?\s*(?:(?P<amount_value>\d[\d,]*(?:\.\d+)?)|【(?P<amount_blank>[^【】\n]{1,20})】)'
+    r'\s*(?P<amount_unit>万元|元)'
+    r'|[¥￥]\s*(?P<yen_value>\d[\d,]*(?:\.\d+)?))'
+    r'|(?P<percent>【?(?P<percent_value>\d+(?:\.\d+)?)\s*[%％]】?)'
+    r'|(?P<period>【?(?P<period_value>\d+)】?\s*(?P<period_unit>个工作日|工作日|个月|日|天|小时|年)'
+    r'(?=内|后|前|以内|以上|起|之内))'
+    r'|(?P<count>[一二三四五六七八九十壹贰叁肆伍陆柒捌玖拾]式(?P<count_value>[一二三四五六七八九十壹贰叁肆伍陆柒捌玖拾])份)'
+    r'|【(?P<bracket_value>[^【】\n]{1,40})】'
+)
+
+PARTY_PATTERN = re.compile(
+    r'^\s*(?P<role>甲方|乙方|丙方)(?:（[^）]*）|\([^)]*\))?\s*[:：]\s*(?P<name>[^\n（(，,；;]+)', re.MULTILINE)
+
+# Terms naming what a value refers to, looked up just before the value
+AMOUNT_KEYS = re.compile(r'合同总金额|合同金额|暂估总价|总金额|总价|单价|预付款|进度款|尾款|质保金|保证金|'
+                         r'违约金|租金|保额|固定费用|服务费|费用|货款|价款')
+PERCENT_KEYS = re.compile(r'预付款|首付款|进度款|尾款|质保金|保证金|违约金|税率|损耗|准点率|涨幅|上涨幅度|波动幅度')
+DATE_KEYS = {'签订': '签订日期', '生效': '生效日期', '交货': '交货日期', '交付': '交付日期', '完成': '完成日期',
+             '起': '起始日期', '开始': '起始日期', '至': '终止日期', '止': '终止日期', '截止': '截止日期'}
+PERIOD_KEYS = {'交货': '交货期限', '供货': '供货期限', '交付': '交付期限', '付款': '付款期限', '支付': '付款期限',
+               '验收': '验收期限', '退换': '退换货期限', '质保': '质保期', '保修': '保修期', '有效期': '有效期',
+               '通知': '通知期限', '发票': '开票期限', '续约': '续约协商期', '协商': '协商期限', '检验': '检验期限'}
+
+# How far back (within the current line) to look for the term a value refers to
+CONTEXT = 40
+SOURCE_BREAKS = re.compile(r'[，。；;！？\n]')
+HEADING_NUMBER = re.compile(r'^(?:#+\s*)?(?:第[一二三四五六七八九十百千万\d]+[部分章节条]|[一二三四五六七八九十]+、|'
+                            r'\d+(?:\.\d+)*\.?|[①②③④⑤⑥⑦⑧⑨⑩]+|[(（][一二三四五六七八九十\d]+[)）])\s*')
+
+# Clause templates for the memo: digits and party names are masked with
+# characters of the same length, so spans carry over between clauses
+NUMERALS = re.compile(r'[\d一二三四五六七八九十百千万①②③④⑤⑥⑦⑧⑨⑩]+')
+DIGITS = re.compile(r'[1-9]')
+NAME_MASK = '〇'
+MASKED = re.compile(r'[0-9〇]')
+# Every element match needs one of these, so a party name without them
+# reads the same as its mask
+NAME_SENSITIVE = re.compile(r'[\d【】X×_＿¥￥式]')
+MEMO_SOURCES = [Path(__file__).resolve(), Path(__file__).resolve().parent / 'keyword_index.py', REFERENCE_FILE]
+DEFAULT_MEMO_ENTRIES = 10000
+
+
+class ElementExtractor:
+    """Deterministic element extraction for parsed clauses."""
+
+    def __init__(self, index: Optional[KeywordIndex] = None, memo: Optional['ClauseMemo'] = None):
+        self.index = index or KeywordIndex.from_reference(extra=EXTRA_KEYWORDS, exclude=IGNORED_KEYWORDS)
+        self.memo = memo
+
+    def categorize(self, text: str) -> Optional[str]:
+        """Category with the most keyword hits, or None when nothing matches."""
+        return self.index.classify(text, TIE_ORDER)
+
+    def analyze(self, text: str) -> Tuple[Optional[str], List[Dict]]:
+        """(category, elements) of a clause text, through the memo if there is one."""
+        if self.memo is not None:
+            return self.memo.analyze(text, self)
+        return self.categorize(text), self.parties(text) + self.values(text)
+
+    def extract(self, clause: Dict) -> Tuple[Optional[str], Optional[Dict]]:
+        """(category, entry) for one {"path", "clause"} dict; entry is None if nothing was found."""
+        text = clause['clause']
+        category, elements = self.analyze(text)
+        if not elements:
+            return category, None
+        if category is None:
+            category = '基本信息' if all(e['key'] in ('甲方', '乙方', '丙方') for e in elements) else None
+        entry = {"topic": clause_topic(text), "path": clause['path'], "elements": elements}
+        return category, entry
+
+    def parties(self, text: str) -> List[Dict]:
+        return [element(match.group('role'), text[start:end], None, text, match.start(), match.end())
+                for match, start, end in party_names(text)]
+
+    def values(self, text: str) -> List[Dict]:
+        return [e for _, e in self.value_matches(text)]
+
+    def value_matches(self, text: str) -> List[Tuple[re.Match, Dict]]:
+        """(match, element) for every value found in the clause, in order."""
+        elements = []
+        topic = clause_topic(text)
+        for match in ELEMENT_PATTERN.finditer(text):
+            kind = match.lastgroup
+            value, unit = match_value(text, match)
+            line_start = text.rfind('\n', 0, match.start()) + 1
+            before = text[max(line_start, match.start() - CONTEXT):match.start()]
+            if kind == 'date':
+                key = _last_key(text[_phrase_start(text, match.start()):match.start()], DATE_KEYS) or '日期'
+            elif kind == 'amount':
+                key = _last_match(before, AMOUNT_KEYS) or '金额'
+            elif kind == 'percent':
+                term = _table_row(text, match.start()) or _last_match(before, PERCENT_KEYS) or ''
+                key = term if term.endswith(('率', '幅度')) else term + '比例'
+            elif kind == 'period':
+                key = _last_key(text[_phrase_start(text, match.start()):match.start()], PERIOD_KEYS) or '期限'
+            elif kind == 'count':
+                key = '合同份数'
+            else:
+                key = _label(before) or topic
+            elements.append((match, element(key, value, unit, text, match.start(), match.end())))
+        return elements
+
+
+def party_names(text: str) -> List[Tuple[re.Match, int, int]]:
+    """(match, start, end) for each party line with a name filled in; the
+    name is text[start:end], without blanks, spaces or Markdown emphasis."""
+    names = []
+    for match in PARTY_PATTERN.finditer(text):
+        raw = match.group('name')
+        name = raw.strip().strip('*').strip()
+        if not name or set(name) <= set('_＿ 【】'):
+            continue
+        start = match.start('name') + raw.find(name)
+        names.append((match, start, start + len(name)))
+    return names
+
+
+def match_value(text: str, match: re.Match) -> Tuple[str, Optional[str]]:
+    """(value, unit) of an ELEMENT_PATTERN match."""
+    kind = match.lastgroup
+    if kind == 'date':
+        if match.group('year'):
+            return '%s-%02d-%02d' % (match.group('year'), int(match.group('month')), int(match.group('day'))), None
+        return match.group('iso') or match.group(), None
+    if kind == 'amount':
+        if match.group('yen_value'):
+            return match.group('yen_value'), '元'
+        value = match.group('amount_value') or match.group('amount_blank').strip()
+        unit = match.group('amount_unit')
+        if text.startswith('/', match.end()):
+            # per-unit prices such as 50万元/座
+            per = re.match(r'/[^\s\d，。；,;()（）【】*]{1,2}', text[match.end():])
+            if per:
+                unit += per.group()
+        return value, unit
+    if kind == 'percent':
+        return match.group('percent_value') + '%', None
+    if kind == 'period':
+        return match.group('period_value'), match.group('period_unit').lstrip('个')
+    if kind == 'count':
+        return str(CHINESE_NUMERALS[match.group('count_value')]), '份'
+    # Bracketed blanks are the values the contract template asks for
+    return match.group('bracket_value').replace('*', '').strip(), None
+
+
+class ClauseMemo:
+    """LRU memo of clause analyses, keyed by clause template.
+
+    A clause's template is its text after the heading number, with ASCII
+    digits and party names masked, plus the shape of the number (第0条,
+    0.0); the key is its BLAKE2b hash. An entry keeps the category and,
+    for each element, its key, where the value matched and its source
+    span. On a hit the values are read from the clause at those offsets.
+    A template is only kept when its masked text analyzes exactly like the
+    clause it came from, so a hit returns what the analysis would have;
+    otherwise the entry records that clauses of it are always analyzed.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MEMO_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[str, Optional[Dict]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def template(self, text: str) -> Optional[Tuple[str, int, List[Tuple[re.Match, int, int]], str]]:
+        """(key, heading number length, party names, masked text after the
+        number) of a clause, or None when its number runs into the next line."""
+        number = HEADING_NUMBER.match(text)
+        start = number.end() if number else 0
+        if '\n' in text[:start]:
+            return None
+        names = party_names(text)
+        pieces = []
+        last = start
+        for _, name_start, name_end in names:
+            pieces.append(text[last:name_start])
+            pieces.append(NAME_MASK * (name_end - name_start))
+            last = name_end
+        pieces.append(text[last:])
+        body = DIGITS.sub('0', ''.join(pieces))
+        shape = NUMERALS.sub('0', text[:start])
+        key = hashlib.blake2b(f"{shape}\n{body}".encode('utf-8'), digest_size=16).hexdigest()
+        return key, start, names, body
+
+    def analyze(self, text: str, extractor: 'ElementExtractor') -> Tuple[Optional[str], List[Dict]]:
+        """(category, elements) of a clause, as extractor would find them."""
+        template = self.template(text)
+        if template is None or not all(self._inert(text[s:e], extractor) for _, s, e in template[2]):
+            self.bypassed += 1
+            return extractor.categorize(text), extractor.parties(text) + extractor.values(text)
+
+        key, start, names, body = template
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            entry = self.entries[key]
+            if entry is None:
+                self.bypassed += 1
+                return extractor.categorize(text), extractor.parties(text) + extractor.values(text)
+            self.hits += 1
+            return entry['category'], self._fill(entry, text, start, names)
+
+        self.misses += 1
+        category = extractor.categorize(text)
+        parties = [element(match.group('role'), text[s:e], None, text, match.start(), match.end())
+                   for match, s, e in names]
+        values = extractor.value_matches(text)
+        self.entries[key] = self._learn(category, names, parties, values, text, start, body, extractor)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return category, parties + [e for _, e in values]
+
+    @staticmethod
+    def _inert(name: str, extractor: 'ElementExtractor') -> bool:
+        return not NAME_SENSITIVE.search(name) and not extractor.index.contains_any(name)
+
+    @staticmethod
+    def _learn(category: Optional[str], names: List[Tuple[re.Match, int, int]], parties: List[Dict],
+               values: List[Tuple[re.Match, Dict]], text: str, start: int, body: str,
+               extractor: 'ElementExtractor') -> Optional[Dict]:
+        """The entry for a template, or None unless its masked body yields
+        the same analysis as the clause."""
+        if extractor.index.counts(body) != extractor.index.counts(text):
+            return None
+
+        def same_span(found: Dict, template_span: List[int]) -> bool:
+            # A source running back to the start of the body runs on through
+            # the heading number, which holds no phrase break
+            source_start, source_end = template_span
+            return found['span'] == [source_start + start if source_start else 0, source_end + start]
+
+        entry = {"category": category, "parties": [], "values": []}
+        template_names = party_names(body)
+        if len(template_names) != len(names):
+            return None
+        for (_, name_start, _), party, (t_match, t_name_start, _) in zip(names, parties, template_names):
+            t_party = element(t_match.group('role'), '', None, body, t_match.start(), t_match.end())
+            if name_start - start != t_name_start or party['key'] != t_party['key'] or \
+                    not same_span(party, t_party['span']):
+                return None
+            entry["parties"].append([party['key']] + t_party['span'])
+
+        template_values = extractor.value_matches(body)
+        if len(template_values) != len(values):
+            return None
+        for (match, value), (t_match, t_value) in zip(values, template_values):
+            key = value['key']
+            if match.start() - start != t_match.start() or key != t_value['key'] or \
+                    MASKED.search(key) or not same_span(value, t_value['span']):
+                return None
+            entry["values"].append([key, t_match.start()] + t_value['span'])
+        return entry
+
+    @staticmethod
+    def _fill(entry: Dict, text: str, start: int, names: List[Tuple[re.Match, int, int]]) -> List[Dict]:
+        elements = []
+        for (key, s, e), (_, name_start, name_end) in zip(entry["parties"], names):
+            elements.append(_memo_element(key, text[name_start:name_end], None, text, start, s, e))
+        for key, pos, s, e in entry["values"]:
+            value, unit = match_value(text, ELEMENT_PATTERN.match(text, start + pos))
+            elements.append(_memo_element(key, value, unit, text, start, s, e))
+        return elements
+
+    def stats(self) -> Dict:
+        """Lookups so far: hits, misses (analyzed, template learned) and
+        bypassed (analyzed, template not reusable), and the hit rate."""
+        looked_up = self.hits + self.misses + self.bypassed
+        return {
+            "clauses": looked_up,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / looked_up, 3) if looked_up else 0.0,
+            "entries": len(self.entries),
+        }
+
+    @classmethod
+    def load(cls, path: Path, max_entries: int = DEFAULT_MEMO_ENTRIES) -> 'ClauseMemo':
+        """The memo saved at path; empty if there is none or it was saved
+        with other extraction code or keyword references."""
+        memo = cls(max_entries)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return memo
+        if saved.get("fingerprint") == memo_fingerprint():
+            memo.entries.update(saved["entries"][-max_entries:])
+        return memo
+
+    def save(self, path: Path) -> None:
+        """Write the memo to path, least recently used entries first."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so a concurrent run never reads half a memo
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"fingerprint": memo_fingerprint(), "entries": list(self.entries.items())},
+                          f, ensure_ascii=False)
+            os.replace(tmp, path)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+
+
+def memo_fingerprint(sources: Iterable[Path] = MEMO_SOURCES) -> str:
+    """Hash of the extraction code and keyword references a saved memo depends on."""
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(source.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _memo_element(key: str, value: str, unit: Optional[str], text: str, start: int, s: int, e: int) -> Dict:
+    """element() for a memo hit, with the source span taken from the template."""
+    source_start = s + start if s else 0
+    source_end = e + start
+    return {
+        "key": key,
+        "value": value,
+        "unit": unit,
+        "source": text[source_start:source_end].strip(),
+        "span": [source_start, source_end],
+    }
+
+
+def element(key: str, value: str, unit: Optional[str], text: str, start: int, end: int) -> Dict:
+    """One element with its 出处: the phrase around the match and its span in the clause."""
+    source_start = _phrase_start(text, start)
+    source_end = _phrase_end(text, end)
+    return {
+        "key": key,
+        "value": value,
+        "unit": unit,
+        "source": text[source_start:source_end].strip(),
+        "span": [source_start, source_end],
+    }
+
+
+def clause_topic(text: str) -> str:
+    """Topic from the clause heading, e.g. '1.2 数量：总数量为...' -> '数量'."""
+    first_line = text.split('\n', 1)[0]
+    title = HEADING_NUMBER.sub('', first_line, count=1).replace('*', '').strip()
+    for sep in ('：', ':'):
+        if sep in title:
+            return title.split(sep, 1)[0].strip() or title
+    return title if len(title) <= 20 else SOURCE_BREAKS.split(title, 1)[0][:20]
+
+
+def _phrase_start(text: str, pos: int) -> int:
+    i = pos
+    while i > 0 and not SOURCE_BREAKS.match(text, i - 1):
+        i -= 1
+    return i
+
+
+def _phrase_end(text: str, pos: int) -> int:
+    match = SOURCE_BREAKS.search(text, pos)
+    return match.start() if match else len(text)
+
+
+def _last_match(window: str, pattern: re.Pattern) -> Optional[str]:
+    last = None
+    for last in pattern.finditer(window):
+        pass
+    return last.group() if last else None
+
+
+def _last_key(window: str, keys: Dict[str, str]) -> Optional[str]:
+    best, best_pos = None, -1
+    for term, key in keys.items():
+        pos = window.rfind(term)
+        if pos > best_pos:
+            best, best_pos = key, pos
+    return best
+
+
+def _label(window: str) -> Optional[str]:
+    """The 'label：' immediately before a value, e.g. '开户行：【...】' -> '开户行'."""
+    match = re.search(r'([^\s，。；、：:（(【】*]{2,8})\s*[:：]\s*$', window.replace('*', ''))
+    return match.group(1) if match else None
+
+
+def _table_row(text: str, pos: int) -> Optional[str]:
+    """First non-empty cell of the markdown table row containing pos, if any."""
+    line_start = text.rfind('\n', 0, pos) + 1
+    line_end = text.find('\n', pos)
+    line = text[line_start:line_end if line_end >= 0 else len(text)].strip()
+    if not line.startswith('|'):
+        return None
+    cells = [c.strip() for c in line.strip('|').split('|')]
+    return next((c for c in cells if c and not c.isdigit()), None)
+
+
+def extract_elements(clauses: Iterable[Dict],
+                     extractor: Optional[ElementExtractor] = None) -> Tuple[Dict, List[Dict]]:
+    """Return (elements, pending): the *-elements.json structure and the
+    clauses left for the model (no category or no element found)."""
+    extractor = extractor or ElementExtractor()
+    elements = {category: {"entries": []} for category in CATEGORIES}
+    pending = []
+    for clause in clauses:
+        category, entry = extractor.extract(clause)
+        if category is None or entry is None:
+            reason = 'uncategorized' if category is None else 'no elements'
+            pending.append({"path": clause['path'], "clause": clause['clause'], "reason": reason})
+            continue
+        elements[category]["entries"].append(entry)
+    return elements, pending
+
+
+def load_clauses(path: Path) -> List[Dict]:
+    """Clauses in any output format of parse_contract.py (JSON, compact
+    JSON, JSONL or binary), read with the parser skill's loader when it is
+    installed next to this one; otherwise only the JSON array is read."""
+    if str(PARSER_SCRIPTS) not in sys.path:
+        sys.path.append(str(PARSER_SCRIPTS))
+    try:
+        from parse_contract import load_clauses as load_parsed
+    except ImportError:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return load_parsed(str(path))
+
+
+def clauses_under(clauses: List[Dict], paths: Iterable[str]) -> List[Dict]:
+    """The clauses under any of the heading paths (full, without '~/', or a
+    bare heading such as 第五章), in document order, found through the
+    parser skill's ClauseTree."""
+    if str(PARSER_SCRIPTS) not in sys.path:
+        sys.path.append(str(PARSER_SCRIPTS))
+    from clause_tree import ClauseTree
+
+    tree = ClauseTree(clauses)
+    picked = {i for path in paths for node in tree.resolve(path) for i in tree.subtree_indices(node.path)}
+    return [tree.clauses[i] for i in sorted(picked)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Extract key-value elements from parsed clauses.")
+    arg_parser.add_argument('input_file', help="clauses produced by parse_contract.py (any --format)")
+    arg_parser.add_argument('output_file', nargs='?', default=None,
+                            help="output *-elements.json (default: next to the input)")
+    arg_parser.add_argument('--pending', default=None,
+                            help="file for clauses left to the model (default: *-pending.json)")
+    arg_parser.add_argument('--under', action='append', default=[], metavar='PATH',
+                            help="only analyze the clauses under this heading path; may be repeated")
+    arg_parser.add_argument('--memo', default=None, metavar='FILE',
+                            help="clause memo shared by a batch of runs; created if missing")
+    arg_parser.add_argument('--memo-size', type=int, default=DEFAULT_MEMO_ENTRIES,
+                            help="clause templates kept in the memo (default: %(default)s)")
+    args = arg_parser.parse_args()
+
+    input_path = Path(args.input_file)
+    stem = input_path.stem[:-len('-clauses')] if input_path.stem.endswith('-clauses') else input_path.stem
+    output_file = Path(args.output_file) if args.output_file else input_path.with_name(f"{stem}-elements.json")
+    pending_file = Path(args.pending) if args.pending else output_file.with_name(f"{stem}-pending.json")
+
+    clauses = load_clauses(input_path)
+    if args.under:
+        clauses = clauses_under(clauses, args.under)
+
+    memo = ClauseMemo.load(Path(args.memo), args.memo_size) if args.memo else None
+    elements, pending = extract_elements(clauses, ElementExtractor(memo=memo))
+    if memo is not None:
+        memo.save(Path(args.memo))
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(elements, f, ensure_ascii=False, indent=2)
+    with open(pending_file, 'w', encoding='utf-8') as f:
+        json.dump(pending, f, ensure_ascii=False, indent=2)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    extracted = sum(len(v["entries"]) for v in elements.values())
+    print(f"{extracted} clauses extracted to {output_file}, {len(pending)} left for review in {pending_file}")
+    if memo is not None:
+        stats = memo.stats()
+        print(f"memo: {stats['hits']}/{stats['clauses']} clauses reused ({stats['hit_rate']:.1%}), "
+              f"{stats['misses']} learned, {stats['bypassed']} analyzed directly, {stats['entries']} templates")
+
+
+if __name__ == '__main__':
+    main()
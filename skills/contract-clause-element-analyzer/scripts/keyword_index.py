@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Keyword Index
+Aho–Corasick automaton over category keywords. States keep only their
+trie edges plus a failure link, so the automaton grows with the total
+length of the keywords. Scanning a text costs one dict lookup per
+character, plus one per failure link followed (amortised at most one
+more per character), no matter how many keywords there are, and every
+keyword occurrence (overlapping ones included) is counted towards its
+categories.
+"""
+
+import re
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+REFERENCE_FILE = Path(__file__).resolve().parent.parent / 'references' / 'clause-categories.md'
+
+CATEGORY_HEADING = re.compile(r'^##\s*\d+\.\s*(\S+)')
+KEYWORDS_LINE = re.compile(r'^\*\*Keywords\*\*\s*[:：]\s*(.+)$')
+
+
+def load_reference_keywords(path: Path = REFERENCE_FILE) -> Dict[str, List[str]]:
+    """Category -> keywords from the '**Keywords**:' line under each '## N. 类别' heading."""
+    keywords: Dict[str, List[str]] = {}
+    category = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            heading = CATEGORY_HEADING.match(line)
+            if heading:
+                category = heading.group(1)
+                continue
+            listed = KEYWORDS_LINE.match(line.strip())
+            if listed and category:
+                words = keywords.setdefault(category, [])
+                for word in re.split(r'[,，、]', listed.group(1)):
+                    word = word.strip()
+                    if word and word not in words:
+                        words.append(word)
+    return keywords
+
+
+class KeywordIndex:
+    """Multi-keyword matcher reporting per-category hit counts in one pass."""
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        self.categories = list(keywords)
+        category_ids = {c: i for i, c in enumerate(self.categories)}
+
+        # Trie; each node's outputs are (keyword, category ids) pairs
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[Tuple[str, Tuple[int, ...]]]] = [[]]
+        owners: Dict[str, List[int]] = {}
+        for category, words in keywords.items():
+            for word in words:
+                ids = owners.setdefault(word, []) if word else None
+                if ids is not None and category_ids[category] not in ids:
+                    ids.append(category_ids[category])
+        for word, ids in owners.items():
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append((word, tuple(ids)))
+
+        # Breadth-first failure links: fail[s] is the state of the longest
+        # proper suffix of s's string that is also a trie prefix. A state's
+        # outputs include those of its failure state.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                if state:  # children of the root fail to the root
+                    back = fail[state]
+                    while back and ch not in goto[back]:
+                        back = fail[back]
+                    fail[nxt] = goto[back].get(ch, 0)
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+                queue.append(nxt)
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [tuple(o) for o in outputs]
+        self._counts = [tuple(i for _, ids in o for i in ids) for o in outputs]
+        self.keyword_count = len(owners)
+
+    @classmethod
+    def from_reference(cls, path: Path = REFERENCE_FILE,
+                       extra: Optional[Dict[str, Iterable[str]]] = None,
+                       exclude: Iterable[str] = ()) -> 'KeywordIndex':
+        """Index the reference keywords, plus extra ones, minus excluded words."""
+        keywords = load_reference_keywords(path)
+        for category, words in (extra or {}).items():
+            merged = keywords.setdefault(category, [])
+            merged.extend(w for w in words if w not in merged)
+        excluded = set(exclude)
+        return cls({c: [w for w in words if w not in excluded] for c, words in keywords.items()})
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str, Tuple[str, ...]]]:
+        """Yield (end offset, keyword, categories) for every keyword occurrence."""
+        goto, fail, outputs, categories = self._goto, self._fail, self._outputs, self.categories
+        state = 0
+        for pos, ch in enumerate(text):
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            for word, ids in outputs[state]:
+                yield pos + 1, word, tuple(categories[i] for i in ids)
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Keyword hits per category."""
+        goto, fail, hits = self._goto, self._fail, self._counts
+        totals = [0] * len(self.categories)
+        state = 0
+        for ch in text:
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            for i in hits[state]:
+                totals[i] += 1
+        return dict(zip(self.categories, totals))
+
+    def contains_any(self, text: str) -> bool:
+        """Whether text contains at least one keyword."""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for ch in text:
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if outputs[state]:
+                return True
+        return False
+
+    def classify(self, text: str, priority: Optional[List[str]] = None) -> Optional[str]:
+        """Category with the most hits (ties go to the earliest in priority), or None."""
+        counts = self.counts(text)
+        best = max(counts.values(), default=0)
+        if not best:
+            return None
+        return next(c for c in (priority or self.categories) if counts.get(c) == best)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Batch Contract Parser
+Parses a whole corpus of contracts on a process pool, reusing one
+ContractParser per worker, and writes a per-file manifest.
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from parse_contract import PACKS_DIR, ContractParser
+
+_parser: Optional[ContractParser] = None
+
+
+def _init_worker(auto_packs: bool) -> None:
+    global _parser
+    _parser = ContractParser(auto_packs=auto_packs)
+
+
+def _parse_one(job: Tuple[str, str]) -> Dict:
+    input_file, output_file = job
+    start = time.perf_counter()
+    entry = {"input": input_file, "output": output_file}
+    try:
+        _parser.parse(input_file, output_file)
+        entry["status"] = "ok"
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    entry["seconds"] = round(time.perf_counter() - start, 6)
+    return entry
+
+
+def collect_inputs(sources: Iterable[str], pattern: str = '*.md') -> List[Path]:
+    """Expand directories, glob patterns, files and @file-lists into input paths."""
+    found = []
+    for source in sources:
+        if source.startswith('@'):
+            with open(source[1:], 'r', encoding='utf-8') as f:
+                found.extend(Path(l.strip()) for l in f if l.strip())
+        elif os.path.isdir(source):
+            found.extend(sorted(Path(source).rglob(pattern)))
+        elif glob.has_magic(source):
+            found.extend(Path(p) for p in sorted(glob.glob(source, recursive=True)))
+        else:
+            found.append(Path(source))
+
+    seen = set()
+    unique = []
+    for path in found:
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+
+def output_paths(inputs: List[Path], output_dir: Path) -> List[Path]:
+    """Name outputs <stem>-clauses.json, numbering stems that occur more than
+    once (<stem>-1, <stem>-2, ...) with numbers no other input is named after."""
+    reserved = {input_file.stem for input_file in inputs}
+    assigned: Set[str] = set()
+    outputs = []
+    for input_file in inputs:
+        stem = input_file.stem
+        if stem in assigned:
+            count = 1
+            while f"{input_file.stem}-{count}" in reserved or f"{input_file.stem}-{count}" in assigned:
+                count += 1
+            stem = f"{input_file.stem}-{count}"
+        assigned.add(stem)
+        outputs.append(output_dir / f"{stem}-clauses.json")
+    return outputs
+
+
+def parse_batch(inputs: List[Path], output_dir: Path, workers: Optional[int] = None,
+                chunksize: int = 8, auto_packs: bool = False) -> List[Dict]:
+    """Parse every input on a process pool and return the manifest entries.
+    With auto_packs, each contract also gets the matching packs' styles."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(str(i), str(o)) for i, o in zip(inputs, output_paths(inputs, output_dir))]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(auto_packs,)) as pool:
+        return list(pool.map(_parse_one, jobs, chunksize=chunksize))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parse many contracts in parallel.")
+    arg_parser.add_argument('inputs', nargs='+',
+                            help="directories, glob patterns, files, or @file listing one path per line")
+    arg_parser.add_argument('-o', '--output-dir', required=True, help="directory for *-clauses.json files")
+    arg_parser.add_argument('-j', '--workers', type=int, default=None,
+                            help="worker processes (default: number of CPUs)")
+    arg_parser.add_argument('--chunksize', type=int, default=8, help="files handed to a worker at a time")
+    arg_parser.add_argument('--pattern', default='*.md', help="file pattern used inside directories")
+    arg_parser.add_argument('--auto-packs', action='store_true',
+                            help=f"also use the packs in {PACKS_DIR.name}/ whose fingerprint matches each contract")
+    arg_parser.add_argument('--manifest', default=None,
+                            help="manifest path (default: <output-dir>/manifest.json)")
+    args = arg_parser.parse_args()
+
+    inputs = collect_inputs(args.inputs, args.pattern)
+    if not inputs:
+        print("No input files found.")
+        sys.exit(1)
+
+    output_dir = Path(args.output_dir)
+    start = time.perf_counter()
+    entries = parse_batch(inputs, output_dir, args.workers, args.chunksize, args.auto_packs)
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for e in entries if e["status"] != "ok")
+    manifest = {
+        "files": len(entries),
+        "succeeded": len(entries) - failed,
+        "failed": failed,
+        "seconds": round(elapsed, 6),
+        "entries": entries,
+    }
+    manifest_file = Path(args.manifest) if args.manifest else output_dir / 'manifest.json'
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    print(f"Parsed {len(entries) - failed}/{len(entries)} contracts in {elapsed:.2f}s, "
+          f"manifest written to {manifest_file}")
+    if failed:
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Heading classifier micro-benchmark
+Compares ContractParser.get_heading_level, and the StyleMatcher that
+iter_clauses specialises from the detected styles, against the original
+pattern-by-pattern loop on every non-blank line of the given contracts.
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from parse_contract import ContractParser, StyleMatcher
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[3] / 'data' / 'contract-samples'
+
+LEGACY_PATTERNS = [
+    (re.compile(r'^##\s*(第[一二三四五六七八九十百千万\d]+[部分章节条])'), 'part'),
+    (re.compile(r'^(第[一二三四五六七八九十百千万\d]+[部分章节条])'), 'part'),
+    (re.compile(r'^([一二三四五六七八九十]+、)'), 'chinese_num'),
+    (re.compile(r'^(\d+\.)(?!\d)'), 'arabic_dot'),
+    (re.compile(r'^([①②③④⑤⑥⑦⑧⑨⑩]+)'), 'circled_num'),
+    (re.compile(r'^(\d+\.\d+)(?!\d)'), 'subsection'),
+    (re.compile(r'^(\d+\.\d+\.\d+)(?!\d)'), 'subsubsection'),
+]
+
+
+def legacy_heading_level(line: str) -> Optional[Tuple[int, str]]:
+    """The original sequential implementation, kept as the reference."""
+    for pattern, style_name in LEGACY_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            heading_text = match.group(1)
+
+            if style_name == 'part':
+                if '部分' in heading_text:
+                    return (1, heading_text)
+                elif '章' in heading_text:
+                    return (2, heading_text)
+                elif '节' in heading_text:
+                    return (3, heading_text)
+                elif '条' in heading_text:
+                    return (1, heading_text)
+            elif style_name == 'chinese_num':
+                return (2, heading_text)
+            elif style_name == 'arabic_dot':
+                num = int(heading_text.rstrip('.'))
+                return (2, heading_text) if num <= 10 else (3, heading_text)
+            elif style_name == 'subsection':
+                return (2, heading_text)
+            elif style_name == 'subsubsection':
+                return (3, heading_text)
+            elif style_name == 'circled_num':
+                return (3, heading_text)
+
+    return None
+
+
+def load_lines(paths: List[Path]) -> List[str]:
+    lines = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines.extend(l.strip() for l in f.read().split('\n') if l.strip())
+    return lines
+
+
+def time_per_line(func, lines: List[str], rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for line in lines:
+            func(line)
+        best = min(best, time.perf_counter() - start)
+    return best / len(lines) * 1e9
+
+
+def main():
+    paths = [Path(p) for p in sys.argv[1:]] or sorted(DEFAULT_CORPUS.glob('*.md'))
+    lines = load_lines(paths)
+    if not lines:
+        print("No input lines found.")
+        sys.exit(1)
+
+    parser = ContractParser()
+    parser.detect_style(lines)
+    matcher = StyleMatcher(parser, parser.style_profile)
+    mismatches = [l for l in lines
+                  if not parser.get_heading_level(l) == matcher(l) == legacy_heading_level(l)]
+    if mismatches:
+        print(f"{len(mismatches)} lines classified differently, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+
+    headings = sum(1 for l in lines if legacy_heading_level(l))
+    legacy_ns = time_per_line(legacy_heading_level, lines, rounds=20)
+    single_ns = time_per_line(parser.get_heading_level, lines, rounds=20)
+    matcher_ns = time_per_line(matcher, lines, rounds=20)
+
+    print(f"files: {len(paths)}  lines: {len(lines)}  headings: {headings}")
+    print(f"legacy loop:       {legacy_ns:8.1f} ns/line")
+    print(f"single-match:      {single_ns:8.1f} ns/line")
+    print(f"style matcher:     {matcher_ns:8.1f} ns/line")
+    print(f"speedup:           {legacy_ns / single_ns:8.2f}x single-match, {legacy_ns / matcher_ns:.2f}x matcher")
+    print(f"matcher: {matcher.stats()}")
+
+
+if __name__ == '__main__':
+    main()
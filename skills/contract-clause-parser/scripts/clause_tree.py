@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Clause Tree
+In-memory index over parsed clauses: one node per heading path, linked
+to its parent and children, with a dict from full path to node. Path
+lookup is O(1); a subtree ("everything under 第五章") or a range of
+sections comes back in document order, as a plain slice of the clause
+list whenever the clauses under a node are contiguous, which is the
+normal case.
+"""
+
+import sys
+import json
+import argparse
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from parse_contract import BinaryClauseWriter, ContractParser, load_clauses
+
+
+class ClauseNode:
+    """One heading path. clauses holds the indices of the clauses at
+    exactly this path; first/last/count cover the whole subtree."""
+
+    __slots__ = ('segment', 'path', 'parent', 'children', 'clauses', 'first', 'last', 'count')
+
+    def __init__(self, segment: str, path: str, parent: Optional['ClauseNode']):
+        self.segment = segment
+        self.path = path
+        self.parent = parent
+        self.children: Dict[str, 'ClauseNode'] = {}
+        self.clauses: List[int] = []
+        self.first = -1
+        self.last = -1
+        self.count = 0
+
+    def __repr__(self):
+        return f"ClauseNode({self.path!r}, clauses={len(self.clauses)}, subtree={self.count})"
+
+
+class ClauseTree:
+    """Clauses indexed by heading path, in document order."""
+
+    def __init__(self, clauses: Iterable[Dict] = ()):
+        self.clauses: List[Dict] = []
+        self.nodes: Dict[str, ClauseNode] = {}
+        self._by_segment: Dict[str, List[ClauseNode]] = {}
+        for clause in clauses:
+            self.add(clause)
+
+    @classmethod
+    def build(cls, lines: Iterable[str], parser: Optional[ContractParser] = None,
+              with_spans: bool = False) -> 'ClauseTree':
+        """Parse lines straight into a tree."""
+        parser = parser or ContractParser()
+        return cls(parser.iter_clauses(lines, with_spans=with_spans))
+
+    @classmethod
+    def load(cls, path: str) -> 'ClauseTree':
+        """Tree over a clause file in any of parse_contract.py's output formats."""
+        return cls(load_clauses(path))
+
+    def save(self, path: str) -> None:
+        """Write the clauses in the binary format (the fastest to load back)."""
+        spans = bool(self.clauses) and 'start_line' in self.clauses[0]
+        with open(path, 'wb') as f:
+            writer = BinaryClauseWriter(f, spans=spans)
+            for clause in self.clauses:
+                writer.write(clause)
+            writer.close()
+
+    def _node(self, path: str) -> ClauseNode:
+        node = self.nodes.get(path)
+        if node is None:
+            parent_path, _, segment = path.rpartition('/')
+            parent = self._node(parent_path) if parent_path else None
+            node = self.nodes[path] = ClauseNode(segment, path, parent)
+            if parent is not None:
+                parent.children[segment] = node
+            self._by_segment.setdefault(segment, []).append(node)
+        return node
+
+    def add(self, clause: Dict) -> ClauseNode:
+        """Append a clause (the next one in document order)."""
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        node = self._node(clause['path'])
+        node.clauses.append(index)
+        ancestor = node
+        while ancestor is not None:
+            if ancestor.first < 0:
+                ancestor.first = index
+            ancestor.last = index
+            ancestor.count += 1
+            ancestor = ancestor.parent
+        return node
+
+    def __len__(self) -> int:
+        return len(self.clauses)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.nodes
+
+    def __getitem__(self, path: str) -> ClauseNode:
+        return self.nodes[path]
+
+    def get(self, path: str) -> Optional[ClauseNode]:
+        return self.nodes.get(path)
+
+    def resolve(self, path: str) -> List[ClauseNode]:
+        """Nodes a query path refers to: the full path ('~/第五章'), the same
+        without the root ('第五章/5.1'), or else every node whose last
+        segment it is."""
+        for candidate in (path, '~/' + path):
+            node = self.nodes.get(candidate)
+            if node is not None:
+                return [node]
+        return list(self._by_segment.get(path, ()))
+
+    def at(self, path: str) -> List[Dict]:
+        """Clauses whose path is exactly path."""
+        node = self.nodes.get(path)
+        return [self.clauses[i] for i in node.clauses] if node else []
+
+    def children(self, path: str) -> List[str]:
+        node = self.nodes.get(path)
+        return [child.path for child in node.children.values()] if node else []
+
+    def subtree(self, path: str) -> List[Dict]:
+        """Clauses at path and below it, in document order."""
+        return [self.clauses[i] for i in self.subtree_indices(path)]
+
+    def subtree_indices(self, path: str) -> Iterable[int]:
+        """Indices into clauses of the subtree at path, ascending."""
+        node = self.nodes.get(path)
+        if node is None or not node.count:
+            return ()
+        if node.last - node.first + 1 == node.count:
+            return range(node.first, node.last + 1)
+        # A path that recurs later in the document: collect and sort
+        indices = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            indices.extend(current.clauses)
+            stack.extend(current.children.values())
+        indices.sort()
+        return indices
+
+    def range(self, start: str, end: str) -> List[Dict]:
+        """Clauses from the first one under start to the last one under end."""
+        first, last = self.nodes.get(start), self.nodes.get(end)
+        if first is None or last is None or not first.count or not last.count:
+            return []
+        return self.clauses[first.first:last.last + 1]
+
+    def walk(self, path: str = '~') -> Iterator[ClauseNode]:
+        """Nodes of a subtree, depth first in heading order."""
+        node = self.nodes.get(path)
+        stack = [node] if node else []
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(reversed(list(current.children.values())))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Query parsed clauses by heading path.")
+    arg_parser.add_argument('clauses_file', help="output of parse_contract.py (any --format)")
+    arg_parser.add_argument('path', nargs='?', default='~',
+                            help="heading path, with or without '~/', or a bare heading such as 第五章")
+    query = arg_parser.add_mutually_exclusive_group()
+    query.add_argument('--children', action='store_true', help="list the child paths instead of clauses")
+    query.add_argument('--exact', action='store_true', help="only clauses at exactly this path")
+    query.add_argument('--to', metavar='PATH',
+                       help="every clause from the first one under path through the last one under PATH")
+    args = arg_parser.parse_args()
+
+    tree = ClauseTree.load(args.clauses_file)
+    nodes = tree.resolve(args.path)
+    if not nodes:
+        sys.exit(f"No clauses under {args.path}")
+
+    if args.to:
+        ends = tree.resolve(args.to)
+        if not ends:
+            sys.exit(f"No clauses under {args.to}")
+        result = tree.range(nodes[0].path, ends[-1].path)
+    elif args.children:
+        result = [path for node in nodes for path in tree.children(node.path)]
+    elif args.exact:
+        result = [clause for node in nodes for clause in tree.at(node.path)]
+    else:
+        result = [clause for node in nodes for clause in tree.subtree(node.path)]
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Incremental Contract Parser
+Re-parses an edited contract starting from the clause containing the first
+changed line, and stops as soon as parsing is back in step with the
+previous result past the last changed line; clauses outside that window
+are reused with their line spans shifted.
+"""
+
+import sys
+import json
+import argparse
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from parse_contract import ContractParser
+
+# Packs and the heading style are chosen from this many leading lines
+STYLE_HEAD_LINES = 100
+
+
+class IncrementalParser:
+    """Keeps the text and clauses (with spans) of the last parsed version."""
+
+    def __init__(self, parser: Optional[ContractParser] = None):
+        self.parser = parser or ContractParser()
+        self.text = ''
+        self.clauses: List[Dict] = []
+
+    def parse(self, text: str) -> List[Dict]:
+        """Parse text from scratch and remember it as the current version."""
+        self.text = text
+        self.clauses = list(self.parser.iter_clauses(text.split('\n'), with_spans=True))
+        return self.clauses
+
+    def update(self, text: str) -> Dict[str, List[str]]:
+        """Switch to an edited version of the text, re-parsing only what changed.
+
+        Returns the clause paths that were "added", "removed" or "modified".
+        """
+        old_text = self.text
+        old = self.clauses
+        if text == old_text:
+            return {"added": [], "removed": [], "modified": []}
+
+        prefix, old_stop, new_stop = changed_region(old_text, text)
+        if prefix < STYLE_HEAD_LINES and self.parser.auto_packs:
+            # The edit may change which packs are selected, and with them
+            # how every line parses
+            return diff_clauses(old, self.parse(text))
+        line_shift = text.count('\n') - old_text.count('\n')
+        char_shift = len(text) - len(old_text)
+
+        # Restart at the heading of the clause holding the first changed line,
+        # in the heading path left by the clause before it. If that heading
+        # is itself edited it may no longer be one, so start a clause earlier.
+        first = bisect_right(old, prefix, key=_start_line) - 1
+        if first >= 0 and old[first]['start_line'] == prefix:
+            first -= 1
+        if first < 0:
+            first, restart_line, restart_char, path = 0, 0, 0, []
+        else:
+            restart_line = old[first]['start_line']
+            restart_char = old[first]['char_start']
+            path = _path_list(old[first - 1]['path']) if first > 0 else []
+
+        fresh: List[Dict] = []
+        resume = len(old)
+        previous_path = '/'.join([self.parser.root_path] + path)
+
+        # Packs and the style come from the head of the document, as in parse()
+        style_lines = islice(_iter_lines(text, 0), STYLE_HEAD_LINES)
+        for clause in self.parser.iter_clauses(_iter_lines(text, restart_char), with_spans=True, path=path,
+                                               first_line=restart_line, first_char=restart_char,
+                                               style_lines=style_lines):
+            # Past the edit, a heading reached in the same path state as
+            # before means everything from here on parses as it did before
+            if clause['start_line'] >= new_stop:
+                match = _clause_starting_at(old, clause['start_line'] - line_shift)
+                if match is not None:
+                    before = old[match - 1]['path'] if match else self.parser.root_path
+                    if before == previous_path:
+                        resume = match
+                        break
+            fresh.append(clause)
+            previous_path = clause['path']
+
+        reused = old[resume:]
+        if line_shift or char_shift:
+            reused = [dict(c, start_line=c['start_line'] + line_shift, end_line=c['end_line'] + line_shift,
+                           char_start=c['char_start'] + char_shift, char_end=c['char_end'] + char_shift)
+                      for c in reused]
+        replaced = old[first:resume]
+
+        self.text = text
+        self.clauses = old[:first] + fresh + reused
+        return diff_clauses(replaced, fresh)
+
+
+def changed_region(old: str, new: str, block: int = 4096) -> Tuple[int, int, int]:
+    """Line numbers bounding the edit: (lines unchanged at the start, end of
+    the change in old, end of the change in new). Texts are compared a block
+    at a time, so unchanged stretches cost a memcmp rather than a line split.
+    """
+    limit = min(len(old), len(new))
+    head = 0
+    while head < limit and old[head:head + block] == new[head:head + block]:
+        head += block
+    while head < limit and old[head] == new[head]:
+        head += 1
+    head = min(head, limit)
+
+    tail = 0
+    room = limit - head
+    while tail + block <= room and old[len(old) - tail - block:len(old) - tail] == \
+            new[len(new) - tail - block:len(new) - tail]:
+        tail += block
+    while tail < room and old[len(old) - tail - 1] == new[len(new) - tail - 1]:
+        tail += 1
+
+    # Only lines lying wholly inside the common prefix/suffix count as unchanged
+    prefix = old.count('\n', 0, head)
+    suffix = old.count('\n', len(old) - tail)
+    return prefix, old.count('\n') + 1 - suffix, new.count('\n') + 1 - suffix
+
+
+def _iter_lines(text: str, start: int) -> Iterator[str]:
+    """Lines of text from offset start on, like text[start:].split('\\n') but lazily."""
+    while True:
+        end = text.find('\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def diff_clauses(before: List[Dict], after: List[Dict]) -> Dict[str, List[str]]:
+    """Compare two runs of clauses by path; repeated paths pair up in order."""
+    def keyed(clauses):
+        seen: Dict[str, int] = {}
+        result = {}
+        for c in clauses:
+            n = seen.get(c['path'], 0)
+            seen[c['path']] = n + 1
+            result[(c['path'], n)] = c['clause']
+        return result
+
+    old, new = keyed(before), keyed(after)
+    return {
+        "added": [path for path, n in new if (path, n) not in old],
+        "removed": [path for path, n in old if (path, n) not in new],
+        "modified": [path for path, n in new if (path, n) in old and old[path, n] != new[path, n]],
+    }
+
+
+def _start_line(clause: Dict) -> int:
+    return clause['start_line']
+
+
+def _clause_starting_at(clauses: List[Dict], line: int) -> Optional[int]:
+    i = bisect_left(clauses, line, key=_start_line)
+    if i < len(clauses) and clauses[i]['start_line'] == line:
+        return i
+    return None
+
+
+def _path_list(path: str) -> List[str]:
+    """Heading path of a clause without the root, e.g. '~/第一条/1.1' -> ['第一条', '1.1']."""
+    return path.split('/')[1:]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Re-parse an edited contract incrementally.")
+    arg_parser.add_argument('old_file', help="previous version of the contract")
+    arg_parser.add_argument('new_file', help="edited version of the contract")
+    arg_parser.add_argument('output_file', help="clauses of the edited version (with spans)")
+    args = arg_parser.parse_args()
+
+    with open(args.old_file, 'r', encoding='utf-8') as f:
+        old_text = f.read()
+    with open(args.new_file, 'r', encoding='utf-8') as f:
+        new_text = f.read()
+
+    incremental = IncrementalParser()
+    incremental.parse(old_text)
+    changes = incremental.update(new_text)
+
+    with open(args.output_file, 'w', encoding='utf-8') as f:
+        json.dump(incremental.clauses, f, ensure_ascii=False, indent=2)
+    sys.stdout.reconfigure(encoding='utf-8')
+    print(json.dumps(changes, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
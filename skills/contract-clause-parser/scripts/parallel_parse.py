@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Parallel Contract Parser
+Parses one large contract on several cores. A level-1 heading (第X条 in
+the built-in styles) resets the heading path, so the text after it
+parses the same whether or not the parser has seen what came before.
+The text is cut at level-1 headings near evenly spaced offsets, the
+pieces are parsed on a process pool and their clauses are put back in
+order, identical to a sequential parse.
+
+Workers also serialize their clauses for the JSON output formats, so
+the parent only concatenates bytes. Where processes fork, workers read
+their piece from the inherited text instead of having it pickled to them.
+"""
+
+import json
+import os
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from parse_contract import OUTPUT_FORMATS, PACKS_DIR, ContractParser, _open_binary, _open_text, _stream_clauses
+
+# Below this many characters per chunk, starting workers and moving
+# results between processes cost more than the parallel parse saves
+MIN_CHUNK_CHARS = 256 * 1024
+CHUNKS_PER_WORKER = 4
+
+_parser: Optional[ContractParser] = None
+_text: Optional[str] = None  # set in the parent before forking
+
+
+def _init_worker(styles: List[Tuple[str, str, Optional[str]]], levels: Dict[str, int]) -> None:
+    global _parser
+    _parser = ContractParser()
+    _parser._use_styles(list(styles), dict(levels))
+
+
+def _encode(clauses: List[Dict], output_format: str) -> bytes:
+    """A chunk's share of the output file: its part of the JSON array
+    (without brackets), or its JSON Lines."""
+    if output_format == 'jsonl':
+        return ''.join(json.dumps(c, ensure_ascii=False) + '\n' for c in clauses).encode('utf-8')
+    if not clauses:
+        return b''
+    if output_format == 'json':
+        # '[\n  {...},\n  {...}\n]' -> the elements, still indented
+        return json.dumps(clauses, ensure_ascii=False, indent=2)[2:-2].encode('utf-8')
+    return json.dumps(clauses, ensure_ascii=False, separators=(',', ':'))[1:-1].encode('utf-8')
+
+
+def _parse_chunk(job: Tuple[Optional[str], int, int, int, bool, Optional[str]]):
+    text, start, stop, first_line, with_spans, output_format = job
+    if text is None:
+        text = _text[start:stop]
+    clauses = list(_parser.iter_clauses(text.split('\n'), with_spans=with_spans,
+                                        first_line=first_line, first_char=start))
+    return clauses if output_format is None else _encode(clauses, output_format)
+
+
+def split_points(text: str, parser: ContractParser, chunks: int) -> List[int]:
+    """Offsets where chunks start: 0, then for each of the chunks - 1 evenly
+    spaced targets the first level-1 heading line at or after it, if one
+    starts before the next target."""
+    points = [0]
+    size = len(text)
+    for k in range(1, chunks):
+        pos = text.find('\n', size * k // chunks - 1)
+        limit = size * (k + 1) // chunks
+        while 0 <= pos < limit:
+            pos += 1
+            end = text.find('\n', pos)
+            stripped = text[pos:end if end >= 0 else size].strip()
+            if stripped:
+                heading = parser.get_heading_level(stripped)
+                if heading is not None and heading[0] == 1:
+                    points.append(pos)
+                    break
+            pos = end
+    return points
+
+
+def _plan(text: str, parser: ContractParser, workers: int) -> List[Tuple[int, int, int]]:
+    """(start, stop, first line) of each chunk; a single chunk when the
+    text is too small or has no level-1 heading to cut at."""
+    chunks = min(workers * CHUNKS_PER_WORKER, len(text) // MIN_CHUNK_CHARS)
+    if workers < 2 or chunks < 2:
+        return [(0, len(text), 0)]
+
+    # Styles are chosen from the head of the whole document, as in a
+    # sequential parse, and every worker gets the same ones
+    end = -1
+    for _ in range(100):
+        end = text.find('\n', end + 1)
+        if end < 0:
+            break
+    head = (text if end < 0 else text[:end]).split('\n')
+    if parser.auto_packs:
+        parser.select_styles(head)
+    parser.style_detected = parser.detect_style(head)
+
+    points = split_points(text, parser, chunks)
+    plan = []
+    first_line = 0
+    for start, stop in zip(points, points[1:] + [len(text) + 1]):
+        plan.append((start, stop - 1, first_line))
+        first_line += text.count('\n', start, stop)
+    return plan
+
+
+def _run(text: str, parser: ContractParser, workers: Optional[int], with_spans: bool,
+         output_format: Optional[str]) -> Iterator:
+    """Results of _parse_chunk for each chunk, in document order."""
+    global _text
+    workers = workers or os.cpu_count() or 1
+    plan = _plan(text, parser, workers)
+    if len(plan) == 1:
+        clauses = list(parser.iter_clauses(text.split('\n'), with_spans=with_spans))
+        yield clauses if output_format is None else _encode(clauses, output_format)
+        return
+
+    forking = 'fork' in multiprocessing.get_all_start_methods()
+    jobs = [(None if forking else text[start:stop], start, stop, first_line, with_spans, output_format)
+            for start, stop, first_line in plan]
+    if forking:
+        _text = text
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                 mp_context=multiprocessing.get_context('fork') if forking else None,
+                                 initializer=_init_worker,
+                                 initargs=(parser.heading_classifier.styles, parser.document_levels)) as pool:
+            yield from pool.map(_parse_chunk, jobs)
+    finally:
+        _text = None
+
+
+def iter_clauses_parallel(text: str, parser: Optional[ContractParser] = None,
+                          workers: Optional[int] = None, with_spans: bool = False) -> Iterator[Dict]:
+    """Yield the clauses of text as parser.iter_clauses(text.split('\\n'))
+    would, parsing chunks of it on workers processes (default: one per CPU)."""
+    for clauses in _run(text, parser or ContractParser(), workers, with_spans, None):
+        yield from clauses
+
+
+def parse_parallel(text: str, output_file: str, output_format: str = 'json',
+                   parser: Optional[ContractParser] = None, workers: Optional[int] = None) -> None:
+    """Parse text into output_file ('-' for stdout) in any of parse_contract.py's
+    formats, byte for byte as ContractParser.parse writes them."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown output format {output_format!r}")
+    parser = parser or ContractParser()
+    if output_format == 'binary':
+        # The path table is shared by the whole file, so records are
+        # written here from the workers' clauses
+        _stream_clauses(iter_clauses_parallel(text, parser, workers), output_file, output_format)
+        return
+
+    fragments = _run(text, parser, workers, False, output_format)
+    with _open_binary(output_file) as out:
+        if output_format == 'jsonl':
+            for fragment in fragments:
+                out.write(fragment)
+            return
+        opening, separator, closing = (b'[\n', b',\n', b'\n]') if output_format == 'json' else (b'[', b',', b']')
+        written = False
+        for fragment in fragments:
+            if fragment:
+                out.write(separator if written else opening)
+                out.write(fragment)
+                written = True
+        out.write(closing if written else b'[]')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parse one large contract on several cores.")
+    arg_parser.add_argument('input_file', help="contract text file, or - for stdin")
+    arg_parser.add_argument('output_file', help="output file, or - for stdout")
+    arg_parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    arg_parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='json',
+                            help="output format, as for parse_contract.py (default: %(default)s)")
+    arg_parser.add_argument('--pack', action='append', default=[],
+                            help="pattern pack (YAML/JSON) with extra heading styles; may be repeated")
+    arg_parser.add_argument('--auto-packs', action='store_true',
+                            help=f"also use the packs in {PACKS_DIR.name}/ whose fingerprint matches the contract")
+    args = arg_parser.parse_args()
+
+    parser = ContractParser(auto_packs=args.auto_packs)
+    for pack in args.pack:
+        parser.load_reference_patterns(pack)
+    with _open_text(args.input_file, 'r') as f:
+        text = f.read()
+
+    parse_parallel(text, args.output_file, args.output_format, parser, args.workers)
+    if args.output_file != '-':
+        print("Contract parsed successfully.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,93 +1,325 @@
+import io
+import os
 import re
+import sys
 import json
-from typing import List, Dict, Tuple, Optional
+import mmap
+import struct
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from array import array
+from itertools import accumulate, chain, islice
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, TextIO, BinaryIO, Union
 from pathlib import Path
 
+from pattern_packs import FINGERPRINT_LINES, available_packs, load_pattern_pack, select_packs
+from phase_profiler import CountingPattern, PhaseProfiler
+
+# Domain pattern packs shipped with the skill
+PACKS_DIR = Path(__file__).resolve().parent.parent / 'references' / 'packs'
+
+CHINESE_DIGITS = '一二三四五六七八九十'
+CIRCLED_DIGITS = '①②③④⑤⑥⑦⑧⑨⑩'
+ASCII_DIGITS = '0123456789'
+
+# (pattern, style, leading characters) in priority order. Each pattern has
+# exactly one capture group holding the heading text; leading characters
+# list every character a matching line can start with (None = any).
+HEADING_STYLES = [
+    # Markdown格式 ## 第一条
+    (r'##\s*(第[一二三四五六七八九十百千万\d]+[部分章节条])', 'part', '#'),
+    # 第xx部分/章/节/条
+    (r'(第[一二三四五六七八九十百千万\d]+[部分章节条])', 'part', '第'),
+    # 中文数字 一、二、三、
+    (r'([一二三四五六七八九十]+、)', 'chinese_num', CHINESE_DIGITS),
+    # 阿拉伯数字 1. 2. 3.
+    (r'(\d+\.)(?!\d)', 'arabic_dot', ASCII_DIGITS),
+    # 圆圈数字 ①②③
+    (r'([①②③④⑤⑥⑦⑧⑨⑩]+)', 'circled_num', CIRCLED_DIGITS),
+    # 小节 1.1 1.2 1.3
+    (r'(\d+\.\d+)(?!\d)', 'subsection', ASCII_DIGITS),
+    # 更深层次 1.1.1 1.1.2
+    (r'(\d+\.\d+\.\d+)(?!\d)', 'subsubsection', ASCII_DIGITS),
+]
+
+# Level by the last character of a 'part' heading. '部'/'分' never resolve
+# because the suffix class matches a single character.
+PART_LEVELS = {'章': 2, '节': 3, '条': 1}
+
+STYLE_LEVELS = {
+    'chinese_num': 2,
+    'subsection': 2,
+    'subsubsection': 3,
+    'circled_num': 3,
+}
+
+
+class HeadingClassifier:
+    """Classify a line against all heading styles with a single match.
+
+    Styles are grouped by the characters they can start with, and each
+    group is compiled into one alternation that keeps the priority order.
+    A line therefore costs one dict lookup on its first character and at
+    most one regex match; the capture group that participated tells which
+    style won.
+    """
+
+    def __init__(self, styles: List[Tuple[str, str, Optional[str]]]):
+        self.styles = list(styles)
+        self.patterns = [re.compile('^' + src) for src, _, _ in self.styles]
+
+        generic = [i for i, (_, _, leads) in enumerate(self.styles) if leads is None]
+        by_lead: Dict[str, List[int]] = {}
+        for i, (_, _, leads) in enumerate(self.styles):
+            for ch in leads or '':
+                by_lead.setdefault(ch, []).append(i)
+
+        self._dispatch = {
+            ch: self._compile(sorted(set(indices) | set(generic)))
+            for ch, indices in by_lead.items()
+        }
+        self._default = self._compile(generic) if generic else None
+        # \d also matches non-ASCII decimal digits (e.g. fullwidth １)
+        self._decimal = self._dispatch.get('0', self._default)
+
+    def _compile(self, indices: List[int]) -> Tuple[re.Pattern, Tuple[int, ...]]:
+        alternation = '|'.join('(?:%s)' % self.styles[i][0] for i in indices)
+        return re.compile('^(?:%s)' % alternation), tuple(indices)
+
+    def match(self, line: str) -> Optional[Tuple[int, str, str]]:
+        """Return (style index, style name, heading text) of the first matching style."""
+        if not line:
+            return None
+
+        entry = self._dispatch.get(line[0])
+        if entry is None:
+            entry = self._decimal if line[0].isdecimal() else self._default
+            if entry is None:
+                return None
+
+        regex, indices = entry
+        match = regex.match(line)
+        if not match:
+            return None
+
+        index = indices[match.lastindex - 1]
+        return index, self.styles[index][1], match.group(match.lastindex)
+
+
+# Sentinels for the levels that depend on the heading text rather than
+# the style, by style name
+_PART_LEVEL = object()
+_ARABIC_LEVEL = object()
+_TEXT_LEVELS = {'part': _PART_LEVEL, 'arabic_dot': _ARABIC_LEVEL}
+
+
+class StyleMatcher:
+    """get_heading_level specialised for one document.
+
+    Built after detect_style from the classifier's dispatch table, with
+    each alternative's level (or how to derive it from the heading text)
+    resolved up front, so a line costs a single call. Styles that the
+    first 100 lines never showed stay in the table, in priority order,
+    since the output must not change. (Trying the seen ones first in an
+    alternation of their own was slower: non-heading lines then fail two
+    matches.) A heading of an unseen style is counted in `unseen`, and a
+    match that resolves no level (e.g. 第一部) falls back to the parser's
+    priority-order scan and is counted in `fallbacks`.
+    """
+
+    def __init__(self, parser: 'ContractParser', profile: Dict[str, int]):
+        classifier = parser.heading_classifier
+        self.parser = parser
+        self.profile = dict(profile)
+        self.unseen = 0
+        self.fallbacks = 0
+
+        def entry(compiled):
+            if compiled is None:
+                return None
+            regex, indices = compiled
+            levels, seen = [], []
+            for i in indices:
+                style_name = classifier.styles[i][1]
+                levels.append(_TEXT_LEVELS.get(style_name) or parser.document_levels.get(style_name))
+                seen.append(style_name in self.profile)
+            return regex.match, tuple(levels), tuple(seen)
+
+        self._table = {ch: entry(compiled) for ch, compiled in classifier._dispatch.items()}
+        self._decimal = entry(classifier._decimal)
+        self._default = entry(classifier._default)
+
+    def __call__(self, line: str) -> Optional[Tuple[int, str]]:
+        """(level, heading text) of a stripped, non-blank line, or None."""
+        entry = self._table.get(line[0])
+        if entry is None:
+            entry = self._decimal if line[0].isdecimal() else self._default
+            if entry is None:
+                return None
+
+        match = entry[0](line)
+        if match is None:
+            return None
+
+        k = match.lastindex
+        heading_text = match.group(k)
+        if not entry[2][k - 1]:
+            self.unseen += 1
+        level = entry[1][k - 1]
+        if level is _PART_LEVEL:
+            level = PART_LEVELS.get(heading_text[-1])
+        elif level is _ARABIC_LEVEL:
+            level = 2 if int(heading_text.rstrip('.')) <= 10 else 3
+        if level is not None:
+            return level, heading_text
+
+        self.fallbacks += 1
+        return self.parser.get_heading_level(line)
+
+    def stats(self) -> Dict:
+        return {"profile": self.profile, "unseen": self.unseen, "fallbacks": self.fallbacks}
+
+
+class _CountingStyleMatcher(StyleMatcher):
+    """StyleMatcher that counts its heading regex evaluations in a profiler."""
+
+    def __init__(self, parser: 'ContractParser', profile: Dict[str, int], profiler: 'PhaseProfiler'):
+        super().__init__(parser, profile)
+        self._profiler = profiler
+
+    def __call__(self, line: str) -> Optional[Tuple[int, str]]:
+        if self._table.get(line[0]) is not None or \
+                (self._decimal if line[0].isdecimal() else self._default) is not None:
+            self._profiler.count_regex('heading')
+        return super().__call__(line)
+
+
+@lru_cache(maxsize=64)
+def _classifier_for(styles: Tuple[Tuple[str, str, Optional[str]], ...]) -> HeadingClassifier:
+    return HeadingClassifier(list(styles))
+
 
 class ContractParser:
-    def __init__(self):
-        self.heading_patterns = [
-            # Markdown格式 ## 第一条
-            (re.compile(r'^##\s*(第[一二三四五六七八九十百千万\d]+[部分章节条])'), 'part'),
-            # 第xx部分/章/节/条
-            (re.compile(r'^(第[一二三四五六七八九十百千万\d]+[部分章节条])'), 'part'),
-            # 中文数字 一、二、三、
-            (re.compile(r'^([一二三四五六七八九十]+、)'), 'chinese_num'),
-            # 阿拉伯数字 1. 2. 3.
-            (re.compile(r'^(\d+\.)(?!\d)'), 'arabic_dot'),
-            # 圆圈数字 ①②③
-            (re.compile(r'^([①②③④⑤⑥⑦⑧⑨⑩]+)'), 'circled_num'),
-            # 小节 1.1 1.2 1.3
-            (re.compile(r'^(\d+\.\d+)(?!\d)'), 'subsection'),
-            # 更深层次 1.1.1 1.1.2
-            (re.compile(r'^(\d+\.\d+\.\d+)(?!\d)'), 'subsubsection'),
-        ]
+    def __init__(self, auto_packs: bool = False, pack_dir: Union[str, Path] = PACKS_DIR,
+                 profiler: Optional[PhaseProfiler] = None):
+        """With auto_packs, each document also gets the heading styles of the
+        packs in pack_dir whose fingerprint matches its first lines. A
+        profiler collects phase timings and regex evaluation counts."""
+        self.profiler = profiler
+        self.styles = list(HEADING_STYLES)
+        self.style_levels = dict(STYLE_LEVELS)
+        self._use_styles(self.styles)
+        self.auto_packs = auto_packs
+        self.pack_dir = pack_dir
         
         self.list_patterns = [
             re.compile(r'^(\s*[(（][一二三四五六七八九十\d]+[)）])'),
             re.compile(r'^(\s*[①②③④⑤⑥⑦⑧⑨⑩]+)'),
             re.compile(r'^(\s*\d+[、.])'),
         ]
+        if profiler is not None:
+            self.list_patterns = [CountingPattern(p, 'list', profiler) for p in self.list_patterns]
         
         self.style_detected = None
+        self.style_profile: Dict[str, int] = {}
+        self.style_matcher: Optional[StyleMatcher] = None
         self.root_path = "~"
     
+    def _use_styles(self, styles: List[Tuple[str, str, Optional[str]]],
+                    levels: Optional[Dict[str, int]] = None) -> None:
+        """Classify headings with styles, at levels (default: style_levels)."""
+        self.heading_classifier = _classifier_for(tuple(styles))
+        # Style -> level for the document being parsed; packs selected for
+        # one document never leak into style_levels and the next document
+        self.document_levels = dict(self.style_levels) if levels is None else levels
+        self.heading_patterns = [
+            (pattern, style_name)
+            for pattern, (_, style_name, _) in zip(self.heading_classifier.patterns, styles)
+        ]
+        if self.profiler is not None:
+            self.heading_classifier = CountingPattern(self.heading_classifier, 'heading', self.profiler)
+            self.heading_patterns = [(CountingPattern(pattern, 'heading_fallback', self.profiler), style_name)
+                                     for pattern, style_name in self.heading_patterns]
+    
+    def _phase(self, name: str):
+        return self.profiler.phase(name) if self.profiler is not None else nullcontext()
+    
+    @staticmethod
+    def _pack_styles(pack: Dict) -> List[Tuple[str, str, Optional[str]]]:
+        return [(e['pattern'], e['style'], e.get('leads')) for e in pack.get('heading_styles') or []]
+    
+    def load_reference_patterns(self, reference_file: Union[str, Path]) -> None:
+        """Add the heading styles of a YAML/JSON pattern pack, after the built-in ones."""
+        pack = load_pattern_pack(reference_file)
+        self.styles.extend(s for s in self._pack_styles(pack) if s not in self.styles)
+        for entry in pack.get('heading_styles') or []:
+            self.style_levels[entry['style']] = entry['level']
+        self._use_styles(self.styles)
+    
+    def select_styles(self, head: List[str]) -> None:
+        """Use this parser's styles plus those of the packs matching head,
+        for the current document only."""
+        styles = list(self.styles)
+        levels = dict(self.style_levels)
+        for pack in select_packs('\n'.join(head[:FINGERPRINT_LINES]), available_packs(self.pack_dir)):
+            styles.extend(s for s in self._pack_styles(pack) if s not in styles)
+            for entry in pack.get('heading_styles') or []:
+                levels.setdefault(entry['style'], entry['level'])
+        self._use_styles(styles, levels)
+    
     def detect_style(self, lines: List[str]) -> str:
+        """Dominant heading style of the first 100 lines. The number of
+        headings of each style found is kept in style_profile."""
         style_counts = {}
+        self.style_profile = profile = {}
         
         for line in lines[:100]:
             if not line.strip():
                 continue
             
-            for pattern, style_name in self.heading_patterns:
-                if pattern.match(line):
-                    weight = 1
-                    if style_name == 'part':
-                        weight = 5
-                    elif style_name in ['chinese_num', 'arabic_dot']:
-                        weight = 3
-                    style_counts[style_name] = style_counts.get(style_name, 0) + weight
-                    break
+            hit = self.heading_classifier.match(line)
+            if hit:
+                style_name = hit[1]
+                profile[style_name] = profile.get(style_name, 0) + 1
+                weight = 1
+                if style_name == 'part':
+                    weight = 5
+                elif style_name in ['chinese_num', 'arabic_dot']:
+                    weight = 3
+                style_counts[style_name] = style_counts.get(style_name, 0) + weight
         
         if not style_counts:
             return 'unknown'
         
         return max(style_counts.items(), key=lambda x: x[1])[0]
     
+    def heading_level(self, style_name: str, heading_text: str) -> Optional[int]:
+        if style_name == 'part':
+            return PART_LEVELS.get(heading_text[-1])
+        if style_name == 'arabic_dot':
+            num = int(heading_text.rstrip('.'))
+            return 2 if num <= 10 else 3
+        return self.document_levels.get(style_name)
+    
     def get_heading_level(self, line: str) -> Optional[Tuple[int, str]]:
-        for pattern, style_name in self.heading_patterns:
+        hit = self.heading_classifier.match(line)
+        if hit is None:
+            return None
+        
+        index, style_name, heading_text = hit
+        level = self.heading_level(style_name, heading_text)
+        if level is not None:
+            return (level, heading_text)
+        
+        # A style can match without resolving a level (e.g. 第一部); the
+        # remaining styles still get their turn, in priority order.
+        for pattern, style_name in self.heading_patterns[index + 1:]:
             match = pattern.match(line)
             if match:
                 heading_text = match.group(1)
-                
-                if style_name == 'part':
-                    if '部分' in heading_text:
-                        return (1, heading_text)
-                    elif '章' in heading_text:
-                        return (2, heading_text)
-                    elif '节' in heading_text:
-                        return (3, heading_text)
-                    elif '条' in heading_text:
-                        return (1, heading_text)
-                
-                elif style_name == 'chinese_num':
-                    return (2, heading_text)
-                
-                elif style_name == 'arabic_dot':
-                    num = int(heading_text.rstrip('.'))
-                    if num <= 10:
-                        return (2, heading_text)
-                    else:
-                        return (3, heading_text)
-                
-                elif style_name == 'subsection':
-                    return (2, heading_text)
-                
-                elif style_name == 'subsubsection':
-                    return (3, heading_text)
-                
-                elif style_name == 'circled_num':
-                    return (3, heading_text)
+                level = self.heading_level(style_name, heading_text)
+                if level is not None:
+                    return (level, heading_text)
         
         return None
     
@@ -97,24 +329,58 @@ class ContractParser:
                 return True
         return False
     
-    def parse(self, input_file: str, output_file: str) -> None:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+    def iter_clauses(self, lines: Iterable[str], with_spans: bool = False,
+                     path: Optional[List[str]] = None, first_line: int = 0,
+                     first_char: int = 0, style_lines: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """Yield {"path", "clause"} dicts as soon as the next heading closes them.
+        
+        `lines` may be an open text file or any iterable of lines; a trailing
+        newline on each line is ignored. Only the first 100 lines (for style
+        detection) and the clause being built are held in memory.
+        
+        with_spans adds "start_line" (the heading) and "end_line" (the last
+        non-blank line), 0-based and counted from first_line, and the
+        matching "char_start"/"char_end" offsets of those lines in the text
+        the lines were split from (counted from first_char; char_end is
+        exclusive). `path` resumes parsing under the given heading path
+        instead of the root. `style_lines` are the first lines of the whole
+        document when `lines` is only part of it (e.g. the body after a
+        cover and TOC); packs and the style are then chosen from them.
+        """
+        lines = (line[:-1] if line.endswith('\n') else line for line in lines)
+        head = list(islice(lines, 100))
+        style_head = head if style_lines is None else list(islice(style_lines, 100))
+        if self.auto_packs:
+            with self._phase('select_packs'):
+                self.select_styles(style_head)
+        with self._phase('detect_style'):
+            self.style_detected = self.detect_style(style_head)
+            if self.profiler is not None:
+                self.profiler.count_lines(len(style_head))
         
-        lines = content.split('\n')
-        self.style_detected = self.detect_style(lines)
+        if self.profiler is None:
+            self.style_matcher = StyleMatcher(self, self.style_profile)
+        else:
+            self.style_matcher = _CountingStyleMatcher(self, self.style_profile, self.profiler)
+        heading_level = self.style_matcher
         
-        result = []
-        current_path = []
+        current_path = list(path or [])
         current_clause_lines = []
+        clause_start = clause_end = first_line
+        char_start = char_end = line_offset = first_char
+        line_num = first_line - 1
         
-        for line in lines:
+        for line_num, line in enumerate(chain(head, lines), first_line):
+            if with_spans:
+                line_start = line_offset
+                line_offset += len(line) + 1
+            
             stripped = line.strip()
             
             if not stripped:
                 continue
             
-            heading_info = self.get_heading_level(stripped)
+            heading_info = heading_level(stripped)
             
             if heading_info:
                 level, heading = heading_info
@@ -124,10 +390,16 @@ class ContractParser:
                     clause_text = clause_text.lstrip('#').lstrip()
                     if clause_text:
                         path_str = '/'.join([self.root_path] + current_path)
-                        result.append({
+                        clause = {
                             "path": path_str,
                             "clause": clause_text
-                        })
+                        }
+                        if with_spans:
+                            clause["start_line"] = clause_start
+                            clause["end_line"] = clause_end
+                            clause["char_start"] = char_start
+                            clause["char_end"] = char_end
+                        yield clause
                     current_clause_lines = []
                 
                 if len(current_path) >= level:
@@ -135,36 +407,334 @@ class ContractParser:
                 
                 current_path.append(heading)
                 current_clause_lines.append(line)
+                clause_start = clause_end = line_num
+                if with_spans:
+                    char_start, char_end = line_start, line_start + len(line)
             elif current_path:
                 current_clause_lines.append(line)
+                clause_end = line_num
+                if with_spans:
+                    char_end = line_start + len(line)
+        
+        if self.profiler is not None:
+            self.profiler.count_lines(line_num - first_line + 1)
         
         if current_clause_lines:
             clause_text = '\n'.join(current_clause_lines).strip()
             clause_text = clause_text.lstrip('#').lstrip()
             if clause_text:
                 path_str = '/'.join([self.root_path] + current_path)
-                result.append({
+                clause = {
                     "path": path_str,
                     "clause": clause_text
-                })
+                }
+                if with_spans:
+                    clause["start_line"] = clause_start
+                    clause["end_line"] = clause_end
+                    clause["char_start"] = char_start
+                    clause["char_end"] = char_end
+                yield clause
+    
+    def parse(self, input_file: str, output_file: str, output_format: str = 'json',
+              use_mmap: bool = False) -> None:
+        """Parse input_file into output_file ('-' means stdin/stdout).
+        
+        output_format 'json' writes one indented array at the end and
+        'compact' the same array without whitespace; 'jsonl' writes one
+        clause per line and 'binary' one BinaryClauseWriter record, as soon
+        as each clause is closed. With use_mmap the input is read through
+        iter_mapped_lines instead of a text stream.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"unknown output format {output_format!r}")
+        
+        with _open_lines(input_file, use_mmap) as f:
+            clauses = self.iter_clauses(f)
+            if output_format in ('jsonl', 'binary'):
+                # Clauses are written as they close, so parsing and writing
+                # share one phase
+                with self._phase('clauses'):
+                    written = _stream_clauses(clauses, output_file, output_format)
+                    if self.profiler is not None:
+                        self.profiler.count_bytes(written)
+                return
+            with self._phase('clauses'):
+                result = list(clauses)
+        
+        layout = {'indent': 2} if output_format == 'json' else {'separators': (',', ':')}
+        with _open_text(output_file, 'w') as f, self._phase('write'):
+            if self.profiler is None:
+                json.dump(result, f, ensure_ascii=False, **layout)
+            else:
+                output = json.dumps(result, ensure_ascii=False, **layout)
+                self.profiler.count_bytes(len(output.encode('utf-8')))
+                f.write(output)
+
+
+OUTPUT_FORMATS = ('json', 'compact', 'jsonl', 'binary')
+
+BINARY_MAGIC = b'CLSB'
+BINARY_VERSION = 1
+_SPANS_FLAG = 1
+_NO_PARENT = 0xFFFFFFFF
+_PATH_ENTRY = struct.Struct('<II')   # parent path id, segment length in bytes
+_TRAILER = struct.Struct('<QQ4s')    # path table offset, clause count, magic
+
+
+class BinaryClauseWriter:
+    """Writes clauses to a columnar binary file as they arrive.
+    
+    Layout (little-endian): the 4-byte magic, a version byte and a flags
+    byte (bit 0: spans present); the UTF-8 text of every clause, back to
+    back; the path table; one uint32 path id per clause; one uint32
+    length (in characters) per clause; with spans, four int64 columns
+    (start_line, end_line, char_start, char_end); and a trailer with the
+    offset of the path table, the clause count and the magic again.
+    
+    Only the text is written as clauses arrive; the columns are small and
+    follow at close(). Paths are interned as a tree: each table entry is
+    (parent id, last segment), so '~/第一条/1.1' adds just '1.1' once
+    '~/第一条' is known.
+    """
+    
+    def __init__(self, f: BinaryIO, spans: bool = False):
+        self.f = f
+        self.spans = spans
+        self.paths: Dict[str, int] = {}
+        self.table: List[Tuple[int, bytes]] = []
+        self.path_ids = array('I')
+        self.lengths = array('I')
+        self.span_columns = [array('q') for _ in range(4)] if spans else []
+        self.position = 0
+        self._write(BINARY_MAGIC + bytes([BINARY_VERSION, _SPANS_FLAG if spans else 0]))
+    
+    def _write(self, data: bytes) -> None:
+        self.f.write(data)
+        self.position += len(data)
+    
+    def _intern(self, path: str) -> int:
+        path_id = self.paths.get(path)
+        if path_id is None:
+            parent, _, segment = path.rpartition('/')
+            parent_id = self._intern(parent) if parent else _NO_PARENT
+            path_id = self.paths[path] = len(self.table)
+            self.table.append((parent_id, segment.encode('utf-8')))
+        return path_id
+    
+    def write(self, clause: Dict) -> None:
+        text = clause['clause']
+        self._write(text.encode('utf-8'))
+        self.path_ids.append(self._intern(clause['path']))
+        self.lengths.append(len(text))
+        if self.spans:
+            for column, key in zip(self.span_columns, SPAN_KEYS):
+                column.append(clause[key])
+    
+    def close(self) -> int:
+        """Write the path table, columns and trailer; return the bytes written."""
+        table_offset = self.position
+        self._write(struct.pack('<I', len(self.table)) + b''.join(
+            _PATH_ENTRY.pack(parent, len(segment)) + segment for parent, segment in self.table))
+        for column in [self.path_ids, self.lengths] + self.span_columns:
+            if sys.byteorder != 'little':
+                column = array(column.typecode, column)
+                column.byteswap()
+            self._write(column.tobytes())
+        self._write(_TRAILER.pack(table_offset, len(self.path_ids), BINARY_MAGIC))
+        return self.position
+
+
+SPAN_KEYS = ('start_line', 'end_line', 'char_start', 'char_end')
+
+
+def read_binary_clauses(data: bytes) -> List[Dict]:
+    """Decode the output of BinaryClauseWriter back into clause dicts.
+    
+    All clause texts are decoded with one call and sliced by length.
+    """
+    view = memoryview(data)
+    if bytes(view[:4]) != BINARY_MAGIC or len(view) < 6 + _TRAILER.size:
+        raise ValueError("not a binary clause file")
+    if view[4] != BINARY_VERSION:
+        raise ValueError(f"unsupported binary clause version {view[4]}")
+    spans = bool(view[5] & _SPANS_FLAG)
+    table_offset, count, magic = _TRAILER.unpack_from(view, len(view) - _TRAILER.size)
+    if magic != BINARY_MAGIC:
+        raise ValueError("truncated binary clause file")
+    
+    # Rebuild full paths; parents always precede their children
+    (entries,) = struct.unpack_from('<I', view, table_offset)
+    paths: List[str] = []
+    pos = table_offset + 4
+    for _ in range(entries):
+        parent, length = _PATH_ENTRY.unpack_from(view, pos)
+        pos += _PATH_ENTRY.size
+        segment = str(view[pos:pos + length], 'utf-8')
+        pos += length
+        paths.append(segment if parent == _NO_PARENT else paths[parent] + '/' + segment)
+    
+    columns = []
+    for typecode in 'II' + ('qqqq' if spans else ''):
+        column = array(typecode)
+        size = column.itemsize * count
+        column.frombytes(view[pos:pos + size])
+        if sys.byteorder != 'little':
+            column.byteswap()
+        columns.append(column)
+        pos += size
+    
+    text = str(view[6:table_offset], 'utf-8')
+    ends = list(accumulate(columns[1]))
+    starts = [0] + ends[:-1]
+    clauses = [{"path": paths[path_id], "clause": text[start:end]}
+               for path_id, start, end in zip(columns[0], starts, ends)]
+    if spans:
+        for clause, *values in zip(clauses, *columns[2:]):
+            clause.update(zip(SPAN_KEYS, values))
+    return clauses
+
+
+def load_clauses(path: str) -> List[Dict]:
+    """Read clauses written in any of the OUTPUT_FORMATS, recognised by content."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] == BINARY_MAGIC:
+        return read_binary_clauses(data)
+    text = data.decode('utf-8')
+    if text.lstrip()[:1] == '[':
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _stream_clauses(clauses: Iterable[Dict], output_file: str, output_format: str) -> int:
+    """Write clauses as JSON Lines or binary records as they arrive; return the bytes written."""
+    with _open_binary(output_file) as out:
+        if output_format == 'jsonl':
+            written = 0
+            for clause in clauses:
+                record = (json.dumps(clause, ensure_ascii=False) + '\n').encode('utf-8')
+                out.write(record)
+                written += len(record)
+            return written
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        writer = BinaryClauseWriter(out)
+        for clause in clauses:
+            writer.write(clause)
+        return writer.close()
+
+
+def iter_mapped_lines(path: str) -> Iterator[str]:
+    """Yield the lines of a UTF-8 file through mmap, like str.split('\n') on its text.
+    
+    Line boundaries are found on the raw bytes and each line is decoded on
+    its own, so the file is never held as one str. Blank lines are yielded
+    as '' without decoding. A '\r' before the newline is dropped, matching
+    universal-newline reading of '\r\n' files; a lone '\r' is not a break.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield ''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while True:
+                end = mm.find(b'\n', start)
+                raw = mm[start:end if end >= 0 else len(mm)]
+                if raw.endswith(b'\r'):
+                    raw = raw[:-1]
+                yield raw.decode('utf-8') if raw.strip() else ''
+                if end < 0:
+                    return
+                start = end + 1
+
+
+@contextmanager
+def _open_lines(path: str, use_mmap: bool) -> Iterator[Iterable[str]]:
+    if not use_mmap:
+        with _open_text(path, 'r') as f:
+            yield f
+        return
+    
+    lines = iter_mapped_lines(path)
+    try:
+        yield lines
+    finally:
+        lines.close()
+
+
+@contextmanager
+def _open_binary(path: str) -> Iterator[BinaryIO]:
+    if path != '-':
+        with open(path, 'wb') as f:
+            yield f
+        return
+    
+    yield sys.stdout.buffer
+    sys.stdout.buffer.flush()
+
+
+@contextmanager
+def _open_text(path: str, mode: str) -> Iterator[TextIO]:
+    if path != '-':
+        with open(path, mode, encoding='utf-8') as f:
+            yield f
+        return
+    
+    stream = sys.stdin if mode == 'r' else sys.stdout
+    wrapper = io.TextIOWrapper(stream.buffer, encoding='utf-8')
+    try:
+        yield wrapper
+    finally:
+        wrapper.flush()
+        wrapper.detach()
 
 
 def main():
-    import sys
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(description="Parse a contract into path-addressed clauses.")
+    arg_parser.add_argument('input_file', help="contract text file, or - for stdin")
+    arg_parser.add_argument('output_file', help="output file, or - for stdout")
+    arg_parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='json',
+                            help="json: one indented array (default); compact: the array without "
+                                 "whitespace; jsonl: one clause per line, streamed; binary: path "
+                                 "dictionary plus records, streamed (read back with load_clauses)")
+    arg_parser.add_argument('--mmap', dest='use_mmap', action='store_true',
+                            help="read the input through mmap instead of a text stream")
+    arg_parser.add_argument('--pack', action='append', default=[],
+                            help="pattern pack (YAML/JSON) with extra heading styles; may be repeated")
+    arg_parser.add_argument('--auto-packs', action='store_true',
+                            help=f"also use the packs in {PACKS_DIR.name}/ whose fingerprint matches the contract")
+    arg_parser.add_argument('--profile', metavar='FILE',
+                            help="write per-phase timings and counters to FILE")
+    arg_parser.add_argument('--profile-format', choices=['json', 'pstats', 'speedscope'], default='json',
+                            help="json: phase stats (default); pstats: cProfile dump; speedscope: phase timeline")
+    arg_parser.add_argument('--style-stats', action='store_true',
+                            help="print the heading styles seen in the first 100 lines, and how often "
+                                 "other styles or the fallback scan were needed, to stderr")
+    args = arg_parser.parse_args()
     
-    if len(sys.argv) != 3:
-        print("Usage: python parse_contract.py <input_file> <output_file>")
-        sys.exit(1)
+    # pstats come from cProfile alone, without the counting wrappers
+    profiler = PhaseProfiler() if args.profile and args.profile_format != 'pstats' else None
+    if args.profile and profiler is None:
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+    parser = ContractParser(auto_packs=args.auto_packs, profiler=profiler)
+    for pack in args.pack:
+        parser.load_reference_patterns(pack)
+    parser.parse(args.input_file, args.output_file, args.output_format, args.use_mmap)
+    if args.style_stats:
+        print(json.dumps(parser.style_matcher.stats(), ensure_ascii=False), file=sys.stderr)
     
-    parser = ContractParser()
-    parser.parse(input_file, output_file)
-    print("Contract parsed successfully.")
+    if profiler is not None:
+        profiler.write(args.profile, args.profile_format, name=os.path.basename(args.input_file))
+    elif args.profile:
+        cprofile.disable()
+        cprofile.dump_stats(args.profile)
+    if args.output_file != '-':
+        print("Contract parsed successfully.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Pattern Packs
+Loads the YAML/JSON domain pattern packs of the clause parser
+(heading_styles) and the module extractor (module_patterns), and picks
+the ones whose fingerprint matches a contract. The module extractor
+imports this file from the parser skill, so both read packs the same way.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Union
+
+try:
+    import yaml
+except ImportError:  # YAML packs need PyYAML; JSON packs always load
+    yaml = None
+
+# How many leading lines of a contract the fingerprints are checked against
+FINGERPRINT_LINES = 40
+
+PACK_SUFFIXES = ('.json', '.yaml', '.yml')
+
+
+@lru_cache(maxsize=None)
+def read_pack(path: str, mtime_ns: int) -> Dict:
+    """Parse the pack at path; mtime_ns is only part of the cache key."""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ImportError(f"PyYAML is required to load {path}; install it or use a JSON pack")
+            pack = yaml.safe_load(f) or {}
+        else:
+            pack = json.load(f)
+    pack.setdefault('name', Path(path).stem)
+    pack['path'] = path
+    for entry in pack.get('heading_styles') or []:
+        if re.compile(entry['pattern']).groups != 1:
+            raise ValueError(f"Pattern pack {pack['name']!r}: {entry['pattern']!r} needs exactly one group")
+    return pack
+
+
+def load_pattern_pack(path: Union[str, Path]) -> Dict:
+    """Parse a YAML/JSON pattern pack; parsed packs are cached until the file changes."""
+    return read_pack(str(path), os.stat(path).st_mtime_ns)
+
+
+def available_packs(directory: Union[str, Path]) -> List[Dict]:
+    """Every pack in directory, in file name order."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return [load_pattern_pack(p) for p in sorted(directory.iterdir()) if p.suffix in PACK_SUFFIXES]
+
+
+def fingerprint_hits(head: str, pack: Dict) -> int:
+    """How many distinct fingerprint words of pack occur in head."""
+    return sum(1 for word in set(pack.get('fingerprint') or []) if word and word in head)
+
+
+def select_packs(head: str, packs: List[Dict]) -> List[Dict]:
+    """Packs with at least min_hits distinct fingerprint words in head (a
+    word repeated counts once)."""
+    selected = []
+    for pack in packs:
+        hits = fingerprint_hits(head, pack)
+        if hits and hits >= pack.get('min_hits', 1):
+            selected.append(pack)
+    return selected
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Phase Profiler
+Per-phase timings and counters for --profile in parse_contract.py and
+extract_modules.py. The module extractor imports this file from the
+parser skill, so both write the same stats.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class PhaseProfiler:
+    """Per-phase wall time, lines scanned, regex evaluations (by pattern
+    category) and bytes emitted.
+
+    Phases nest: `with profiler.phase('scan'):` opens one, counts go to the
+    innermost open phase and times are inclusive. on_phase(name, stats) is
+    called every time a phase ends.
+    """
+
+    UNSCOPED = '(unscoped)'
+
+    def __init__(self, on_phase: Optional[Callable[[str, Dict], None]] = None):
+        self.on_phase = on_phase
+        self.phases: Dict[str, Dict] = {}
+        self.events: List[Tuple[str, str, float]] = []  # ('O'|'C', phase, seconds from start)
+        self._open: List[str] = []
+        self._origin = time.perf_counter()
+
+    def _stats(self, name: str) -> Dict:
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = {'calls': 0, 'seconds': 0.0, 'lines': 0, 'regex': {}, 'bytes': 0}
+        return stats
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Dict]:
+        stats = self._stats(name)
+        self._open.append(name)
+        start = time.perf_counter()
+        self.events.append(('O', name, start - self._origin))
+        try:
+            yield stats
+        finally:
+            end = time.perf_counter()
+            self.events.append(('C', name, end - self._origin))
+            self._open.pop()
+            stats['calls'] += 1
+            stats['seconds'] += end - start
+            if self.on_phase:
+                self.on_phase(name, stats)
+
+    def _current(self) -> Dict:
+        return self._stats(self._open[-1] if self._open else self.UNSCOPED)
+
+    def count_lines(self, n: int) -> None:
+        self._current()['lines'] += n
+
+    def count_regex(self, category: str, n: int = 1) -> None:
+        regex = self._current()['regex']
+        regex[category] = regex.get(category, 0) + n
+
+    def count_bytes(self, n: int) -> None:
+        self._current()['bytes'] += n
+
+    def to_dict(self) -> Dict:
+        return {'phases': {name: dict(stats, seconds=round(stats['seconds'], 6))
+                           for name, stats in self.phases.items()}}
+
+    def to_speedscope(self, name: str = 'contract') -> Dict:
+        """The phase timeline as a speedscope evented profile."""
+        frames: Dict[str, int] = {}
+        events = [{'type': kind, 'frame': frames.setdefault(phase, len(frames)), 'at': at}
+                  for kind, phase, at in self.events]
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': [{'name': phase} for phase in frames]},
+            'profiles': [{
+                'type': 'evented', 'name': name, 'unit': 'seconds',
+                'startValue': 0, 'endValue': self.events[-1][2] if self.events else 0,
+                'events': events,
+            }],
+        }
+
+    def write(self, path: str, fmt: str = 'json', name: str = 'contract') -> None:
+        """Write the stats as 'json' or 'speedscope' (pstats come from cProfile)."""
+        data = self.to_speedscope(name) if fmt == 'speedscope' else self.to_dict()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+class CountingPattern:
+    """Stands in for a compiled regex, counting evaluations under a category."""
+
+    def __init__(self, target, category: str, profiler: PhaseProfiler):
+        self._target = target
+        self._category = category
+        self._profiler = profiler
+
+    def match(self, *args, **kwargs):
+        self._profiler.count_regex(self._category)
+        return self._target.match(*args, **kwargs)
+
+    def search(self, *args, **kwargs):
+        self._profiler.count_regex(self._category)
+        return self._target.search(*args, **kwargs)
+
+    def finditer(self, *args, **kwargs):
+        self._profiler.count_regex(self._category)
+        return self._target.finditer(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
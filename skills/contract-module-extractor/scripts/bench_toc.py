@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+TOC look-ahead scaling benchmark
+Times module extraction on synthetic heading-heavy contracts with a long
+table of contents, at increasing sizes up to 50k lines. Constant time per
+line means extraction scales linearly.
+"""
+
+import sys
+import time
+from typing import List
+
+from extract_modules import extract_modules
+
+CHINESE_NUMBERS = '一二三四五六七八九十'
+
+
+def chinese_number(n: int) -> str:
+    """1..999 as Chinese numerals, e.g. 21 -> 二十一."""
+    hundreds, rest = divmod(n, 100)
+    tens, ones = divmod(rest, 10)
+    text = ''
+    if hundreds:
+        text += CHINESE_NUMBERS[hundreds - 1] + '百'
+    if tens:
+        text += ('' if tens == 1 and not hundreds else CHINESE_NUMBERS[tens - 1]) + '十'
+    elif hundreds and ones:
+        text += '零'
+    if ones:
+        text += CHINESE_NUMBERS[ones - 1]
+    return text
+
+
+def synthetic_contract(total_lines: int) -> str:
+    """A contract whose TOC is a fifth of its lines and whose body is mostly headings."""
+    toc_lines = total_lines // 5
+    lines: List[str] = ['# 设备采购合同', '', '合同编号：HT-2024-001', '', '目录', '']
+
+    for i in range(toc_lines):
+        lines.append(f"第{chinese_number(i % 999 + 1)}条 条款标题{i}{'.' * 20}{i // 40 + 1}")
+
+    lines.extend(['', '鉴于甲乙双方经友好协商，达成如下协议：', ''])
+    article = 0
+    while len(lines) < total_lines - 6:
+        article += 1
+        lines.append(f"第{chinese_number(article % 999 + 1)}条 条款{article}")
+        lines.append(f"{article}.1 乙方应按约定履行义务。")
+        lines.append('')
+
+    lines.extend(['甲方（盖章）：', '', '乙方（盖章）：', '', '附件一：设备清单', '服务器 10 台'])
+    return '\n'.join(lines)
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [5000, 10000, 25000, 50000]
+
+    print(f"{'lines':>8} {'seconds':>10} {'us/line':>10}")
+    for size in sizes:
+        text = synthetic_contract(size)
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            extract_modules(text)
+            best = min(best, time.perf_counter() - start)
+        line_count = text.count('\n') + 1
+        print(f"{line_count:>8} {best:>10.4f} {best / line_count * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
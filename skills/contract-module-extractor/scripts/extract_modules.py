@@ -4,41 +4,391 @@ Contract Module Extractor
 Decomposes plain text contracts into modular components.
 """
 
+import os
 import re
+import sys
 import json
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+import mmap
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import nullcontext
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional, Iterable, Sequence, Union
+from itertools import accumulate
+
+# Pattern packs and --profile stats come from the clause parser's modules,
+# so both skills read packs and report phases the same way
+PARSER_SCRIPTS = Path(__file__).resolve().parents[2] / 'contract-clause-parser' / 'scripts'
+if str(PARSER_SCRIPTS) not in sys.path:
+    sys.path.append(str(PARSER_SCRIPTS))
+
+from pattern_packs import FINGERPRINT_LINES, available_packs, load_pattern_pack, read_pack, select_packs
+from phase_profiler import CountingPattern, PhaseProfiler
+
+# Inputs at least this large are memory-mapped instead of read into a str
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# Domain pattern packs shipped with the skill
+PACKS_DIR = Path(__file__).resolve().parent.parent / 'references' / 'packs'
+
+
+# Module marker patterns by category: (patterns, flags). Each category is
+# compiled once into a single alternation by PatternRegistry, so testing a
+# line against a category costs one match.
+MODULE_PATTERNS = {
+    # TOC (Table of Contents) heading line
+    'toc': ([
+        r'^目录\s*$',
+        r'^目\s*录\s*$',
+        r'^TABLE OF CONTENTS\s*$',
+        r'^CONTENTS\s*$',
+    ], re.IGNORECASE),
+    # TOC entry: short title followed by dots and a page number
+    'toc_entry': ([r'^.{1,50}\.{3,}\s*\d+$'], re.MULTILINE),
+    'toc_tail': ([r'\.{3,}\s*\d+$'], 0),
+    'toc_dots': ([r'\.{3,}\s*\d+'], 0),
+    # Dots closing a line; the page number may follow on a later line
+    'toc_dots_open': ([r'\.{3,}\s*$'], 0),
+    # Preamble start
+    'preamble': ([
+        r'^鉴于',
+        r'^WHEREAS',
+        r'^为了',
+        r'^兹就',
+        r'^根据',
+        r'^依据',
+    ], 0),
+    # Preamble anywhere in the first lines of a block
+    'preamble_block': ([
+        r'^鉴于', r'^WHEREAS', r'^为了', r'^兹就', r'^根据', r'^依据', r'^背景', r'^前言',
+    ], re.IGNORECASE),
+    # Body start (first chapter/section)
+    'body': ([
+        r'^第[一二三四五六七八九十百]+章',
+        r'^第[一二三四五六七八九十百]+条',
+        r'^Chapter\s+\d+',
+        r'^Article\s+\d+',
+    ], re.IGNORECASE),
+    # Hierarchical structure inside a block (case-sensitive)
+    'chapter': ([
+        r'^第[一二三四五六七八九十百]+章',
+        r'^第[一二三四五六七八九十百]+条',
+        r'^Chapter\s+\d+',
+        r'^Article\s+\d+',
+    ], 0),
+    # Signature start
+    'signature': ([
+        r'^甲方.*[盖章签字签署][:：]',
+        r'^乙方.*[盖章签字签署][:：]',
+        r'^Party\s*A.*[Signature签字][:：]',
+        r'^Party\s*B.*[Signature签字][:：]',
+        r'^签字盖章页',
+        r'^签署页',
+        r'^SIGNATURE\s*PAGE',
+    ], re.IGNORECASE),
+    # Strong signature indicators: a party line asking for seal/signature
+    'party_signature': ([
+        r'^甲方.*[盖章签字签署][:：]',
+        r'^乙方.*[盖章签字签署][:：]',
+    ], 0),
+    # Signature keywords anywhere in a line
+    'signature_keyword': ([r'签字', r'签署', r'盖章'], 0),
+    # Signature lines anywhere in a block
+    'signature_block': ([
+        r'^甲方.*[盖章签字签署][:：]',
+        r'^乙方.*[盖章签字签署][:：]',
+        r'^Party\s*A.*[Signature签字][:：]',
+        r'^Party\s*B.*[Signature签字][:：]',
+        r'^授权代表',
+        r'^Authorized\s*Representative',
+        r'^签字盖章页',
+        r'^签署页',
+        r'^SIGNATURE\s*PAGE',
+    ], re.IGNORECASE | re.MULTILINE),
+    # Attachment start
+    'attachment': ([
+        r'^附件[一二三四五六七八九十百0-9]+[\.、:\s]*',
+        r'^附件[一二三四五六七八九十百0-9]+\s*[A-Z]*',
+        r'^ANNEX\s*\d+',
+        r'^APPENDIX\s*\d+',
+    ], re.IGNORECASE),
+    # Contract title, the first line of a new cover in a dump of several
+    # contracts: a short line ending in 合同/协议 (stream_modules.py)
+    'contract_title': ([
+        r'^[^：:。；;，,]{0,60}(?:合同|协议|协议书|契约)(?:[（(][^）)]{0,20}[）)])?\s*$',
+        r'^[^:.;,]{0,80}\b(?:CONTRACT|AGREEMENT)\s*$',
+    ], re.IGNORECASE),
+    # Party named on a cover (not a signature line)
+    'party': ([
+        r'^(?:甲方|乙方|丙方|买方|卖方|出租方|承租方|委托方|受托方|发包人|承包人)[^：:]{0,20}[：:]',
+        r'^Party\s*[ABC]\b',
+    ], re.IGNORECASE),
+}
+
+
+# Literals at least one of which occurs in every line a scan detector can
+# fire on. Memory-mapped input only decodes lines containing one of them
+# (compared case-insensitively for ASCII).
+SCAN_TRIGGERS = [
+    '目', 'CONTENTS',
+    '鉴于', 'WHEREAS', '为了', '兹就', '根据', '依据',
+    '第', 'CHAPTER', 'ARTICLE',
+    '甲方', '乙方', 'PARTY', '签', '盖章', 'SIGNATURE',
+    '附件', 'ANNEX', 'APPENDIX',
+]
+
+
+# Categories tested line by line during the scan; patterns added to them
+# need trigger literals, or mapped input has to decode every line
+SCAN_CATEGORIES = {'toc', 'preamble', 'body', 'signature', 'party_signature', 'signature_keyword', 'attachment'}
+
+
+class PatternRegistry:
+    """Module marker patterns compiled once, one merged regex per category."""
+
+    def __init__(self, patterns: Dict[str, Tuple[List[str], int]] = MODULE_PATTERNS,
+                 triggers: Optional[List[str]] = SCAN_TRIGGERS):
+        # triggers None means no literal prefilter: every line is scanned
+        self.triggers = list(triggers) if triggers is not None else None
+        self.sources = {name: (list(srcs), flags) for name, (srcs, flags) in patterns.items()}
+        self.compiled = {
+            name: re.compile('|'.join('(?:%s)' % src for src in srcs), flags)
+            for name, (srcs, flags) in self.sources.items()
+        }
+
+    def __getitem__(self, category: str) -> re.Pattern:
+        return self.compiled[category]
+
+    def extended(self, pack: Dict) -> 'PatternRegistry':
+        """A new registry with a pattern pack's module_patterns appended per category."""
+        sources = {name: (list(srcs), flags) for name, (srcs, flags) in self.sources.items()}
+        added = pack.get('module_patterns') or {}
+        for name, srcs in added.items():
+            if name not in sources:
+                raise ValueError(f"Pattern pack {pack.get('name', '?')!r}: unknown category {name!r}")
+            sources[name][0].extend(srcs)
+
+        triggers = self.triggers
+        if triggers is not None:
+            if SCAN_CATEGORIES & set(added) and not pack.get('triggers'):
+                triggers = None
+            else:
+                triggers = triggers + [t for t in pack.get('triggers') or [] if t not in triggers]
+        return PatternRegistry(sources, triggers)
+
+
+DEFAULT_PATTERNS = PatternRegistry()
+
+
+@lru_cache(maxsize=64)
+def _registry_for(packs: Tuple[Tuple[str, int], ...]) -> PatternRegistry:
+    registry = DEFAULT_PATTERNS
+    for path, mtime_ns in packs:
+        registry = registry.extended(read_pack(path, mtime_ns))
+    return registry
+
+
+def registry_for_packs(paths: Iterable[Union[str, Path]]) -> PatternRegistry:
+    """Default patterns merged with the given packs, compiled once per combination."""
+    return _registry_for(tuple((str(p), os.stat(p).st_mtime_ns) for p in paths))
+
+
+def auto_patterns(text: Union[str, 'MappedText'], directory: Union[str, Path] = PACKS_DIR,
+                  extra: Iterable[Union[str, Path]] = ()) -> PatternRegistry:
+    """Registry for the packs in directory whose fingerprint matches the
+    first FINGERPRINT_LINES lines of text, plus any extra pack files."""
+    if isinstance(text, str):
+        head = '\n'.join(text.split('\n', FINGERPRINT_LINES)[:FINGERPRINT_LINES])
+    else:
+        head = '\n'.join(text[:FINGERPRINT_LINES])
+    selected = [pack['path'] for pack in select_packs(head, available_packs(directory))]
+    return registry_for_packs(selected + [str(p) for p in extra])
+
+
+class MappedText:
+    """Memory-mapped UTF-8 contract file, viewed as a list of lines.
+
+    Line boundaries are found on the raw bytes once; a line is only decoded
+    when it is indexed. Indexing and slicing behave like the list returned
+    by str.split('\n') on the decoded text, except that a '\r' before the
+    newline is dropped (as universal-newline reading does) and a lone '\r'
+    is not treated as a line break. Offsets are byte offsets.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        starts = array('q', [0])
+        find = self._map.find
+        pos = find(b'\n')
+        while pos >= 0:
+            starts.append(pos + 1)
+            pos = find(b'\n', pos + 1)
+        # Sentinel one past the end, as if the file ended with a newline
+        starts.append(len(self._map) + 1)
+        self.line_starts = starts
+
+    def __len__(self) -> int:
+        return len(self.line_starts) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self.raw(index).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def raw(self, index: int) -> bytes:
+        """Bytes of a line without its line break."""
+        line = self._map[self.line_starts[index]:self.line_starts[index + 1] - 1]
+        return line[:-1] if line.endswith(b'\r') else line
+
+    def decode_range(self, start: int, end: int) -> str:
+        return self._map[start:end].decode('utf-8').replace('\r\n', '\n')
+
+    def lines_containing(self, literals: Iterable[str], chunk_size: int = 1 << 22) -> List[int]:
+        """Numbers of the lines containing any of literals (ASCII case-insensitive), in order."""
+        needles = [l.upper().encode('utf-8') for l in literals]
+        starts = self.line_starts
+        hit = bytearray(len(self))
+        chunk_start = 0
+        while chunk_start < len(self._map):
+            # Chunks end on a line break so no literal straddles two of them
+            chunk_end = self._map.find(b'\n', chunk_start + chunk_size)
+            chunk_end = len(self._map) if chunk_end < 0 else chunk_end + 1
+            chunk = self._map[chunk_start:chunk_end].upper()
+            for needle in needles:
+                pos = chunk.find(needle)
+                while pos >= 0:
+                    line = bisect_right(starts, chunk_start + pos) - 1
+                    hit[line] = 1
+                    # Resume at the next line: one hit per line is enough
+                    pos = chunk.find(needle, starts[line + 1] - chunk_start)
+            chunk_start = chunk_end
+        return [i for i, flag in enumerate(hit) if flag]
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+def read_contract(path: str, use_mmap: Optional[bool] = None) -> Union[str, MappedText]:
+    """Read a contract as text, or map it when it is large (or use_mmap is set)."""
+    if use_mmap is None:
+        use_mmap = os.path.getsize(path) >= MMAP_THRESHOLD
+    if use_mmap and os.path.getsize(path) > 0:
+        return MappedText(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
 
 
-@dataclass
 class Module:
-    """Represents a contract module with type and content."""
-    type: str
-    text: str
-    start_line: int
-    end_line: int
+    """Represents a contract module with type and content.
+
+    A module only stores its line range and the offsets of its (stripped)
+    text in the shared source -- character offsets into a str, or byte
+    offsets into a MappedText; text is produced on demand.
+    """
+    __slots__ = ('type', 'start_line', 'end_line', 'char_start', 'char_end', 'source')
+
+    def __init__(self, type: str, start_line: int, end_line: int,
+                 char_start: int, char_end: int, source: Union[str, MappedText]):
+        self.type = type
+        self.start_line = start_line
+        self.end_line = end_line
+        self.char_start = char_start
+        self.char_end = char_end
+        self.source = source
+
+    @property
+    def text(self) -> str:
+        if isinstance(self.source, str):
+            return self.source[self.char_start:self.char_end]
+        return self.source.decode_range(self.char_start, self.char_end)
+
+    def __repr__(self) -> str:
+        return (f"Module(type={self.type!r}, start_line={self.start_line}, end_line={self.end_line}, "
+                f"char_start={self.char_start}, char_end={self.char_end})")
+
+
+class _ProfiledRegistry:
+    """A PatternRegistry whose patterns count their evaluations per category."""
+
+    def __init__(self, registry: PatternRegistry, profiler: PhaseProfiler):
+        self.registry = registry
+        self.profiler = profiler
+        self.triggers = registry.triggers
+        self._patterns = {name: CountingPattern(regex, name, profiler)
+                          for name, regex in registry.compiled.items()}
+
+    def __getitem__(self, category: str) -> CountingPattern:
+        return self._patterns[category]
+
+    def extended(self, pack: Dict) -> '_ProfiledRegistry':
+        return _ProfiledRegistry(self.registry.extended(pack), self.profiler)
 
 
 class ContractModuleExtractor:
     """Extracts modules from contract text based on pattern recognition."""
 
-    def __init__(self, text: str):
+    def __init__(self, text: Union[str, MappedText], patterns: Optional[PatternRegistry] = None,
+                 profiler: Optional[PhaseProfiler] = None):
         self.text = text
-        self.lines = text.split('\n')
+        self.patterns = patterns or DEFAULT_PATTERNS
+        self.profiler = profiler
+        if profiler is not None:
+            self.patterns = _ProfiledRegistry(self.patterns, profiler)
         self.modules: List[Module] = []
 
-    def extract(self) -> List[Dict]:
+        if isinstance(text, MappedText):
+            self.lines = text
+            self.line_starts = text.line_starts
+        else:
+            self.lines = text.split('\n')
+            # line_starts[i] is the offset of line i in text; the extra last
+            # entry sits one past the end, as if text ended with a newline
+            self.line_starts = list(accumulate((len(line) + 1 for line in self.lines), initial=0))
+
+    def extract(self, with_text: bool = True, with_offsets: bool = False) -> List[Dict]:
         """Extract all modules and return as JSON-compatible list."""
-        self._scan_structure()
-        self._determine_boundaries()
-        return self._to_json()
+        with self._phase('scan'):
+            self._scan_structure()
+        with self._phase('boundaries'):
+            self._determine_boundaries()
+        with self._phase('serialize'):
+            return self._to_json(with_text, with_offsets)
+
+    def _phase(self, name: str):
+        return self.profiler.phase(name) if self.profiler is not None else nullcontext()
 
     def _scan_structure(self) -> None:
-        """Scan contract to identify approximate module structure."""
+        """Scan contract to identify approximate module structure.
+
+        Besides module starts, this records every line carrying a signature
+        indicator so _determine_boundaries only needs index lookups:
+        signature_lines holds any signature hint, body_end_lines the subset
+        strong enough to end the body.
+        """
         self.potential_boundaries = []
+        self.signature_lines = []
+        self.body_end_lines = []
+        self._index_toc_lines()
 
-        for i, line in enumerate(self.lines):
-            stripped = line.strip()
+        party_signature = self.patterns['party_signature']
+        signature_keyword = self.patterns['signature_keyword']
+
+        candidates = self._lines_with(self.patterns.triggers)
+        if self.profiler is not None:
+            self.profiler.count_lines(len(candidates))
+
+        for i in candidates:
+            stripped = self.lines[i].strip()
 
             if not stripped:
                 continue
@@ -48,84 +398,109 @@ class ContractModuleExtractor:
             if module_type:
                 self.potential_boundaries.append((i, module_type))
 
+            # Record signature indicators
+            strong = party_signature.match(stripped)
+            if strong or signature_keyword.search(stripped):
+                self.signature_lines.append(i)
+                if strong or \
+                   '甲方（盖章）' in stripped or '乙方（盖章）' in stripped or \
+                   stripped.startswith('签字盖章页') or stripped.startswith('签署页'):
+                    self.body_end_lines.append(i)
+
+    def _lines_with(self, literals: List[str]) -> Sequence[int]:
+        """Numbers of the lines worth inspecting for patterns built on literals.
+
+        Mapped input is probed on the raw bytes so other lines are never
+        decoded; text input simply yields every line.
+        """
+        if isinstance(self.lines, MappedText) and literals is not None:
+            return self.lines.lines_containing(literals)
+        return range(len(self.lines))
+
+    def _index_toc_lines(self) -> None:
+        """Precompute where TOC dot leaders end, in one backward pass.
+
+        toc_reach[i] is the smallest line index on which a dots-and-page-number
+        match starting at or after line i ends (a match can run across lines
+        when the dots close a line and the number opens the next non-blank
+        one). A window of lines [i, i+k) contains a match exactly when
+        toc_reach[i] < i + k. Only lines containing '...' are visited; the
+        runs between them are filled by slice assignment.
+        """
+        toc_dots = self.patterns['toc_dots']
+        toc_dots_open = self.patterns['toc_dots_open']
+        total_lines = len(self.lines)
+        no_match = total_lines + 5
+
+        if isinstance(self.lines, MappedText):
+            dotted = self.lines.lines_containing(['...'])
+        else:
+            dotted = [i for i, line in enumerate(self.lines) if '...' in line]
+
+        self.toc_reach = array('q', [no_match]) * (total_lines + 1)
+        reach = no_match
+        filled_from = total_lines  # toc_reach[filled_from:] is final
+
+        for i in reversed(dotted):
+            self.toc_reach[i + 1:filled_from] = array('q', [reach]) * (filled_from - i - 1)
+
+            line = self.lines[i]
+            if toc_dots.search(line):
+                reach = i
+            elif toc_dots_open.search(line):
+                next_line = self._next_content_line(i + 1)
+                if next_line is not None and self.lines[next_line].lstrip()[0].isdecimal():
+                    reach = min(reach, next_line)
+
+            self.toc_reach[i] = reach
+            filled_from = i
+
+        self.toc_reach[:filled_from] = array('q', [reach]) * filled_from
+
+    def _next_content_line(self, start: int) -> Optional[int]:
+        """First line at or after start that is not blank."""
+        for i in range(start, len(self.lines)):
+            if self.lines[i].strip():
+                return i
+        return None
+
     def _detect_module_type(self, line: str, line_num: int) -> Optional[str]:
         """Detect module type for a given line."""
+        patterns = self.patterns
+
         # TOC (Table of Contents) - only first line
-        toc_patterns = [
-            r'^目录\s*$',
-            r'^目\s*录\s*$',
-            r'^TABLE OF CONTENTS\s*$',
-            r'^CONTENTS\s*$',
-        ]
-        for pattern in toc_patterns:
-            if re.match(pattern, line, re.IGNORECASE):
-                return '目录'
+        if patterns['toc'].match(line):
+            return '目录'
 
         # Preamble start
-        preamble_patterns = [
-            r'^鉴于',
-            r'^WHEREAS',
-            r'^为了',
-            r'^兹就',
-            r'^根据',
-            r'^依据',
-        ]
-        for pattern in preamble_patterns:
-            if re.match(pattern, line):
-                return '序言'
+        if patterns['preamble'].match(line):
+            return '序言'
 
         # Body start (first chapter/section) - but exclude TOC entries
-        body_patterns = [
-            r'^第[一二三四五六七八九十百]+章',
-            r'^第[一二三四五六七八九十百]+条',
-            r'^Chapter\s+\d+',
-            r'^Article\s+\d+',
-        ]
-        for pattern in body_patterns:
-            if re.match(pattern, line, re.IGNORECASE):
-                # Check if this is a TOC entry (followed by dotted line pattern)
-                # If line itself contains dotted pattern, it's likely TOC
-                if re.search(r'\.{3,}\s*\d+$', line):
-                    continue
-                # Check if next few lines have TOC pattern
-                if line_num + 1 < len(self.lines):
-                    next_lines = '\n'.join(self.lines[line_num:line_num+5])
-                    if re.search(r'\.{3,}\s*\d+', next_lines):
-                        continue
-
+        if patterns['body'].match(line):
+            # If line itself contains dotted pattern, it's likely TOC;
+            # otherwise check if next few lines have TOC pattern
+            is_toc_entry = bool(patterns['toc_tail'].search(line))
+            if not is_toc_entry and line_num + 1 < len(self.lines):
+                is_toc_entry = self.toc_reach[line_num] < line_num + 5
+
+            if not is_toc_entry:
                 # Only return if this is the first chapter (avoid treating every chapter as new module)
                 if not self.potential_boundaries:
                     return '正文'
                 # Check if previous boundary is not also 正文
-                if self.potential_boundaries and self.potential_boundaries[-1][1] != '正文':
+                if self.potential_boundaries[-1][1] != '正文':
                     return '正文'
 
         # Signature start
-        signature_patterns = [
-            r'^甲方.*[盖章签字签署][:：]',
-            r'^乙方.*[盖章签字签署][:：]',
-            r'^Party\s*A.*[Signature签字][:：]',
-            r'^Party\s*B.*[Signature签字][:：]',
-            r'^签字盖章页',
-            r'^签署页',
-            r'^SIGNATURE\s*PAGE',
-        ]
-        for pattern in signature_patterns:
-            if re.match(pattern, line, re.IGNORECASE):
-                return '盖章签字'
+        if patterns['signature'].match(line):
+            return '盖章签字'
 
         # Attachment start - but exclude TOC entries (lines with dots and page numbers)
         # True attachments usually stand alone and have more content below
-        if not re.match(r'^.{1,50}\.{3,}\s*\d+$', line):  # Not a TOC entry
-            attachment_patterns = [
-                r'^附件[一二三四五六七八九十百0-9]+[\.、:\s]*',
-                r'^附件[一二三四五六七八九十百0-9]+\s*[A-Z]*',
-                r'^ANNEX\s*\d+',
-                r'^APPENDIX\s*\d+',
-            ]
-            for pattern in attachment_patterns:
-                if re.match(pattern, line, re.IGNORECASE):
-                    return '附件'
+        if not patterns['toc_entry'].match(line):  # Not a TOC entry
+            if patterns['attachment'].match(line):
+                return '附件'
 
         return None
 
@@ -139,15 +514,11 @@ class ContractModuleExtractor:
 
         if not self.potential_boundaries:
             # No clear boundaries, try to classify entire document
-            content = '\n'.join(self.lines).strip()
-            if content:
-                module_type = self._classify_module(content, 0, len(self.lines) - 1)
-                self.modules.append(Module(
-                    type=module_type or '正文',
-                    text=content,
-                    start_line=0,
-                    end_line=len(self.lines) - 1
-                ))
+            module = self._module('正文', 0, len(self.lines))
+            if module:
+                with self._phase('classify'):
+                    module.type = self._classify_module(module.text, 0, len(self.lines) - 1) or '正文'
+                self.modules.append(module)
             return
 
         # Find key marker positions
@@ -178,14 +549,9 @@ class ContractModuleExtractor:
         # 封面: from start to first module marker (if any)
         first_marker = min([m for m in [markers['toc'], markers['preamble'], markers['body']] if m is not None], default=None)
         if first_marker and first_marker > current_pos:
-            content = '\n'.join(self.lines[current_pos:first_marker]).strip()
-            if content:
-                self.modules.append(Module(
-                    type='封面',
-                    text=content,
-                    start_line=current_pos,
-                    end_line=first_marker - 1
-                ))
+            module = self._module('封面', current_pos, first_marker)
+            if module:
+                self.modules.append(module)
             current_pos = first_marker
 
         # 目录: from toc marker to next marker
@@ -193,14 +559,9 @@ class ContractModuleExtractor:
             next_marker = markers['preamble'] or markers['body'] or markers['signature'] or markers['attachments'][0] if markers['attachments'] else None
             if next_marker is None:
                 next_marker = total_lines
-            content = '\n'.join(self.lines[markers['toc']:next_marker]).strip()
-            if content:
-                self.modules.append(Module(
-                    type='目录',
-                    text=content,
-                    start_line=markers['toc'],
-                    end_line=next_marker - 1
-                ))
+            module = self._module('目录', markers['toc'], next_marker)
+            if module:
+                self.modules.append(module)
             current_pos = next_marker
 
         # 序言: from preamble marker to body marker
@@ -208,43 +569,21 @@ class ContractModuleExtractor:
             next_marker = markers['body'] or markers['signature'] or markers['attachments'][0] if markers['attachments'] else None
             if next_marker is None:
                 next_marker = total_lines
-            content = '\n'.join(self.lines[markers['preamble']:next_marker]).strip()
-            if content:
-                self.modules.append(Module(
-                    type='序言',
-                    text=content,
-                    start_line=markers['preamble'],
-                    end_line=next_marker - 1
-                ))
+            module = self._module('序言', markers['preamble'], next_marker)
+            if module:
+                self.modules.append(module)
             current_pos = next_marker
 
         # 正文: from body marker to signature or attachments
         if markers['body'] is not None and markers['body'] >= current_pos:
-            # Determine where body ends
-            body_end = None
-
             # Search limit
             if markers['attachments']:
                 search_limit = markers['attachments'][0]
             else:
                 search_limit = total_lines
 
-            # Look for signature patterns in body section (more comprehensive search)
-            for i in range(markers['body'], search_limit):
-                line = self.lines[i].strip()
-                # Strong signature indicators
-                if re.match(r'^甲方.*[盖章签字签署][:：]', line) or \
-                   re.match(r'^乙方.*[盖章签字签署][:：]', line):
-                    body_end = i
-                    break
-                # Additional signature patterns
-                if '甲方（盖章）' in line or '乙方（盖章）' in line:
-                    body_end = i
-                    break
-                # Look for signature page markers
-                if line.startswith('签字盖章页') or line.startswith('签署页'):
-                    body_end = i
-                    break
+            # Body ends at the first strong signature indicator
+            body_end = self._first_line_between(self.body_end_lines, markers['body'], search_limit)
 
             # If no signature found, body goes to first attachment or end
             if not body_end:
@@ -254,14 +593,9 @@ class ContractModuleExtractor:
                     body_end = total_lines
 
             # Extract body content
-            body_content = '\n'.join(self.lines[markers['body']:body_end]).strip()
-            if body_content:
-                self.modules.append(Module(
-                    type='正文',
-                    text=body_content,
-                    start_line=markers['body'],
-                    end_line=body_end - 1
-                ))
+            module = self._module('正文', markers['body'], body_end)
+            if module:
+                self.modules.append(module)
             current_pos = body_end
 
         # 盖章签字: extract if signature section exists
@@ -271,39 +605,12 @@ class ContractModuleExtractor:
 
         if signature_end > current_pos:
             # Check if there's signature content
-            has_signature = False
-            sig_start = current_pos
-
-            for i in range(current_pos, signature_end):
-                line = self.lines[i].strip()
-                # Strong signature indicators
-                if re.match(r'^甲方.*[盖章签字签署][:：]', line) or \
-                   re.match(r'^乙方.*[盖章签字签署][:：]', line):
-                    has_signature = True
-                    if sig_start == current_pos:  # Update start if not set
-                        sig_start = i
-                    break
-                # Additional patterns
-                if '甲方（盖章）' in line or '乙方（盖章）' in line:
-                    has_signature = True
-                    if sig_start == current_pos:
-                        sig_start = i
-                    break
-                if '签字' in line or '签署' in line or '盖章' in line:
-                    has_signature = True
-                    if sig_start == current_pos:
-                        sig_start = i
-                    break
-
-            if has_signature:
-                sig_content = '\n'.join(self.lines[sig_start:signature_end]).strip()
-                if sig_content:
-                    self.modules.append(Module(
-                        type='盖章签字',
-                        text=sig_content,
-                        start_line=sig_start,
-                        end_line=signature_end - 1
-                    ))
+            sig_start = self._first_line_between(self.signature_lines, current_pos, signature_end)
+
+            if sig_start is not None:
+                module = self._module('盖章签字', sig_start, signature_end)
+                if module:
+                    self.modules.append(module)
                 current_pos = signature_end
 
         # 附件: each attachment
@@ -311,16 +618,40 @@ class ContractModuleExtractor:
             if attachment_line >= current_pos:
                 next_attachment = markers['attachments'][i + 1] if i + 1 < len(markers['attachments']) else None
                 next_marker = next_attachment or total_lines
-                content = '\n'.join(self.lines[attachment_line:next_marker]).strip()
-                if content:
-                    self.modules.append(Module(
-                        type='附件',
-                        text=content,
-                        start_line=attachment_line,
-                        end_line=next_marker - 1
-                    ))
+                module = self._module('附件', attachment_line, next_marker)
+                if module:
+                    self.modules.append(module)
                 current_pos = next_marker
 
+    def _module(self, module_type: str, start: int, stop: int) -> Optional[Module]:
+        """Module over lines [start, stop) with surrounding whitespace trimmed, or None if blank."""
+        stop = min(stop, len(self.lines))
+        first = self._next_content_line(start)
+        if first is None or first >= stop:
+            return None
+        last = next(i for i in range(stop - 1, first - 1, -1) if self.lines[i].strip())
+
+        first_line = self.lines[first]
+        last_line = self.lines[last]
+        char_start = self._offset(first, len(first_line) - len(first_line.lstrip()))
+        char_end = self._offset(last, len(last_line.rstrip()))
+
+        return Module(module_type, start, stop - 1, char_start, char_end, self.text)
+
+    def _offset(self, line_num: int, column: int) -> int:
+        """Source offset of a column in a line (bytes for mapped input)."""
+        if isinstance(self.text, str):
+            return self.line_starts[line_num] + column
+        return self.line_starts[line_num] + len(self.lines[line_num][:column].encode('utf-8'))
+
+    @staticmethod
+    def _first_line_between(lines: List[int], start: int, stop: int) -> Optional[int]:
+        """Return the first recorded line in [start, stop), if any."""
+        i = bisect_left(lines, start)
+        if i < len(lines) and lines[i] < stop:
+            return lines[i]
+        return None
+
     def _classify_module(self, content: str, start_line: int, end_line: int) -> Optional[str]:
         """Classify content into a module type."""
         if not content.strip():
@@ -329,53 +660,28 @@ class ContractModuleExtractor:
         lines = content.split('\n')
         line_count = len([l for l in lines if l.strip()])
 
+        patterns = self.patterns
+
         # Check for TOC patterns (lines with dots and page numbers)
-        if re.search(r'^.{1,50}\.{3,}\s*\d+$', content, re.MULTILINE):
+        if patterns['toc_entry'].search(content):
             return '目录'
 
         # Check for 序言 patterns
-        preamble_patterns = [r'^鉴于', r'^WHEREAS', r'^为了', r'^兹就', r'^根据', r'^依据', r'^背景', r'^前言']
         for line in lines[:5]:
-            for pattern in preamble_patterns:
-                if re.match(pattern, line.strip(), re.IGNORECASE):
-                    return '序言'
+            if patterns['preamble_block'].match(line.strip()):
+                return '序言'
 
         # Check for 盖章签字 patterns
-        signature_patterns = [
-            r'^甲方.*[盖章签字签署][:：]',
-            r'^乙方.*[盖章签字签署][:：]',
-            r'^Party\s*A.*[Signature签字][:：]',
-            r'^Party\s*B.*[Signature签字][:：]',
-            r'^授权代表',
-            r'^Authorized\s*Representative',
-            r'^签字盖章页',
-            r'^签署页',
-            r'^SIGNATURE\s*PAGE',
-        ]
-        for pattern in signature_patterns:
-            if re.search(pattern, content, re.IGNORECASE | re.MULTILINE):
-                return '盖章签字'
+        if patterns['signature_block'].search(content):
+            return '盖章签字'
 
         # Check for 附件 patterns
-        attachment_patterns = [
-            r'^附件[一二三四五六七八九十百0-9]+[\.、:\s]*',
-            r'^附件[一二三四五六七八九十百0-9]+\s*[A-Z]*',
-            r'^ANNEX\s*\d+',
-            r'^APPENDIX\s*\d+',
-        ]
         for line in lines[:3]:
-            for pattern in attachment_patterns:
-                if re.match(pattern, line.strip(), re.IGNORECASE):
-                    return '附件'
+            if patterns['attachment'].match(line.strip()):
+                return '附件'
 
         # Check for 正文 patterns (hierarchical structure)
-        chapter_patterns = [
-            r'^第[一二三四五六七八九十百]+章',
-            r'^第[一二三四五六七八九十百]+条',
-            r'^Chapter\s+\d+',
-            r'^Article\s+\d+',
-        ]
-        has_chapters = any(re.match(p, l.strip()) for l in lines for p in chapter_patterns)
+        has_chapters = any(patterns['chapter'].match(l.strip()) for l in lines)
         if has_chapters and line_count > 2:
             return '正文'
 
@@ -392,50 +698,121 @@ class ContractModuleExtractor:
         # Final fallback
         return '正文' if has_chapters else None
 
-    def _to_json(self) -> List[Dict]:
-        """Convert modules to JSON format."""
-        return [{'type': m.type, 'text': m.text} for m in self.modules]
+    def _to_json(self, with_text: bool = True, with_offsets: bool = False) -> List[Dict]:
+        """Convert modules to JSON format.
+
+        with_offsets adds start_line/end_line and char_start/char_end (into
+        the input text) so callers can slice the source instead of carrying
+        a copy of every module's text. Mapped input reports byte_start/
+        byte_end into the file instead.
+        """
+        unit = 'char' if isinstance(self.text, str) else 'byte'
+        result = []
+        for m in self.modules:
+            entry = {'type': m.type}
+            if with_text:
+                entry['text'] = m.text
+            if with_offsets:
+                entry['start_line'] = m.start_line
+                entry['end_line'] = m.end_line
+                entry[unit + '_start'] = m.char_start
+                entry[unit + '_end'] = m.char_end
+            result.append(entry)
+        return result
 
     def load_reference_patterns(self, reference_file: str) -> None:
-        """Load custom reference patterns from file."""
-        # This can be extended to load industry-specific patterns
-        pass
+        """Add the module patterns of a YAML/JSON pattern pack to this extractor."""
+        self.patterns = self.patterns.extended(load_pattern_pack(reference_file))
 
 
-def extract_modules(text: str) -> List[Dict]:
+def extract_modules(text: Union[str, MappedText], with_text: bool = True, with_offsets: bool = False,
+                    patterns: Optional[PatternRegistry] = None,
+                    profiler: Optional[PhaseProfiler] = None) -> List[Dict]:
     """Main function to extract modules from contract text."""
-    extractor = ContractModuleExtractor(text)
-    return extractor.extract()
+    extractor = ContractModuleExtractor(text, patterns, profiler)
+    return extractor.extract(with_text, with_offsets)
+
+
+def dump_modules(modules: List[Dict], output_format: str = 'json') -> str:
+    """Modules as an indented JSON array ('json'), the same array without
+    whitespace ('compact') or one JSON object per line ('jsonl')."""
+    if output_format == 'jsonl':
+        return ''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in modules)
+    if output_format == 'compact':
+        return json.dumps(modules, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(modules, ensure_ascii=False, indent=2)
 
 
 def main():
     """Command-line interface."""
     import sys
     import io
+    import argparse
 
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-    if len(sys.argv) < 2:
-        print("Usage: python extract_modules.py <contract_file.txt> [output_file.json]")
-        print("  contract_file.txt: Input contract text file")
-        print("  output_file.json:  Optional output JSON file (if not specified, prints to stdout)")
-        sys.exit(1)
-
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
-
-    with open(input_file, 'r', encoding='utf-8') as f:
-        text = f.read()
-
-    modules = extract_modules(text)
-    result = json.dumps(modules, ensure_ascii=False, indent=2)
-
-    if output_file:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(result)
-        print(f"Modules extracted to {output_file}")
-    else:
-        print(result)
+    arg_parser = argparse.ArgumentParser(description="Decompose a contract into modules.")
+    arg_parser.add_argument('input_file', help="Input contract text file")
+    arg_parser.add_argument('output_file', nargs='?', default=None,
+                            help="Optional output JSON file (if not specified, prints to stdout)")
+    arg_parser.add_argument('--offsets', action='store_true',
+                            help="add start_line/end_line/char_start/char_end to every module")
+    arg_parser.add_argument('--no-text', action='store_true',
+                            help="omit module text (implies --offsets)")
+    arg_parser.add_argument('--mmap', dest='use_mmap', action='store_true', default=None,
+                            help=f"memory-map the input (default: only from {MMAP_THRESHOLD >> 20} MB)")
+    arg_parser.add_argument('--no-mmap', dest='use_mmap', action='store_false',
+                            help="always read the input into memory")
+    arg_parser.add_argument('--pack', action='append', default=[],
+                            help="pattern pack (YAML/JSON) to add; may be repeated")
+    arg_parser.add_argument('--auto-packs', action='store_true',
+                            help=f"also use the packs in {PACKS_DIR.name}/ whose fingerprint matches the contract")
+    arg_parser.add_argument('--format', dest='output_format', choices=['json', 'compact', 'jsonl'], default='json',
+                            help="json: one indented array (default); compact: the array without "
+                                 "whitespace; jsonl: one module per line")
+    arg_parser.add_argument('--profile', metavar='FILE',
+                            help="write per-phase timings and counters to FILE")
+    arg_parser.add_argument('--profile-format', choices=['json', 'pstats', 'speedscope'], default='json',
+                            help="json: phase stats (default); pstats: cProfile dump; speedscope: phase timeline")
+    args = arg_parser.parse_args()
+
+    # pstats come from cProfile alone, without the counting wrappers
+    profiler = PhaseProfiler() if args.profile and args.profile_format != 'pstats' else None
+    if args.profile and profiler is None:
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+
+    def phase(name):
+        return profiler.phase(name) if profiler is not None else nullcontext()
+
+    with phase('read'):
+        text = read_contract(args.input_file, args.use_mmap)
+    with phase('patterns'):
+        if args.auto_packs:
+            patterns = auto_patterns(text, extra=args.pack)
+        else:
+            patterns = registry_for_packs(args.pack)
+    modules = extract_modules(text, with_text=not args.no_text, with_offsets=args.offsets or args.no_text,
+                              patterns=patterns, profiler=profiler)
+
+    with phase('write'):
+        output = dump_modules(modules, args.output_format)
+        if profiler is not None:
+            profiler.count_bytes(len(output.encode('utf-8')))
+        if args.output_file:
+            with open(args.output_file, 'w', encoding='utf-8') as f:
+                f.write(output)
+        else:
+            sys.stdout.write(output if output.endswith('\n') else output + '\n')
+
+    if profiler is not None:
+        profiler.write(args.profile, args.profile_format, name=os.path.basename(args.input_file))
+    elif args.profile:
+        cprofile.disable()
+        cprofile.dump_stats(args.profile)
+    if args.output_file:
+        print(f"Modules extracted to {args.output_file}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Streaming Module Extraction
+Splits a dump of many contracts written back to back (as OCR systems
+deliver them) and extracts each contract's modules as soon as it is
+complete. Lines are read one at a time through a bounded look-ahead
+window, so memory is bounded by the largest single contract, not the dump.
+
+A contract ends where a new cover begins: once the current contract has
+reached its 盖章签字 or 附件, a contract title line (…合同/…协议) whose
+look-ahead window also holds a cover party line (甲方…：) and a
+preamble, TOC or body start is taken as the first line of the next one.
+"""
+
+import io
+import sys
+import json
+import argparse
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+
+from extract_modules import (DEFAULT_PATTERNS, PACKS_DIR, PatternRegistry, auto_patterns,
+                             extract_modules, registry_for_packs)
+
+LOOKAHEAD_LINES = 64
+
+
+def _marker_text(line: str) -> str:
+    """line without surrounding whitespace and Markdown heading marks."""
+    return line.strip().lstrip('#').strip()
+
+
+class ContractSplitter:
+    """Finds contract boundaries in a stream of lines."""
+
+    def __init__(self, patterns: Optional[PatternRegistry] = None, lookahead: int = LOOKAHEAD_LINES):
+        self.patterns = patterns or DEFAULT_PATTERNS
+        self.lookahead = lookahead
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new contract."""
+        self.body_seen = False
+        self.closing = False
+
+    def starts_contract(self, line: str, ahead: Iterable[str]) -> bool:
+        """Whether line opens a new contract, given the lines after it."""
+        if not self.closing:
+            return False
+        text = _marker_text(line)
+        if not text or not self.patterns['contract_title'].match(text):
+            return False
+        patterns = self.patterns
+        party = start = False
+        for following in ahead:
+            following = _marker_text(following)
+            if not following:
+                continue
+            if not party and patterns['party'].match(following) and \
+                    not patterns['signature_keyword'].search(following):
+                party = True
+            elif not start and (patterns['preamble'].match(following) or patterns['toc'].match(following)
+                                or patterns['body'].match(following)):
+                start = True
+            if party and start:
+                return True
+        return False
+
+    def feed(self, line: str) -> None:
+        """Advance the state of the current contract past line."""
+        if self.closing:
+            return
+        text = _marker_text(line)
+        if not text:
+            return
+        patterns = self.patterns
+        if not self.body_seen:
+            self.body_seen = bool(patterns['body'].match(text))
+        elif patterns['signature'].match(text) or patterns['party_signature'].match(text) or \
+                '（盖章）' in text or patterns['attachment'].match(text):
+            self.closing = True
+
+
+def split_contracts(lines: Iterable[str], patterns: Optional[PatternRegistry] = None,
+                    lookahead: int = LOOKAHEAD_LINES) -> Iterator[Dict]:
+    """Yield {"start_line", "char_start", "lines"} for each contract in a
+    dump, as soon as the first line of the next one has been confirmed.
+    Offsets are 0-based in the dump; trailing newlines on lines are dropped."""
+    splitter = ContractSplitter(patterns, lookahead)
+    window: Deque[str] = deque()
+    current: List[str] = []
+    start_line = char_start = line_num = offset = 0
+
+    def advance(line: str) -> Optional[Dict]:
+        nonlocal current, start_line, char_start, line_num, offset
+        done = None
+        if current and splitter.starts_contract(line, window):
+            done = {"start_line": start_line, "char_start": char_start, "lines": current}
+            current = []
+            start_line, char_start = line_num, offset
+            splitter.reset()
+        current.append(line)
+        splitter.feed(line)
+        line_num += 1
+        offset += len(line) + 1
+        return done
+
+    for line in lines:
+        window.append(line[:-1] if line.endswith('\n') else line)
+        if len(window) > lookahead:
+            done = advance(window.popleft())
+            if done:
+                yield done
+    while window:
+        done = advance(window.popleft())
+        if done:
+            yield done
+    if current:
+        yield {"start_line": start_line, "char_start": char_start, "lines": current}
+
+
+def stream_modules(lines: Iterable[str], with_text: bool = True, with_offsets: bool = False,
+                   patterns: Optional[PatternRegistry] = None, auto_packs: bool = False,
+                   extra_packs: Iterable[str] = (), lookahead: int = LOOKAHEAD_LINES) -> Iterator[Dict]:
+    """Yield {"contract", "title", "start_line", "end_line", "modules"} for
+    each contract in a dump, in order. Modules are extracted as for a
+    single contract, with the packs matching that contract when
+    auto_packs is set; with_offsets reports their spans in the dump."""
+    extra_packs = list(extra_packs)
+    for number, contract in enumerate(split_contracts(lines, patterns, lookahead), 1):
+        text = '\n'.join(contract["lines"])
+        registry = auto_patterns(text, extra=extra_packs) if auto_packs else patterns
+        modules = extract_modules(text, with_text, with_offsets, registry)
+        if with_offsets:
+            for module in modules:
+                module['start_line'] += contract["start_line"]
+                module['end_line'] += contract["start_line"]
+                module['char_start'] += contract["char_start"]
+                module['char_end'] += contract["char_start"]
+        title = next((_marker_text(l) for l in contract["lines"] if l.strip()), '')
+        yield {
+            "contract": number,
+            "title": title,
+            "start_line": contract["start_line"],
+            "end_line": contract["start_line"] + len(contract["lines"]) - 1,
+            "modules": modules,
+        }
+
+
+def main():
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    arg_parser = argparse.ArgumentParser(description="Split a dump of many contracts and extract each one's modules.")
+    arg_parser.add_argument('input_file', help="dump of contracts back to back, or - for stdin")
+    arg_parser.add_argument('output_file', nargs='?', default=None,
+                            help="JSON Lines output, one contract per line (default: stdout)")
+    arg_parser.add_argument('--offsets', action='store_true',
+                            help="add start_line/end_line/char_start/char_end (into the dump) to every module")
+    arg_parser.add_argument('--no-text', action='store_true', help="omit module text (implies --offsets)")
+    arg_parser.add_argument('--lookahead', type=int, default=LOOKAHEAD_LINES,
+                            help="lines read ahead to confirm a new cover (default: %(default)s)")
+    arg_parser.add_argument('--pack', action='append', default=[],
+                            help="pattern pack (YAML/JSON) to add; may be repeated")
+    arg_parser.add_argument('--auto-packs', action='store_true',
+                            help=f"also use the packs in {PACKS_DIR.name}/ whose fingerprint matches each contract")
+    args = arg_parser.parse_args()
+
+    patterns = registry_for_packs(args.pack)
+    if args.input_file == '-':
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+    else:
+        source = open(args.input_file, 'r', encoding='utf-8')
+    out = open(args.output_file, 'w', encoding='utf-8') if args.output_file else sys.stdout
+    count = 0
+    try:
+        for contract in stream_modules(source, with_text=not args.no_text,
+                                       with_offsets=args.offsets or args.no_text, patterns=patterns,
+                                       auto_packs=args.auto_packs, extra_packs=args.pack,
+                                       lookahead=args.lookahead):
+            out.write(json.dumps(contract, ensure_ascii=False) + '\n')
+            out.flush()
+            count += 1
+    finally:
+        if args.input_file != '-':
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    if args.output_file:
+        print(f"{count} contracts extracted to {args.output_file}")
+
+
+if __name__ == '__main__':
+    main()
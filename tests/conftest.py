@@ -0,0 +1,12 @@
+import sys
+from pathlib import Path
+
+SKILLS_DIR = Path(__file__).resolve().parents[1] / 'skills'
+for skill in ('contract-analyzer', 'contract-clause-element-analyzer',
+              'contract-module-extractor', 'contract-clause-parser'):
+    scripts = str(SKILLS_DIR / skill / 'scripts')
+    if scripts not in sys.path:
+        sys.path.insert(0, scripts)
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+SAMPLES = Path(__file__).resolve().parents[1] / 'data' / 'contract-samples'
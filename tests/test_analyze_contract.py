@@ -0,0 +1,35 @@
+from analyze_contract import analyze
+from conftest import FIXTURES
+from parse_contract import ContractParser
+
+# Only the cover names the construction parties; the body calls them 甲方/乙方
+TEXT = (FIXTURES / 'cover-toc-body.md').read_text(encoding='utf-8')
+
+BODY_PATHS = ['~/第一条', '~/第一条/第一款', '~/第一条/第二款',
+              '~/第二条', '~/第二条/第一款', '~/第二条/第二款', '~/第二条/第三款',
+              '~/第三条', '~/第三条/第一款', '~/第三条/第二款']
+
+
+def test_fixture_has_cover_toc_and_body():
+    types = [m['type'] for m in analyze(TEXT)['modules']]
+    assert types[:3] == ['封面', '目录', '正文']
+
+
+def test_packs_are_selected_from_the_document_head():
+    clauses = analyze(TEXT, auto_packs=True)['clauses']
+    assert [c['path'] for c in clauses] == BODY_PATHS
+
+
+def test_style_is_detected_from_the_document_head():
+    parser = ContractParser()
+    analyze(TEXT, parser=parser)
+    reference = ContractParser()
+    expected = reference.detect_style(TEXT.split('\n')[:100])
+    assert parser.style_detected == expected
+    assert parser.style_profile == reference.style_profile
+
+
+def test_toc_entries_are_not_clauses():
+    clauses = analyze(TEXT)['clauses']
+    assert [c['path'] for c in clauses] == ['~/第一条', '~/第二条', '~/第三条']
+    assert not any('......' in c['clause'] for c in clauses)
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from conftest import FIXTURES
+from parse_contract import OUTPUT_FORMATS, BinaryClauseWriter, ContractParser, load_clauses, read_binary_clauses
+
+FIXTURE_NAMES = ['construction', 'data-centre-maintenance', 'vehicle-leasing', 'cover-toc-body']
+
+
+def parsed(name, with_spans=False):
+    text = (FIXTURES / f'{name}.md').read_text(encoding='utf-8')
+    return list(ContractParser(auto_packs=True).iter_clauses(text.split('\n'), with_spans=with_spans))
+
+
+def encode(clauses, spans=False):
+    out = io.BytesIO()
+    writer = BinaryClauseWriter(out, spans=spans)
+    for clause in clauses:
+        writer.write(clause)
+    assert writer.close() == len(out.getvalue())
+    return out.getvalue()
+
+
+@pytest.mark.parametrize('output_format', OUTPUT_FORMATS)
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_parse_output_loads_back(tmp_path, name, output_format):
+    output = tmp_path / 'clauses'
+    ContractParser(auto_packs=True).parse(str(FIXTURES / f'{name}.md'), str(output), output_format)
+    assert load_clauses(str(output)) == parsed(name)
+
+
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_spans_round_trip(tmp_path, name):
+    clauses = parsed(name, with_spans=True)
+    output = tmp_path / 'clauses.bin'
+    output.write_bytes(encode(clauses, spans=True))
+    assert load_clauses(str(output)) == clauses
+
+
+def test_paths_and_text_round_trip():
+    clauses = [
+        {'path': '~', 'clause': '合同首部'},
+        {'path': '~/第一条', 'clause': ''},
+        {'path': '~/第一条/1.1', 'clause': '含\n换行与 emoji 🙂 的条文'},
+        {'path': '~/第二条', 'clause': '第二条'},
+        {'path': '~/第一条/1.1', 'clause': '重复出现的路径'},
+    ]
+    assert read_binary_clauses(encode(clauses)) == clauses
+
+
+def test_no_clauses():
+    assert read_binary_clauses(encode([])) == []
+    assert read_binary_clauses(encode([], spans=True)) == []
+
+
+def test_rejects_other_data():
+    data = encode(parsed('construction'))
+    with pytest.raises(ValueError):
+        read_binary_clauses(b'[]')
+    with pytest.raises(ValueError):
+        read_binary_clauses(data[:4] + bytes([99]) + data[5:])
+    with pytest.raises(ValueError):
+        read_binary_clauses(data[:-1])
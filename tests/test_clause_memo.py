@@ -0,0 +1,85 @@
+import json
+import os
+import random
+import re
+
+import pytest
+
+import extract_elements
+from conftest import FIXTURES, SAMPLES
+from extract_elements import ClauseMemo, ElementExtractor
+from parse_contract import ContractParser
+
+PARTY_NAMES = ['上海某某科技有限公司', '北京二〇二四工程公司', 'ABC 123 Ltd', '中建三局']
+
+
+@pytest.fixture(scope='module')
+def clauses():
+    found = []
+    for path in sorted(SAMPLES.glob('*.md')) + sorted(FIXTURES.glob('*.md')):
+        text = path.read_text(encoding='utf-8')
+        found += ContractParser(auto_packs=True).iter_clauses(text.split('\n'))
+    return found
+
+
+def variants(clauses, rounds=3):
+    """Copies of clauses with other digits, party names and article numbers,
+    which share their templates."""
+    rng = random.Random(24)
+    copies = []
+    for _ in range(rounds):
+        for clause in clauses:
+            text = re.sub(r'\d', lambda m: str(rng.randrange(10)), clause['clause'])
+            text = re.sub(r'(?m)^(\s*[甲乙丙]方\s*[:：]\s*)([^\n（(，,；;]*)',
+                          lambda m: m.group(1) + rng.choice(PARTY_NAMES), text)
+            text = re.sub(r'^第[一二三四五六七八九十]+条', lambda m: '第' + rng.choice('一二三四五六七八九十') + '条', text)
+            copies.append({'path': clause['path'], 'clause': text})
+    return copies
+
+
+@pytest.mark.parametrize('max_entries', [8, 10_000])
+def test_memo_matches_direct_extraction(clauses, max_entries):
+    direct = ElementExtractor()
+    memoized = ElementExtractor(memo=ClauseMemo(max_entries))
+    corpus = clauses + variants(clauses)
+    for clause in corpus + corpus:
+        assert memoized.extract(clause) == direct.extract(clause), clause['clause']
+    stats = memoized.memo.stats()
+    assert stats['clauses'] == 2 * len(corpus)
+    assert stats['entries'] <= max_entries
+    if max_entries > len(corpus):
+        assert stats['hits'] >= len(corpus)
+
+
+def test_saved_memo_hits(tmp_path, clauses):
+    memo = ClauseMemo()
+    learner = ElementExtractor(memo=memo)
+    for clause in clauses:
+        learner.extract(clause)
+    memo.save(tmp_path / 'memo.json')
+
+    loaded = ClauseMemo.load(tmp_path / 'memo.json')
+    assert list(loaded.entries) == list(memo.entries)
+    direct = ElementExtractor()
+    memoized = ElementExtractor(memo=loaded)
+    for clause in variants(clauses, rounds=1):
+        assert memoized.extract(clause) == direct.extract(clause)
+    assert loaded.hits and not loaded.misses
+
+
+def test_load_ignores_stale_or_broken_memos(tmp_path):
+    path = tmp_path / 'memo.json'
+    assert not ClauseMemo.load(path).entries
+    path.write_text('{', encoding='utf-8')
+    assert not ClauseMemo.load(path).entries
+    path.write_text(json.dumps({'fingerprint': 'other', 'entries': [['key', None]]}), encoding='utf-8')
+    assert not ClauseMemo.load(path).entries
+
+
+def test_failed_save_leaves_no_temporary_file(tmp_path, monkeypatch):
+    def fail(src, dst):
+        raise OSError('disk full')
+    monkeypatch.setattr(extract_elements.os, 'replace', fail)
+    with pytest.raises(OSError):
+        ClauseMemo().save(tmp_path / 'memo.json')
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,79 @@
+import pytest
+
+from clause_tree import ClauseTree
+from conftest import FIXTURES
+from parse_contract import ContractParser
+
+FIXTURE_NAMES = ['construction', 'data-centre-maintenance', 'vehicle-leasing', 'cover-toc-body']
+
+
+def read_fixture(name):
+    return (FIXTURES / f'{name}.md').read_text(encoding='utf-8')
+
+
+def build(text, with_spans=False):
+    return ClauseTree.build(text.split('\n'), ContractParser(auto_packs=True), with_spans=with_spans)
+
+
+def under(clauses, path):
+    return [c for c in clauses if c['path'] == path or c['path'].startswith(path + '/')]
+
+
+@pytest.mark.parametrize('with_spans', [False, True])
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_save_and_load(tmp_path, name, with_spans):
+    tree = build(read_fixture(name), with_spans)
+    tree.save(str(tmp_path / 'tree.bin'))
+    loaded = ClauseTree.load(str(tmp_path / 'tree.bin'))
+    assert loaded.clauses == tree.clauses
+    assert set(loaded.nodes) == set(tree.nodes)
+
+
+@pytest.mark.parametrize('name', FIXTURE_NAMES + ['all'])
+def test_subtree_matches_path_prefix(name):
+    # Joined together, the fixtures repeat paths far apart from each other
+    text = '\n'.join(read_fixture(n) for n in FIXTURE_NAMES) if name == 'all' else read_fixture(name)
+    tree = build(text)
+    for path, node in tree.nodes.items():
+        expected = under(tree.clauses, path)
+        assert tree.subtree(path) == expected
+        assert node.count == len(expected)
+        assert tree.at(path) == [c for c in tree.clauses if c['path'] == path]
+
+
+def test_queries():
+    tree = build(read_fixture('data-centre-maintenance'))
+    assert len(tree) == 10
+    assert '~/第一条/1.2' in tree
+    assert tree.children('~/第一条') == ['~/第一条/1.1', '~/第一条/1.2']
+    assert tree.children('~/第三条') == []
+    assert [c['path'] for c in tree.subtree('~/第一条/1.2')] == ['~/第一条/1.2', '~/第一条/1.2/1）', '~/第一条/1.2/2）']
+    assert tree.subtree('~/第三条') == []
+    assert [c['path'] for c in tree.range('~/第一条/1.2', '~/第二条')] == [
+        '~/第一条/1.2', '~/第一条/1.2/1）', '~/第一条/1.2/2）', '~/第二条', '~/第二条/2.1']
+    assert tree.range('~/第一条', '~/第三条') == []
+
+
+def test_resolve():
+    tree = build(read_fixture('data-centre-maintenance'))
+    assert [n.path for n in tree.resolve('~/第一条/1.1')] == ['~/第一条/1.1']
+    assert [n.path for n in tree.resolve('第一条/1.1')] == ['~/第一条/1.1']
+    assert [n.path for n in tree.resolve('1）')] == ['~/第一条/1.1/1）', '~/第一条/1.2/1）']
+    assert tree.resolve('第九条') == []
+
+
+def test_walk_is_depth_first_in_heading_order():
+    tree = build(read_fixture('data-centre-maintenance'))
+    assert [n.path for n in tree.walk('~/第一条')] == [
+        '~/第一条', '~/第一条/1.1', '~/第一条/1.1/1）', '~/第一条/1.1/2）', '~/第一条/1.1/3）',
+        '~/第一条/1.2', '~/第一条/1.2/1）', '~/第一条/1.2/2）']
+    assert list(tree.walk('~/第三条')) == []
+
+
+def test_add_keeps_subtree_bounds():
+    tree = ClauseTree()
+    for path in ['~/第一条', '~/第一条/1.1', '~/第二条', '~/第一条/1.1']:
+        tree.add({'path': path, 'clause': path})
+    assert [c['path'] for c in tree.subtree('~/第一条')] == ['~/第一条', '~/第一条/1.1', '~/第一条/1.1']
+    assert tree['~/第一条'].first == 0 and tree['~/第一条'].last == 3 and tree['~/第一条'].count == 3
+    assert tree['~'].count == 4
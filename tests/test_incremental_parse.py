@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from conftest import FIXTURES
+from incremental_parse import STYLE_HEAD_LINES, IncrementalParser
+from parse_contract import ContractParser
+
+FIXTURE_NAMES = ['cover-toc-body', 'construction', 'data-centre-maintenance', 'vehicle-leasing']
+
+
+def long_contract():
+    """cover-toc-body.md with enough further articles that edits reach past
+    the lines packs and the style are chosen from."""
+    lines = (FIXTURES / 'cover-toc-body.md').read_text(encoding='utf-8').split('\n')
+    signature = lines.index('甲方签字盖章：')
+    extra = []
+    for article in ['四', '五', '六', '七', '八', '九', '十', '十一', '十二', '十三', '十四']:
+        extra += [f'第{article}条 其他约定', '']
+        for paragraph in '一二三四':
+            extra += [f'第{paragraph}款 甲方与乙方就第{article}条第{paragraph}款另行约定。', '']
+    text = '\n'.join(lines[:signature] + extra + lines[signature:])
+    assert text.count('\n') > STYLE_HEAD_LINES + 40
+    return text
+
+
+def fixture_text(name):
+    if name == 'long':
+        return long_contract()
+    return (FIXTURES / f'{name}.md').read_text(encoding='utf-8')
+
+
+def edits(text, rng, count):
+    """count single-line edits of text: rewrite, delete, insert a heading,
+    or turn a line into plain text."""
+    lines = text.split('\n')
+    for _ in range(count):
+        i = rng.randrange(len(lines))
+        edited = list(lines)
+        kind = rng.randrange(4)
+        if kind == 0:
+            edited[i] = edited[i] + '（已修订）'
+        elif kind == 1:
+            del edited[i]
+        elif kind == 2:
+            edited.insert(i, rng.choice(['第一款 新增内容', '第十一条 新增条款', '1.1 新增', '']))
+        else:
+            edited[i] = '普通文字'
+        yield '\n'.join(edited)
+
+
+def full_parse(text, auto_packs):
+    return list(ContractParser(auto_packs=auto_packs).iter_clauses(text.split('\n'), with_spans=True))
+
+
+@pytest.mark.parametrize('auto_packs', [False, True])
+@pytest.mark.parametrize('name', ['long'] + FIXTURE_NAMES)
+def test_update_matches_full_parse(name, auto_packs):
+    text = fixture_text(name)
+    rng = random.Random(name)
+    for edited in edits(text, rng, 60):
+        incremental = IncrementalParser(ContractParser(auto_packs=auto_packs))
+        incremental.parse(text)
+        incremental.update(edited)
+        assert incremental.clauses == full_parse(edited, auto_packs)
+
+
+def test_edits_past_the_head_keep_pack_styles():
+    text = long_contract()
+    lines = text.split('\n')
+    i = lines.index('第三款 甲方与乙方就第十三条第三款另行约定。')
+    assert i > STYLE_HEAD_LINES
+    lines[i] = '第三款 甲方与乙方就第十三条第三款另行约定，并签订补充协议。'
+
+    incremental = IncrementalParser(ContractParser(auto_packs=True))
+    incremental.parse(text)
+    changes = incremental.update('\n'.join(lines))
+    assert changes == {'added': [], 'removed': [], 'modified': ['~/第十三条/第三款']}
+    assert incremental.clauses == full_parse('\n'.join(lines), True)
+
+
+def test_successive_updates():
+    rng = random.Random(11)
+    incremental = IncrementalParser(ContractParser(auto_packs=True))
+    text = long_contract()
+    incremental.parse(text)
+    for _ in range(30):
+        text = next(edits(text, rng, 1))
+        incremental.update(text)
+        assert incremental.clauses == full_parse(text, True)
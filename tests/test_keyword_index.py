@@ -0,0 +1,55 @@
+import random
+
+from keyword_index import KeywordIndex
+
+CATEGORIES = ['付款', '违约', '保密', '交付', '争议']
+# A small alphabet makes keywords share prefixes and suffixes, so the scan
+# follows long failure chains
+ALPHABET = '付款违约金甲乙方'
+
+
+def random_keywords(rng, count):
+    keywords = {category: [] for category in CATEGORIES}
+    for _ in range(count):
+        word = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 6)))
+        keywords[rng.choice(CATEGORIES)].append(word)
+    return keywords
+
+
+def naive_hits(keywords, text):
+    """(end offset, keyword, categories) for every occurrence, by brute force."""
+    owners = {}
+    for category, words in keywords.items():
+        for word in words:
+            if category not in owners.setdefault(word, []):
+                owners[word].append(category)
+    hits = []
+    for word, categories in owners.items():
+        start = text.find(word)
+        while start >= 0:
+            hits.append((start + len(word), word, tuple(categories)))
+            start = text.find(word, start + 1)
+    return hits
+
+
+def test_matches_naive_scan_with_thousands_of_keywords():
+    rng = random.Random(13)
+    keywords = random_keywords(rng, 3000)
+    index = KeywordIndex(keywords)
+    for _ in range(50):
+        text = ''.join(rng.choice(ALPHABET + '。、') for _ in range(rng.randint(0, 400)))
+        expected = naive_hits(keywords, text)
+        assert sorted(index.finditer(text)) == sorted(expected)
+        counts = dict.fromkeys(CATEGORIES, 0)
+        for _, _, categories in expected:
+            for category in categories:
+                counts[category] += 1
+        assert index.counts(text) == counts
+        assert index.contains_any(text) == bool(expected)
+
+
+def test_overlapping_keywords():
+    index = KeywordIndex({'a': ['违约', '违约金'], 'b': ['约金', '金']})
+    assert [(end, word) for end, word, _ in index.finditer('支付违约金')] == \
+        [(4, '违约'), (5, '违约金'), (5, '约金'), (5, '金')]
+    assert index.counts('违约金违约') == {'a': 3, 'b': 2}
@@ -0,0 +1,102 @@
+import json
+import re
+
+import pytest
+
+import extract_modules
+import parse_contract
+import pattern_packs
+from conftest import FIXTURES
+from extract_modules import auto_patterns, extract_modules as extract
+from parse_contract import ContractParser
+from pattern_packs import FINGERPRINT_LINES, available_packs, fingerprint_hits, load_pattern_pack, select_packs
+
+PACKS = ['construction', 'data-centre-maintenance', 'vehicle-leasing']
+
+# Paths the pack's heading style adds to each fixture; every one of them
+# is a direct child of its article or subsection.
+PACK_PATHS = {
+    'construction': ['~/第一条/第一款', '~/第一条/第二款', '~/第一条/第三款',
+                     '~/第二条/第一款', '~/第二条/第二款'],
+    'data-centre-maintenance': ['~/第一条/1.1/1）', '~/第一条/1.1/2）', '~/第一条/1.1/3）',
+                                '~/第一条/1.2/1）', '~/第一条/1.2/2）'],
+    'vehicle-leasing': ['~/第一条/（一）', '~/第一条/（二）', '~/第一条/（三）',
+                        '~/第二条/（一）', '~/第二条/（二）'],
+}
+
+
+def read_fixture(name):
+    return (FIXTURES / f'{name}.md').read_text(encoding='utf-8')
+
+
+def pack_headings(name, paths):
+    """The paths whose last heading is one of the pack's styles."""
+    pack = load_pattern_pack(parse_contract.PACKS_DIR / f'{name}.yaml')
+    styles = [re.compile(entry['pattern']) for entry in pack['heading_styles']]
+    return [p for p in paths if any(style.fullmatch(p.rsplit('/', 1)[1]) for style in styles)]
+
+
+def head_of(text):
+    return '\n'.join(text.split('\n')[:FINGERPRINT_LINES])
+
+
+def test_extractor_uses_the_parser_loader():
+    assert extract_modules.available_packs is pattern_packs.available_packs
+    assert extract_modules.select_packs is pattern_packs.select_packs
+    assert parse_contract.select_packs is pattern_packs.select_packs
+
+
+def test_repeated_fingerprint_word_counts_once():
+    pack = {'fingerprint': ['工程', '施工'], 'min_hits': 2}
+    assert fingerprint_hits('工程 工程 工程', pack) == 1
+    assert select_packs('工程 工程 工程', [pack]) == []
+    assert select_packs('工程 施工', [pack]) == [pack]
+
+
+@pytest.mark.parametrize('name', PACKS)
+@pytest.mark.parametrize('directory', [parse_contract.PACKS_DIR, extract_modules.PACKS_DIR])
+def test_fixture_selects_only_its_pack(name, directory):
+    selected = select_packs(head_of(read_fixture(name)), available_packs(directory))
+    assert [pack['name'] for pack in selected] == [name]
+
+
+@pytest.mark.parametrize('name', PACKS)
+def test_pack_headings_stay_siblings(name):
+    text = read_fixture(name)
+    paths = [c['path'] for c in ContractParser(auto_packs=True).iter_clauses(text.split('\n'))]
+    assert pack_headings(name, paths) == PACK_PATHS[name]
+
+
+@pytest.mark.parametrize('name', PACKS)
+def test_packs_are_opt_in(name):
+    text = read_fixture(name)
+    paths = [c['path'] for c in ContractParser().iter_clauses(text.split('\n'))]
+    assert pack_headings(name, paths) == []
+    types = [m['type'] for m in extract(text)]
+    assert '盖章签字' not in types and '附件' not in types
+
+
+@pytest.mark.parametrize('name', PACKS)
+def test_auto_patterns_add_pack_modules(name):
+    text = read_fixture(name)
+    types = [m['type'] for m in extract(text, patterns=auto_patterns(text))]
+    assert '盖章签字' in types and '附件' in types
+
+
+def test_pack_levels_do_not_leak_into_the_next_document(tmp_path):
+    # Two packs define the same style name at different levels
+    for name, fingerprint, level in [('a', ['甲型'], 2), ('b', ['乙型'], 3)]:
+        (tmp_path / f'{name}.json').write_text(json.dumps({
+            'name': name, 'fingerprint': fingerprint,
+            'heading_styles': [{'pattern': '(【[一二三四五六七八九十]+】)', 'style': 'bracket',
+                                'leads': '【', 'level': level}],
+        }), encoding='utf-8')
+    first = ['甲型合同', '第一条 总则', '1.1 定义', '【一】甲', '【二】乙']
+    second = ['乙型合同', '第一条 总则', '1.1 定义', '【一】甲', '【二】乙']
+
+    parser = ContractParser(auto_packs=True, pack_dir=tmp_path)
+    list(parser.iter_clauses(first))
+    reused = [c['path'] for c in parser.iter_clauses(second)]
+    fresh = [c['path'] for c in ContractParser(auto_packs=True, pack_dir=tmp_path).iter_clauses(second)]
+    assert reused == fresh == ['~/第一条', '~/第一条/1.1', '~/第一条/1.1/【一】', '~/第一条/1.1/【二】']
+    assert 'bracket' not in parser.style_levels
@@ -0,0 +1,56 @@
+import pytest
+
+import parallel_parse
+from conftest import FIXTURES
+from parallel_parse import iter_clauses_parallel, parse_parallel
+from parse_contract import OUTPUT_FORMATS, ContractParser
+
+FIXTURE_NAMES = ['construction', 'data-centre-maintenance', 'vehicle-leasing', 'cover-toc-body']
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # The fixtures are a few KB; let them split into several chunks
+    monkeypatch.setattr(parallel_parse, 'MIN_CHUNK_CHARS', 1024)
+
+
+def tiled(name, copies=20):
+    return '\n'.join([(FIXTURES / f'{name}.md').read_text(encoding='utf-8')] * copies)
+
+
+@pytest.mark.parametrize('auto_packs', [False, True])
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_clauses_match_sequential_parse(name, auto_packs):
+    text = tiled(name)
+    assert len(parallel_parse._plan(text, ContractParser(auto_packs=auto_packs), 3)) > 1
+    for with_spans in (False, True):
+        expected = list(ContractParser(auto_packs=auto_packs).iter_clauses(text.split('\n'), with_spans=with_spans))
+        parallel = list(iter_clauses_parallel(text, ContractParser(auto_packs=auto_packs), workers=3,
+                                              with_spans=with_spans))
+        assert parallel == expected
+
+
+@pytest.mark.parametrize('output_format', OUTPUT_FORMATS)
+@pytest.mark.parametrize('name', FIXTURE_NAMES)
+def test_output_matches_sequential_parse(tmp_path, name, output_format):
+    text = tiled(name)
+    source = tmp_path / 'contract.md'
+    source.write_text(text, encoding='utf-8')
+    ContractParser(auto_packs=True).parse(str(source), str(tmp_path / 'sequential'), output_format)
+    parse_parallel(text, str(tmp_path / 'parallel'), output_format, ContractParser(auto_packs=True), workers=3)
+    assert (tmp_path / 'parallel').read_bytes() == (tmp_path / 'sequential').read_bytes()
+
+
+@pytest.mark.parametrize('output_format', OUTPUT_FORMATS)
+def test_output_without_clauses(tmp_path, output_format):
+    text = '\n'.join(['甲方与乙方友好协商，订立本合同。'] * 200)
+    source = tmp_path / 'contract.md'
+    source.write_text(text, encoding='utf-8')
+    ContractParser().parse(str(source), str(tmp_path / 'sequential'), output_format)
+    parse_parallel(text, str(tmp_path / 'parallel'), output_format, workers=3)
+    assert (tmp_path / 'parallel').read_bytes() == (tmp_path / 'sequential').read_bytes()
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        parse_parallel('第一条 总则', str(tmp_path / 'out'), 'xml')
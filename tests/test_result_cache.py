@@ -0,0 +1,50 @@
+import hashlib
+
+import pytest
+
+import result_cache
+from result_cache import ResultCache, file_digest
+
+
+def test_file_digest_without_hashlib_file_digest(tmp_path, monkeypatch):
+    data = b'x' * (3 * result_cache.DIGEST_CHUNK + 17)
+    path = tmp_path / 'contract.txt'
+    path.write_bytes(data)
+    monkeypatch.delattr(hashlib, 'file_digest', raising=False)
+    assert file_digest(path) == hashlib.sha256(data).hexdigest()
+
+
+def test_cache_stays_within_bound(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=2000, fingerprint='test')
+    for i in range(50):
+        cache.put(f'{i:064x}', {'clauses': ['x' * 100]})
+    sizes = [entry.stat().st_size for entry in tmp_path.glob('*.json')]
+    assert sum(sizes) <= 2000
+    assert cache.get(f'{49:064x}') is not None
+    assert cache.get(f'{0:064x}') is None
+
+
+def test_failed_put_leaves_no_temporary_file(tmp_path):
+    cache = ResultCache(tmp_path, fingerprint='test')
+    with pytest.raises(TypeError):
+        cache.put('0' * 64, {'clauses': object()})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_pack_loader_is_fingerprinted():
+    assert any(source.name == 'pattern_packs.py' for source in result_cache.FINGERPRINT_SOURCES)
+
+
+def test_editing_a_source_changes_the_fingerprint(tmp_path):
+    sources = []
+    for source in result_cache.FINGERPRINT_SOURCES:
+        copy = tmp_path / f'{len(sources)}-{source.name}'
+        copy.write_bytes(source.read_bytes())
+        sources.append(copy)
+    before = result_cache.code_fingerprint(sources)
+    assert before == result_cache.code_fingerprint()
+    for copy in sources:
+        original = copy.read_bytes()
+        copy.write_bytes(original + b'\n# edited\n')
+        assert result_cache.code_fingerprint(sources) != before, copy.name
+        copy.write_bytes(original)
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from conftest import FIXTURES
+from search_index import _RUN, SearchIndex, load_source, normalize, segments_of
+
+FIXTURE_NAMES = ['construction', 'data-centre-maintenance', 'vehicle-leasing', 'cover-toc-body']
+
+
+@pytest.fixture(scope='module')
+def sources():
+    return [load_source(FIXTURES / f'{name}.md') for name in FIXTURE_NAMES]
+
+
+@pytest.fixture
+def index(tmp_path, sources):
+    with SearchIndex(str(tmp_path / 'index.db')) as index:
+        for source in sources:
+            index.add(source['name'], source['modules'], source['clauses'])
+        yield index
+
+
+def segments(sources, names=None):
+    return [(s['name'], module, path, text) for s in sources if names is None or s['name'] in names
+            for module, path, text in segments_of(s['modules'], s['clauses'])]
+
+
+def found(results):
+    return sorted((r['contract'], r['module'], r['path'], r['clause']) for r in results)
+
+
+def test_search_matches_substring_scan(index, sources):
+    everything = segments(sources)
+    rng = random.Random(20)
+    for _ in range(200):
+        text = rng.choice(everything)[3]
+        run = rng.choice(_RUN.findall(normalize(text)))
+        start = rng.randrange(len(run))
+        query = run[start:start + rng.randint(1, 6)]
+        expected = sorted(s for s in everything if query in normalize(s[3]))
+        assert found(index.search(query, limit=None)) == expected, query
+
+
+def test_every_term_must_occur(index, sources):
+    expected = sorted(s for s in segments(sources) if '甲方' in s[3] and '违约' in s[3])
+    assert expected
+    assert found(index.search('甲方 违约', limit=None)) == expected
+
+
+def test_filters(index, sources):
+    everything = segments(sources)
+    under = [s for s in everything if s[2] == '~/第一条' or (s[2] or '').startswith('~/第一条/')]
+    assert found(index.search('', paths=['第一条'], limit=None)) == sorted(under)
+    assert found(index.search('', paths=['~/第一条'], limit=None)) == sorted(under)
+    signatures = [s for s in everything if s[1] == '盖章签字']
+    assert signatures
+    assert found(index.search('', modules=['盖章签字'], limit=None)) == sorted(signatures)
+    assert found(index.search('', contracts=['construction'], limit=None)) == sorted(
+        segments(sources, {'construction'}))
+    assert found(index.search('甲方', contracts=['construction'], limit=None)) == sorted(
+        s for s in segments(sources, {'construction'}) if '甲方' in s[3])
+    assert index.search('甲方', contracts=['missing']) == []
+    assert all(r['clause'].startswith('第') for r in index.search('', pattern='^第', limit=None))
+
+
+def test_results_in_document_order(index, sources):
+    results = index.search('甲方', contracts=['construction'], limit=None)
+    order = [(s[2], s[3]) for s in segments(sources, {'construction'})]
+    positions = [order.index((r['path'], r['clause'])) for r in results]
+    assert positions == sorted(positions)
+    assert index.search('甲方', contracts=['construction'], limit=2) == results[:2]
+
+
+def test_replace(index, sources):
+    source = sources[0]
+    clauses = [{'path': '~/第一条', 'clause': '第一条 本合同已由补充协议替代。'}]
+    index.add(source['name'], [], clauses)
+    assert index.contracts() == sorted(FIXTURE_NAMES)
+    assert found(index.search('', contracts=[source['name']], limit=None)) == [
+        (source['name'], '正文', '~/第一条', '第一条 本合同已由补充协议替代。')]
+    assert found(index.search('补充协议', limit=None)) == found(index.search('补充协议', limit=None,
+                                                                     contracts=[source['name']]))
+    others = [s for s in segments(sources) if s[0] != source['name'] and '甲方' in s[3]]
+    assert found(index.search('甲方', limit=None)) == sorted(others)
+
+
+def test_remove(index, sources):
+    assert index.remove('vehicle-leasing')
+    assert not index.remove('vehicle-leasing')
+    assert 'vehicle-leasing' not in index.contracts()
+    remaining = [s for s in segments(sources) if s[0] != 'vehicle-leasing']
+    assert found(index.search('', limit=None)) == sorted(remaining)
+    assert found(index.search('乙方', limit=None)) == sorted(s for s in remaining if '乙方' in s[3])
+    assert index.stats()['segments'] == len(remaining)
+
+
+def test_reopen(tmp_path, index, sources):
+    expected = index.search('合同', limit=None)
+    index.close()
+    with SearchIndex(str(tmp_path / 'index.db')) as reopened:
+        assert reopened.search('合同', limit=None) == expected
+        assert reopened.contracts() == sorted(FIXTURE_NAMES)
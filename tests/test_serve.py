@@ -0,0 +1,98 @@
+import asyncio
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from serve import INVALID_PARAMS, TIMED_OUT, ContractService, RPCError
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'contracts').mkdir()
+    (tmp_path / 'contracts' / 'a.md').write_text('第一条 标的', encoding='utf-8')
+    (tmp_path / 'secret.txt').write_text('x', encoding='utf-8')
+    return tmp_path / 'contracts'
+
+
+def invalid(service, params):
+    with pytest.raises(RPCError) as error:
+        service._document(params)
+    assert error.value.code == INVALID_PARAMS
+    return error.value.message
+
+
+def test_path_is_resolved_under_root(root):
+    service = ContractService(root=root)
+    assert service._document({'path': 'a.md'})['path'] == str(root / 'a.md')
+    assert service._document({'path': str(root / 'a.md')})['path'] == str(root / 'a.md')
+
+
+@pytest.mark.parametrize('path', ['../secret.txt', '/etc/passwd', 'missing.md', '.'])
+def test_paths_outside_root_are_refused(root, path):
+    invalid(ContractService(root=root), {'path': path})
+
+
+def test_symlink_out_of_root_is_refused(root):
+    (root / 'link.md').symlink_to(root.parent / 'secret.txt')
+    invalid(ContractService(root=root), {'path': 'link.md'})
+
+
+def test_without_root_only_text_is_accepted(root):
+    service = ContractService()
+    invalid(service, {'path': str(root / 'a.md')})
+    assert service._document({'text': '第一条 标的'})['text'] == '第一条 标的'
+
+
+@pytest.mark.parametrize('timeout', [0, -1, '5', True, float('nan'), float('inf')])
+def test_timeout_must_be_a_positive_number(timeout):
+    invalid(ContractService(), {'text': '', 'timeout': timeout})
+
+
+def test_timeout_accepts_int_and_float():
+    for timeout in (1, 0.5):
+        assert ContractService()._document({'text': '', 'timeout': timeout})['timeout'] == timeout
+
+
+class StalledPool:
+    """A pool whose work never finishes."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, function, *args):
+        self.submitted += 1
+        return Future()
+
+
+def submit_with_busy_slot(timeout, hold):
+    """Submit while another request holds the only slot for hold seconds;
+    (error code, seconds until the error, service)."""
+    async def run():
+        service = ContractService(max_inflight=1)
+        service._loop = asyncio.get_running_loop()
+        service._slots = asyncio.Semaphore(1)
+        service._pool = StalledPool()
+        await service._slots.acquire()
+        service._loop.call_later(hold, service._slots.release)
+        start = time.monotonic()
+        with pytest.raises(RPCError) as error:
+            await service._submit(print, timeout=timeout)
+        return error.value.code, time.monotonic() - start, service
+    return asyncio.run(run())
+
+
+def test_timeout_covers_the_wait_for_a_slot():
+    code, elapsed, service = submit_with_busy_slot(timeout=0.2, hold=5)
+    assert code == TIMED_OUT
+    assert elapsed < 1
+    assert service._pool.submitted == 0
+    assert service.waiting == 0 and service.counters['timeouts'] == 1
+
+
+def test_timeout_is_one_deadline_for_waiting_and_running():
+    code, elapsed, service = submit_with_busy_slot(timeout=0.5, hold=0.4)
+    assert code == TIMED_OUT
+    assert service._pool.submitted == 1
+    # Not 0.4 s of waiting plus a fresh 0.5 s of running
+    assert elapsed < 0.8
@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import FIXTURES, SAMPLES
+from extract_modules import auto_patterns, extract_modules
+from stream_modules import stream_modules
+
+
+@pytest.fixture(scope='module')
+def contracts():
+    paths = sorted(SAMPLES.glob('*.md')) + [FIXTURES / 'cover-toc-body.md']
+    return [p.read_text(encoding='utf-8') for p in paths]
+
+
+def dump_of(texts, separators):
+    return ''.join(text + separator for text, separator in zip(texts, separators))
+
+
+@pytest.mark.parametrize('lookahead', [32, 64])
+@pytest.mark.parametrize('separator', ['\n', '\n\n', '\n\n\n\n'])
+def test_dump_matches_per_contract_extraction(contracts, separator, lookahead):
+    texts = contracts + contracts[::-1]
+    dump = dump_of(texts, [separator] * len(texts))
+    streamed = list(stream_modules(dump.splitlines(keepends=True), lookahead=lookahead))
+    assert [s['contract'] for s in streamed] == list(range(1, len(texts) + 1))
+    assert [s['modules'] for s in streamed] == [extract_modules(text) for text in texts]
+
+
+def test_auto_packs_per_contract(contracts):
+    texts = contracts + contracts
+    dump = dump_of(texts, ['\n\n'] * len(texts))
+    streamed = list(stream_modules(dump.splitlines(keepends=True), auto_packs=True))
+    assert [s['modules'] for s in streamed] == [extract_modules(t, patterns=auto_patterns(t)) for t in texts]
+
+
+def test_offsets_point_into_the_dump(contracts):
+    texts = contracts * 2
+    dump = dump_of(texts, ['\n\n'] * len(texts))
+    lines = dump.split('\n')
+    streamed = list(stream_modules(dump.splitlines(keepends=True), with_offsets=True))
+    assert len(streamed) == len(texts)
+    line = 0
+    for result, text in zip(streamed, texts):
+        assert result['start_line'] == line
+        line = result['end_line'] + 1
+        expected = extract_modules(text, with_offsets=True)
+        for module, alone in zip(result['modules'], expected):
+            assert dump[module['char_start']:module['char_end']] == module['text'] == alone['text']
+            assert module['start_line'] - result['start_line'] == alone['start_line']
+            assert lines[module['start_line']].strip() == module['text'].split('\n')[0].strip()
+    assert line == len(dump.splitlines())
+
+
+def test_lines_without_newlines(contracts):
+    dump = dump_of(contracts, ['\n'] * len(contracts))
+    with_newlines = list(stream_modules(dump.splitlines(keepends=True)))
+    assert list(stream_modules(dump.splitlines())) == with_newlines
+
+
+def test_single_contract(contracts):
+    streamed = list(stream_modules(contracts[0].splitlines(keepends=True), with_text=False))
+    assert len(streamed) == 1
+    assert streamed[0]['modules'] == extract_modules(contracts[0], with_text=False)